@@ -1,18 +1,33 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from database.database import get_db
+from database.database import get_db, get_db_lectura
 from core.security import SECRET_KEY, ALGORITHM
+from core.rate_limit import limitador, error_limite
 from repository import usuario as repository_usuario
 from schemas.usuario import User
 from models.enums import RolUsuario
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+METODOS_LECTURA = ("GET", "HEAD")
+
+def get_db_autenticacion(
+    request: Request,
+    db: Session = Depends(get_db),
+    db_lectura: Session = Depends(get_db_lectura)
+):
+    """
+    En peticiones de lectura el usuario se busca con la misma sesión de
+    lectura del endpoint, así no se ocupa una conexión del primario. Si la
+    réplica no lo encuentra, get_current_user lo vuelve a buscar en el primario.
+    """
+    return db_lectura if request.method in METODOS_LECTURA else db
+
+def get_current_user(db: Session = Depends(get_db_autenticacion), token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -26,6 +41,9 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
     except JWTError:
         raise credentials_exception
     user = repository_usuario.get_user_by_email(db, email=email)
+    if user is None and db.info.get("primario") is not None:
+        # La réplica puede no tener todavía a un usuario recién registrado
+        user = repository_usuario.get_user_by_email(db.info["primario"], email=email)
     if user is None:
         raise credentials_exception
     return user
@@ -46,6 +64,19 @@ def require_roles(allowed_roles: List[RolUsuario]):
     return role_checker
 
 
+def limitar_por_usuario(clase: str):
+    """
+    Dependencia que aplica el límite de peticiones de la clase al usuario autenticado.
+    Uso: dependencies=[Depends(limitar_por_usuario(SOLICITUDES))]
+    """
+    def verificar_limite(current_user = Depends(get_current_user)):
+        reintentar_en = limitador.consumir(clase, f"u{current_user.id}")
+        if reintentar_en is not None:
+            raise error_limite(reintentar_en)
+        return current_user
+    return verificar_limite
+
+
 def get_current_pasajero(current_user = Depends(get_current_user)):
     """Verifica que el usuario sea un pasajero"""
     if current_user.rol != RolUsuario.pasajero:
@@ -74,3 +105,28 @@ def get_current_operador(current_user = Depends(get_current_user)):
             detail="Solo los operadores pueden realizar esta acción"
         )
     return current_user
+
+MAX_IDS_LOTE = 500
+
+def get_ids_lote(
+    ids: Optional[str] = Query(None, description="IDs separados por comas, p. ej. 1,2,3")
+) -> Optional[List[int]]:
+    """
+    Lee el parámetro ?ids=1,2,3 de los endpoints de búsqueda por lotes.
+    Devuelve None si no se envió; los IDs repetidos se ignoran.
+    """
+    if ids is None:
+        return None
+    try:
+        valores = [int(valor) for valor in ids.split(",") if valor.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids debe ser una lista de enteros separados por comas"
+        )
+    if len(valores) > MAX_IDS_LOTE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Se pueden pedir como máximo {MAX_IDS_LOTE} ids por petición"
+        )
+    return list(dict.fromkeys(valores))
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+import json
+
+from api.dependencies import require_roles
+from models.enums import RolUsuario
+from schemas.usuario import User
+from services.mapa_demanda import mapa_demanda
+
+router = APIRouter()
+
+@router.get("/heatmap")
+def get_heatmap(
+    hora: int = Query(..., ge=0, le=167, description="Hora de la semana: 0 = lunes 00h, 167 = domingo 23h"),
+    current_user: User = Depends(require_roles([RolUsuario.operador, RolUsuario.conductor]))
+):
+    """
+    Demanda histórica por celda para una hora de la semana, leída del mapa
+    precalculado en memoria. Devuelve [lon, lat, solicitudes] del centro de cada celda con demanda.
+    """
+    if not mapa_demanda.disponible:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="El mapa de demanda todavía no fue generado"
+        )
+    meta, celdas = mapa_demanda.celdas(hora)
+    contenido = json.dumps({
+        "hora": hora,
+        "celda_grados": meta["celda_grados"],
+        "zona_horaria": meta["zona_horaria"],
+        "generado": meta["generado"],
+        "celdas": celdas,
+    }, separators=(",", ":"))
+    return Response(content=contenido, media_type="application/json")
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Body
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import timedelta
@@ -9,6 +9,8 @@ from core import security
 from schemas.usuario import Token, User, UserUpdate, PasswordChange
 from api.dependencies import get_current_user
 from models.usuario import Usuario
+from core.responses import serializar_objeto
+from core.http_cache import calcular_etag, respuesta_condicional
 
 router = APIRouter()
 
@@ -28,11 +30,17 @@ def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2Passw
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=User)
-def read_users_me(current_user: User = Depends(get_current_user)):
+def read_users_me(request: Request, current_user: Usuario = Depends(get_current_user)):
     """
-    Get current user.
+    Get current user. Supports If-None-Match.
     """
-    return current_user
+    return respuesta_condicional(
+        request,
+        ("usuario", current_user.id),
+        calcular_etag("usuario", current_user.id, current_user.fecha_actualizacion),
+        "private, no-cache",
+        lambda: serializar_objeto(User, current_user),
+    )
 
 @router.put("/me", response_model=User)
 def update_user_me(
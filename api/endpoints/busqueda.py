@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List
+
+from database.database import get_db_lectura
+from core.responses import respuesta_lista
+from repository import busqueda as repository_busqueda
+from schemas.busqueda import ResultadoBusqueda
+from schemas.usuario import User
+from api.dependencies import get_current_operador
+
+router = APIRouter()
+
+@router.get("/", response_model=List[ResultadoBusqueda])
+def buscar(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=50),
+    db: Session = Depends(get_db_lectura),
+    current_user: User = Depends(get_current_operador)
+):
+    """
+    Busca usuarios por nombre, email o teléfono y vehículos por placa, con
+    coincidencia parcial, en una sola consulta. Devuelve las mejores coincidencias
+    ordenadas por puntaje. Solo operadores.
+    """
+    return respuesta_lista(ResultadoBusqueda, repository_busqueda.buscar_usuarios_y_vehiculos(db, q, limit=limit))
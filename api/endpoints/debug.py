@@ -0,0 +1,74 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+import asyncio
+
+from api.dependencies import get_current_operador
+from schemas.usuario import User
+from core import profiling
+from core.websockets import manager
+
+router = APIRouter()
+
+def _tomar_lock():
+    if not profiling.perfil_lock.acquire(blocking=False):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Ya hay un perfilado en curso en este worker")
+
+@router.post("/perfil", response_class=PlainTextResponse)
+async def perfil_cpu(
+    segundos: float = Query(10, gt=0, le=60),
+    intervalo_ms: float = Query(5, ge=1, le=100),
+    current_user: User = Depends(get_current_operador)
+):
+    """
+    Muestrea las pilas de todos los hilos del worker durante unos segundos.
+    Devuelve pilas colapsadas compatibles con flamegraph.pl y speedscope. Solo operadores.
+    """
+    _tomar_lock()
+    try:
+        muestreador = profiling.Muestreador(intervalo_ms / 1000.0)
+        muestreador.start()
+        try:
+            await asyncio.sleep(segundos)
+        finally:
+            await run_in_threadpool(muestreador.detener)
+        return PlainTextResponse(
+            muestreador.colapsado(),
+            headers={"Content-Disposition": 'attachment; filename="perfil.collapsed"'}
+        )
+    finally:
+        profiling.perfil_lock.release()
+
+@router.post("/memoria")
+async def snapshot_memoria(
+    segundos: float = Query(10, ge=0, le=60),
+    filtro: Optional[str] = Query(None, description="Subcadena de la ruta del archivo, p. ej. core/websockets.py"),
+    top: int = Query(30, ge=1, le=200),
+    current_user: User = Depends(get_current_operador)
+):
+    """
+    Compara la memoria asignada al inicio y al final del intervalo (tracemalloc)
+    y devuelve los sitios de asignación que más crecieron. Solo operadores.
+    """
+    _tomar_lock()
+    try:
+        ya_activo, antes = await run_in_threadpool(profiling.snapshot_memoria_inicio)
+        await asyncio.sleep(segundos)
+        resultado = await run_in_threadpool(profiling.snapshot_memoria_fin, ya_activo, antes, filtro, top)
+        resultado["conexiones_websocket"] = len(manager.active_connections)
+        return resultado
+    finally:
+        profiling.perfil_lock.release()
+
+@router.get("/perfiles/{perfil_id}", response_class=PlainTextResponse)
+def read_perfil(perfil_id: str, current_user: User = Depends(get_current_operador)):
+    """
+    Obtiene el perfil tomado durante una petición marcada con X-Profile-Token.
+    Incluye todos los hilos del worker (cabecera X-Profile-Scope: process),
+    no solo los de esa petición. Solo operadores.
+    """
+    colapsado = profiling.perfiles_recientes.get(perfil_id)
+    if colapsado is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfil no encontrado")
+    return PlainTextResponse(colapsado, headers={"X-Profile-Scope": "process"})
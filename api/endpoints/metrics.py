@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+import os
+from dotenv import load_dotenv
+
+from core.metrics import registry
+
+load_dotenv()
+
+# Si se define, el scraper debe enviar "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+router = APIRouter()
+
+@router.get("", response_class=PlainTextResponse, include_in_schema=False)
+def read_metrics(authorization: Optional[str] = Header(None)):
+    """
+    Expone las métricas del worker en formato de texto de Prometheus.
+    """
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token de métricas inválido")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from database.database import get_db
+from core.responses import respuesta_lista
 from schemas.rol import Rol, RolCreate, RolUpdate
 from repository import rol as repository_rol
 from api.dependencies import get_current_user
@@ -61,7 +62,7 @@ def read_all_roles(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes permisos para ver los roles.")
     
     roles = repository_rol.get_all_roles(db, skip=skip, limit=limit)
-    return roles
+    return respuesta_lista(Rol, roles)
 
 @router.put("/{rol_id}", response_model=Rol)
 def update_existing_rol(
@@ -1,51 +1,98 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 
-from database.database import get_db
+from database.database import get_db, get_db_lectura
+from core.responses import respuesta_lista
+from core.exportacion import respuesta_exportacion
 from repository import solicitud as repository_solicitud
 from schemas.solicitud import Solicitud, SolicitudCreate
 from schemas.usuario import User
-from api.dependencies import get_current_user, get_current_pasajero, require_roles
+from api.dependencies import get_current_user, get_current_pasajero, get_current_operador, require_roles, limitar_por_usuario
+from core.rate_limit import SOLICITUDES
 from core.websockets import manager
-from models.enums import RolUsuario
+from models.enums import RolUsuario, EstadoViaje
+from services.surge import surge_grid
+from services.mapa_demanda import mapa_demanda
+from services.expiracion import expiracion_scheduler
+from services.idempotencia import idempotencia_store
 
 router = APIRouter()
 
-@router.post("/", response_model=Solicitud)
+RUTA_CREAR_SOLICITUD = "POST /solicitudes"
+
+@router.post("/", response_model=Solicitud, dependencies=[Depends(limitar_por_usuario(SOLICITUDES))])
 async def create_solicitud(
     solicitud: SolicitudCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_pasajero)  # Solo pasajeros pueden crear solicitudes
+    current_user: User = Depends(get_current_pasajero),  # Solo pasajeros pueden crear solicitudes
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """
     Crea una nueva solicitud de viaje. Solo disponible para pasajeros.
+    Un reintento con la misma Idempotency-Key devuelve la solicitud ya creada.
     """
-    db_solicitud = repository_solicitud.create_solicitud(db=db, solicitud=solicitud, pasajero_id=current_user.id)
+    respuesta_previa = idempotencia_store.iniciar(db, idempotency_key, current_user.id, RUTA_CREAR_SOLICITUD)
+    if respuesta_previa is not None:
+        return respuesta_previa
+
+    try:
+        db_solicitud = repository_solicitud.create_solicitud(db=db, solicitud=solicitud, pasajero_id=current_user.id)
+    except Exception:
+        idempotencia_store.liberar(db, idempotency_key, current_user.id, RUTA_CREAR_SOLICITUD)
+        raise
     solicitud_data = Solicitud.model_validate(db_solicitud)
+    idempotencia_store.completar(
+        db, idempotency_key, current_user.id, RUTA_CREAR_SOLICITUD, solicitud_data.model_dump(mode="json")
+    )
+
+    surge_grid.registrar_solicitud(solicitud.origen_lon, solicitud.origen_lat)
+    mapa_demanda.registrar_solicitud(solicitud.origen_lon, solicitud.origen_lat, db_solicitud.fecha_creacion)
+    expiracion_scheduler.programar(db_solicitud.id, db_solicitud.pasajero_id, db_solicitud.fecha_creacion)
     await manager.broadcast(f"New solicitud: {solicitud_data.model_dump_json()}")
-    return db_solicitud
+    return solicitud_data
 
 @router.get("/", response_model=List[Solicitud])
 def read_solicitudes(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_lectura),
     current_user: User = Depends(require_roles([RolUsuario.operador, RolUsuario.conductor]))
 ):
     """
     Obtiene todas las solicitudes. Solo disponible para operadores y conductores.
     """
     solicitudes = repository_solicitud.get_solicitudes(db, skip=skip, limit=limit)
-    return solicitudes
+    return respuesta_lista(Solicitud, solicitudes)
+
+@router.get("/export")
+def export_solicitudes(
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    conductor_id: Optional[int] = None,
+    estado: Optional[EstadoViaje] = None,
+    db: Session = Depends(get_db_lectura),
+    current_user: User = Depends(get_current_operador)
+):
+    """
+    Exporta las solicitudes en streaming (NDJSON o CSV) con una sola consulta.
+    Filtra por fecha de creación [desde, hasta), conductor del viaje y estado. Solo operadores.
+    """
+    consulta = repository_solicitud.consulta_exportacion_solicitudes(
+        db, desde=desde, hasta=hasta, conductor_id=conductor_id, estado=estado
+    )
+    columnas = [c["name"] for c in consulta.column_descriptions]
+    return respuesta_exportacion(columnas, consulta, formato, "solicitudes")
 
 @router.get("/me", response_model=List[Solicitud])
 def read_solicitudes_me(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_lectura),
     current_user: User = Depends(get_current_user)
 ):
     """
     Obtiene las solicitudes de viaje para el usuario actual (pasajero).
     """
     solicitudes = repository_solicitud.get_solicitudes_by_pasajero(db, pasajero_id=current_user.id)
-    return solicitudes
+    return respuesta_lista(Solicitud, solicitudes)
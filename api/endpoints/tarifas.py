@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Body
 from sqlalchemy.orm import Session
 from typing import List
 
-from database.database import get_db
-from schemas.tarifa import Tarifa, TarifaCreate, TarifaUpdate
+from database.database import get_db, get_db_lectura
+from core.responses import respuesta_lista, serializar_objeto
+from core.http_cache import calcular_etag, respuesta_condicional
+from schemas.tarifa import Tarifa, TarifaCreate, TarifaUpdate, CotizacionTarifa, CeldaSurge, SugerenciaPrecio
 from repository import tarifa as repository_tarifa
-from api.dependencies import get_current_user
+from api.dependencies import get_current_user, get_current_operador
 from models.usuario import Usuario
+from services.surge import surge_grid
+from services.tarifas import calcular_precio
+from services.sugerencia_precio import sugerencia_precios
 
 router = APIRouter()
 
@@ -14,7 +19,7 @@ router = APIRouter()
 def read_all_tarifas(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_lectura),
     current_user: Usuario = Depends(get_current_user)
 ):
     """
@@ -23,7 +28,7 @@ def read_all_tarifas(
     if current_user.rol != "operador":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Solo el operador puede ver todas las tarifas.")
     
-    return repository_tarifa.get_tarifas(db, skip=skip, limit=limit)
+    return respuesta_lista(Tarifa, repository_tarifa.get_tarifas(db, skip=skip, limit=limit))
 
 @router.post("/", response_model=Tarifa, status_code=status.HTTP_201_CREATED)
 def create_new_tarifa(
@@ -40,25 +45,87 @@ def create_new_tarifa(
     
     return repository_tarifa.create_tarifa(db=db, tarifa=tarifa)
 
+# Las tarifas cambian poco; los clientes pueden reutilizarlas unos segundos y luego revalidar con el ETag
+CACHE_CONTROL_TARIFAS = "public, max-age=30"
+
 @router.get("/activa", response_model=Tarifa)
-def read_tarifa_activa(db: Session = Depends(get_db)):
+def read_tarifa_activa(request: Request, db: Session = Depends(get_db_lectura)):
     """
-    Obtiene la tarifa activa actualmente.
+    Obtiene la tarifa activa actualmente. Soporta If-None-Match.
+    """
+    version = repository_tarifa.get_tarifa_activa_version(db)
+    if version is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No hay tarifa activa configurada.")
+    return respuesta_condicional(
+        request,
+        ("tarifa", "activa"),
+        calcular_etag("tarifa", version.id, version.fecha_actualizacion),
+        CACHE_CONTROL_TARIFAS,
+        lambda: serializar_objeto(Tarifa, repository_tarifa.get_tarifa_by_id(db, tarifa_id=version.id)),
+    )
+
+@router.get("/cotizar", response_model=CotizacionTarifa)
+def cotizar_viaje(
+    origen_lat: float,
+    origen_lon: float,
+    distancia_km: float,
+    duracion_min: float = 0.0,
+    db: Session = Depends(get_db_lectura)
+):
+    """
+    Cotiza un viaje con la tarifa activa y el multiplicador de demanda
+    vigente en la zona de origen.
     """
     db_tarifa = repository_tarifa.get_tarifa_activa(db)
     if db_tarifa is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No hay tarifa activa configurada.")
-    return db_tarifa
+
+    multiplicador = surge_grid.multiplicador(origen_lon, origen_lat)
+    precio_base = calcular_precio(db_tarifa, distancia_km, duracion_min)
+    return CotizacionTarifa(
+        tarifa_id=db_tarifa.id,
+        precio_base=precio_base,
+        multiplicador=multiplicador,
+        precio=calcular_precio(db_tarifa, distancia_km, duracion_min, multiplicador),
+        moneda=db_tarifa.moneda,
+    )
+
+@router.get("/sugerencia", response_model=SugerenciaPrecio)
+def sugerir_precio(
+    origen_lat: float,
+    origen_lon: float,
+    destino_lat: float,
+    destino_lon: float,
+    current_user: Usuario = Depends(get_current_user)
+):
+    """
+    Sugiere un precio (percentiles 25, 50 y 75 de los precios aceptados) para
+    un viaje entre dos puntos, según el historial del par de zonas. No consulta la base de datos.
+    """
+    return sugerencia_precios.sugerir(origen_lon, origen_lat, destino_lon, destino_lat)
+
+@router.get("/surge", response_model=List[CeldaSurge])
+def read_surge_grid(current_user: Usuario = Depends(get_current_operador)):
+    """
+    Obtiene el multiplicador de demanda actual por celda. Solo operadores.
+    """
+    return surge_grid.grilla()
 
 @router.get("/{tarifa_id}", response_model=Tarifa)
-def read_tarifa_by_id(tarifa_id: int, db: Session = Depends(get_db)):
+def read_tarifa_by_id(tarifa_id: int, request: Request, db: Session = Depends(get_db_lectura)):
     """
-    Obtiene una tarifa por su ID.
+    Obtiene una tarifa por su ID. Soporta If-None-Match.
     """
-    db_tarifa = repository_tarifa.get_tarifa_by_id(db, tarifa_id=tarifa_id)
-    if db_tarifa is None:
+    version = repository_tarifa.get_tarifa_version(db, tarifa_id=tarifa_id)
+    if version is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tarifa no encontrada.")
-    return db_tarifa
+    return respuesta_condicional(
+        request,
+        ("tarifa", tarifa_id),
+        calcular_etag("tarifa", tarifa_id, version.fecha_actualizacion),
+        CACHE_CONTROL_TARIFAS,
+        lambda: serializar_objeto(Tarifa, repository_tarifa.get_tarifa_by_id(db, tarifa_id=tarifa_id)),
+    )
 
 @router.put("/{tarifa_id}", response_model=Tarifa)
 def update_existing_tarifa(
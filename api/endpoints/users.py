@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from database.database import get_db
+from database.database import get_db, get_db_lectura
+from core.responses import respuesta_lista
 from repository import usuario as repository_usuario
-from schemas.usuario import User, UserCreate
-from api.dependencies import get_current_user, get_current_operador
+from schemas.usuario import User, UserCreate, UbicacionUpdate, ReporteImportacion
+from api.dependencies import get_current_user, get_current_operador, get_current_conductor, get_ids_lote
 from models.enums import RolUsuario
+from services.surge import surge_grid
+from services.recorridos import recorridos
+from services.importacion import importar_conductores, formato_de_archivo
 
 router = APIRouter()
 
@@ -45,29 +49,66 @@ def create_conductor(
     return repository_usuario.create_user(db=db, user=user_obj)
 
 
+@router.post("/conductores/importar", response_model=ReporteImportacion)
+def importar_conductores_masivo(
+    archivo: UploadFile = File(...),
+    formato: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_operador)
+):
+    """
+    Alta masiva de conductores con su vehículo desde un archivo CSV o NDJSON
+    (columnas: nombre, email, telefono, password, marca, modelo, placa, color, anio).
+    Las filas válidas se insertan en una sola transacción; devuelve el resultado de cada fila.
+    Solo operadores.
+    """
+    contenido = archivo.file.read()
+    return importar_conductores(db, contenido, formato_de_archivo(archivo.filename, formato))
+
+
 @router.get("/", response_model=List[User])
 def read_users(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    ids: Optional[List[int]] = Depends(get_ids_lote),
+    db: Session = Depends(get_db_lectura),
     current_user: User = Depends(get_current_operador)
 ):
     """
     Obtiene todos los usuarios. Solo operadores.
+    Con ?ids=1,2,3 devuelve esos usuarios (en ese orden) con una sola consulta.
     """
+    if ids is not None:
+        return respuesta_lista(User, repository_usuario.cargador_usuarios(db).obtener_varios(ids))
     users = repository_usuario.get_users(db, skip=skip, limit=limit)
-    return users
+    return respuesta_lista(User, users)
 
 
 @router.get("/conductores", response_model=List[User])
 def read_conductores(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_lectura),
     current_user: User = Depends(get_current_operador)
 ):
     """
     Obtiene la lista de conductores. Solo operadores.
     """
     conductores = repository_usuario.get_users_by_rol(db, rol=RolUsuario.conductor, skip=skip, limit=limit)
-    return conductores
+    return respuesta_lista(User, conductores)
+
+
+@router.put("/me/ubicacion", response_model=User)
+def update_my_ubicacion(
+    ubicacion: UbicacionUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_conductor)
+):
+    """
+    Actualiza la ubicación actual del conductor autenticado.
+    Durante un viaje iniciado, el punto también se agrega a su recorrido.
+    """
+    db_user = repository_usuario.update_ubicacion(db, db_user=current_user, lat=ubicacion.lat, lon=ubicacion.lon)
+    surge_grid.registrar_conductor(current_user.id, ubicacion.lon, ubicacion.lat)
+    recorridos.agregar_punto(current_user.id, ubicacion.lon, ubicacion.lat)
+    return db_user
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
@@ -7,11 +7,13 @@ import os
 import uuid
 import io
 
-from database.database import get_db
+from database.database import get_db, get_db_lectura
+from core.responses import respuesta_lista, serializar_objeto
+from core.http_cache import calcular_etag, respuesta_condicional
 from schemas.vehiculo import Vehiculo, VehiculoCreate, VehiculoUpdate
 from repository import vehiculo as repository_vehiculo
 from repository import usuario as repository_usuario
-from api.dependencies import get_current_user, get_current_operador
+from api.dependencies import get_current_user, get_current_operador, get_ids_lote
 from schemas.usuario import User
 from models.enums import RolUsuario
 
@@ -114,13 +116,17 @@ def asignar_vehiculo_a_conductor(
 def read_all_vehiculos(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    ids: Optional[List[int]] = Depends(get_ids_lote),
+    db: Session = Depends(get_db_lectura),
     current_user: User = Depends(get_current_operador)
 ):
     """
     Obtiene todos los vehículos. Solo operadores.
+    Con ?ids=1,2,3 devuelve esos vehículos (en ese orden) con una sola consulta.
     """
-    return repository_vehiculo.get_all_vehiculos(db, skip=skip, limit=limit)
+    if ids is not None:
+        return respuesta_lista(Vehiculo, repository_vehiculo.cargador_vehiculos(db).obtener_varios(ids))
+    return respuesta_lista(Vehiculo, repository_vehiculo.get_all_vehiculos(db, skip=skip, limit=limit))
 
 @router.get("/me", response_model=List[Vehiculo])
 def read_my_vehiculos(
@@ -132,21 +138,28 @@ def read_my_vehiculos(
     """
     if current_user.rol != "conductor":
         raise HTTPException(status_code=403, detail="Solo los conductores pueden acceder a este endpoint.")
-    return repository_vehiculo.get_vehiculos_by_conductor(db, conductor_id=current_user.id)
+    return respuesta_lista(Vehiculo, repository_vehiculo.get_vehiculos_by_conductor(db, conductor_id=current_user.id))
 
 @router.get("/{vehiculo_id}", response_model=Vehiculo)
 def read_vehiculo(
     vehiculo_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Obtiene un vehículo por su ID.
+    Obtiene un vehículo por su ID. Soporta If-None-Match.
     """
-    db_vehiculo = repository_vehiculo.get_vehiculo_by_id(db, vehiculo_id=vehiculo_id)
-    if db_vehiculo is None:
+    version = repository_vehiculo.get_vehiculo_version(db, vehiculo_id=vehiculo_id)
+    if version is None:
         raise HTTPException(status_code=404, detail="Vehículo no encontrado")
-    return db_vehiculo
+    return respuesta_condicional(
+        request,
+        ("vehiculo", vehiculo_id),
+        calcular_etag("vehiculo", vehiculo_id, version.fecha_actualizacion),
+        "private, no-cache",
+        lambda: serializar_objeto(Vehiculo, repository_vehiculo.get_vehiculo_by_id(db, vehiculo_id=vehiculo_id)),
+    )
 
 @router.get("/conductor/{conductor_id}", response_model=List[Vehiculo])
 def read_vehiculos_by_conductor(
@@ -157,7 +170,7 @@ def read_vehiculos_by_conductor(
     """
     Obtiene la lista de vehículos de un conductor específico.
     """
-    return repository_vehiculo.get_vehiculos_by_conductor(db, conductor_id=conductor_id)
+    return respuesta_lista(Vehiculo, repository_vehiculo.get_vehiculos_by_conductor(db, conductor_id=conductor_id))
 
 @router.put("/{vehiculo_id}", response_model=Vehiculo)
 def update_existing_vehiculo(
@@ -1,43 +1,166 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, status
 from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import datetime
 
-from database.database import get_db
-from repository import viaje as repository_viaje, solicitud as repository_solicitud
-from schemas.viaje import Viaje, ViajeCreate, ViajeStatusUpdate
+from database.database import get_db, get_db_lectura
+from core.responses import respuesta_lista
+from core.exportacion import respuesta_exportacion
+from repository import viaje as repository_viaje
+from repository import vehiculo as repository_vehiculo
+from repository import usuario as repository_usuario
+from schemas.viaje import Viaje, ViajeCreate, ViajeStatusUpdate, GananciasConductor, ViajeExpandido
+from schemas.vehiculo import Vehiculo
 from schemas.usuario import User
-from api.dependencies import get_current_user
+from api.dependencies import get_current_user, get_current_operador, get_current_conductor
 from core.websockets import manager
+from services.matching import matching_engine
+from services.surge import surge_grid
+from services.recorridos import recorridos
+from services.idempotencia import idempotencia_store
+from services.ganancias import resumen_conductor
+from services.sugerencia_precio import sugerencia_precios
+from models.enums import EstadoViaje
 
 router = APIRouter()
 
+RUTA_CREAR_VIAJE = "POST /viajes"
+
 @router.post("/", response_model=Viaje)
 async def create_viaje(
     viaje: ViajeCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """
     Crea un nuevo viaje (el conductor acepta una solicitud).
+    Si el motor de asignación reservó la solicitud para otro conductor,
+    se rechaza mientras la reserva siga vigente.
+    Un reintento con la misma Idempotency-Key devuelve el viaje ya creado.
     """
-    db_viaje = repository_viaje.create_viaje(db=db, viaje=viaje, conductor_id=current_user.id)
+    conductor_reservado = matching_engine.conductor_reservado(viaje.solicitud_id)
+    if conductor_reservado is not None and conductor_reservado != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="La solicitud está reservada para otro conductor"
+        )
+
+    respuesta_previa = idempotencia_store.iniciar(db, idempotency_key, current_user.id, RUTA_CREAR_VIAJE)
+    if respuesta_previa is not None:
+        return respuesta_previa
 
+    try:
+        db_viaje = repository_viaje.create_viaje(db=db, viaje=viaje, conductor_id=current_user.id)
+    except Exception:
+        idempotencia_store.liberar(db, idempotency_key, current_user.id, RUTA_CREAR_VIAJE)
+        raise
     viaje_data = Viaje.model_validate(db_viaje)
+    idempotencia_store.completar(
+        db, idempotency_key, current_user.id, RUTA_CREAR_VIAJE, viaje_data.model_dump(mode="json")
+    )
+
+    matching_engine.liberar(viaje.solicitud_id)
+    surge_grid.marcar_ocupado(current_user.id, True)
+
     await manager.send_personal_message_by_id(
         f"Your offer was accepted!: {viaje_data.model_dump_json()}",
         db_viaje.conductor_id
     )
 
-    return db_viaje
+    return viaje_data
+
+INCLUDES_VIAJE = {"vehiculo", "conductor", "pasajero"}
+
+@router.get("/", response_model=list[ViajeExpandido])
+def read_viajes(
+    skip: int = 0,
+    limit: int = Query(100, le=500),
+    include: Optional[str] = Query(None, description="Entidades a expandir, separadas por comas: vehiculo, conductor, pasajero"),
+    db: Session = Depends(get_db_lectura),
+    current_user: User = Depends(get_current_operador)
+):
+    """
+    Obtiene una página de viajes (los más recientes primero). Solo operadores.
+    Con ?include= se agregan el vehículo, el conductor y/o el pasajero de cada
+    viaje, resueltos con una sola consulta IN por tipo de entidad para toda la página.
+    """
+    expandir = {parte.strip() for parte in include.split(",") if parte.strip()} if include else set()
+    desconocidos = expandir - INCLUDES_VIAJE
+    if desconocidos:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"include no soportado: {sorted(desconocidos)}. Opciones: {sorted(INCLUDES_VIAJE)}"
+        )
+
+    viajes = repository_viaje.get_viajes(db, skip=skip, limit=limit)
+    vehiculos = repository_vehiculo.cargador_vehiculos(db)
+    usuarios = repository_usuario.cargador_usuarios(db)
+    for v in viajes:
+        if "vehiculo" in expandir:
+            vehiculos.pedir(v.vehiculo_id)
+        if "conductor" in expandir:
+            usuarios.pedir(v.conductor_id)
+        if "pasajero" in expandir and v.solicitud:
+            usuarios.pedir(v.solicitud.pasajero_id)
+    vehiculos.despachar()
+    usuarios.despachar()
+
+    def validar(esquema, fila):
+        return esquema.model_validate(fila) if fila is not None else None
+
+    resultado = []
+    for v in viajes:
+        datos = dict(Viaje.model_validate(v))
+        if "vehiculo" in expandir:
+            datos["vehiculo"] = validar(Vehiculo, vehiculos.obtener(v.vehiculo_id))
+        if "conductor" in expandir:
+            datos["conductor"] = validar(User, usuarios.obtener(v.conductor_id))
+        if "pasajero" in expandir and v.solicitud:
+            datos["pasajero"] = validar(User, usuarios.obtener(v.solicitud.pasajero_id))
+        resultado.append(ViajeExpandido(**datos))
+    return respuesta_lista(ViajeExpandido, resultado)
 
 @router.get("/me", response_model=list[Viaje])
 def get_my_viajes(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_lectura),
     current_user: User = Depends(get_current_user)
 ):
     """
     Obtiene los viajes del conductor autenticado.
     """
-    return repository_viaje.get_viajes_by_conductor(db, conductor_id=current_user.id)
+    return respuesta_lista(Viaje, repository_viaje.get_viajes_by_conductor(db, conductor_id=current_user.id))
+
+@router.get("/me/ganancias", response_model=GananciasConductor)
+def get_my_ganancias(
+    db: Session = Depends(get_db_lectura),
+    current_user: User = Depends(get_current_conductor)
+):
+    """
+    Ganancias del conductor autenticado hoy, esta semana y este mes:
+    viajes, ingresos, pagado/pendiente y minutos en viaje.
+    """
+    return resumen_conductor(db, current_user.id)
+
+@router.get("/export")
+def export_viajes(
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    conductor_id: Optional[int] = None,
+    estado: Optional[EstadoViaje] = None,
+    db: Session = Depends(get_db_lectura),
+    current_user: User = Depends(get_current_operador)
+):
+    """
+    Exporta el historial de viajes en streaming (NDJSON o CSV) con una sola consulta.
+    Filtra por fecha de la solicitud [desde, hasta), conductor y estado. Solo operadores.
+    """
+    consulta = repository_viaje.consulta_exportacion_viajes(
+        db, desde=desde, hasta=hasta, conductor_id=conductor_id, estado=estado
+    )
+    columnas = [c["name"] for c in consulta.column_descriptions]
+    return respuesta_exportacion(columnas, consulta, formato, "viajes")
 
 @router.patch("/{viaje_id}/iniciar", response_model=Viaje)
 async def iniciar_viaje(
@@ -49,14 +172,14 @@ async def iniciar_viaje(
     Inicia un viaje (marca la hora de inicio).
     """
     db_viaje = repository_viaje.iniciar_viaje(db, viaje_id=viaje_id, conductor_id=current_user.id)
+    recorridos.iniciar(db_viaje.id, current_user.id)
 
     # Notificar al pasajero
-    db_solicitud = repository_solicitud.get_solicitud_by_id(db, db_viaje.solicitud_id)
-    if db_solicitud:
+    if db_viaje.solicitud:
         viaje_data = Viaje.model_validate(db_viaje)
         await manager.send_personal_message_by_id(
             f"Trip started: {viaje_data.model_dump_json()}",
-            db_solicitud.pasajero_id
+            db_viaje.solicitud.pasajero_id
         )
 
     return db_viaje
@@ -70,15 +193,19 @@ async def finalizar_viaje(
     """
     Finaliza un viaje (marca la hora de fin y lo marca como completado).
     """
-    db_viaje = repository_viaje.finalizar_viaje(db, viaje_id=viaje_id, conductor_id=current_user.id)
+    db_viaje = repository_viaje.finalizar_viaje(
+        db, viaje_id=viaje_id, conductor_id=current_user.id, recorrido=recorridos.obtener(viaje_id)
+    )
+    recorridos.descartar(viaje_id)
+    surge_grid.marcar_ocupado(current_user.id, False)
+    sugerencia_precios.registrar_viaje(db_viaje)
 
     # Notificar al pasajero
-    db_solicitud = repository_solicitud.get_solicitud_by_id(db, db_viaje.solicitud_id)
-    if db_solicitud:
+    if db_viaje.solicitud:
         viaje_data = Viaje.model_validate(db_viaje)
         await manager.send_personal_message_by_id(
             f"Trip completed: {viaje_data.model_dump_json()}",
-            db_solicitud.pasajero_id
+            db_viaje.solicitud.pasajero_id
         )
 
     return db_viaje
@@ -95,12 +222,11 @@ async def marcar_pagado(
     db_viaje = repository_viaje.marcar_como_pagado(db, viaje_id=viaje_id, conductor_id=current_user.id)
 
     # Notificar al pasajero
-    db_solicitud = repository_solicitud.get_solicitud_by_id(db, db_viaje.solicitud_id)
-    if db_solicitud:
+    if db_viaje.solicitud:
         viaje_data = Viaje.model_validate(db_viaje)
         await manager.send_personal_message_by_id(
             f"Payment confirmed: {viaje_data.model_dump_json()}",
-            db_solicitud.pasajero_id
+            db_viaje.solicitud.pasajero_id
         )
 
     return db_viaje
@@ -115,14 +241,16 @@ async def update_viaje_status(
     db_viaje = repository_viaje.update_viaje_status(
         db, viaje_id=viaje_id, status_update=status_update, conductor_id=current_user.id
     )
+    if status_update.estado in (EstadoViaje.finalizado, EstadoViaje.cancelado):
+        surge_grid.marcar_ocupado(current_user.id, False)
+        recorridos.descartar(viaje_id)
 
     # Notify the passenger
-    db_solicitud = repository_solicitud.get_solicitud_by_id(db, db_viaje.solicitud_id)
-    if db_solicitud:
+    if db_viaje.solicitud:
         viaje_data = Viaje.model_validate(db_viaje)
         await manager.send_personal_message_by_id(
             f"Trip status updated: {viaje_data.model_dump_json()}",
-            db_solicitud.pasajero_id
+            db_viaje.solicitud.pasajero_id
         )
 
     return db_viaje
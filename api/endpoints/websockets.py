@@ -1,14 +1,49 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from core.websockets import manager
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, status
+from starlette.concurrency import run_in_threadpool
+from core.websockets import manager, websocket_messages_received_total
+from database.database import SessionLocal
+from api.dependencies import get_current_user
+from models.enums import RolUsuario
+from services.tablero import tablero, CANAL_OPERADORES
 
 router = APIRouter()
 
+def _operador_desde_token(token: str):
+    db = SessionLocal()
+    try:
+        usuario = get_current_user(db=db, token=token)
+    except HTTPException:
+        return None
+    finally:
+        db.close()
+    return usuario if usuario.rol == RolUsuario.operador else None
+
+@router.websocket("/ws/operadores")
+async def websocket_operadores(websocket: WebSocket, token: str):
+    """
+    Canal del tablero de operadores: al conectar recibe todos los contadores
+    y luego, en cada tick, solo los que cambiaron. Requiere el JWT de un operador.
+    """
+    operador = await run_in_threadpool(_operador_desde_token, token)
+    if operador is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await manager.connect_canal(websocket, CANAL_OPERADORES, operador.id)
+    try:
+        await websocket.send_text(tablero.mensaje_completo())
+        while True:
+            await websocket.receive_text()
+            websocket_messages_received_total.inc()
+    except WebSocketDisconnect:
+        manager.disconnect_canal(CANAL_OPERADORES, operador.id)
+
 @router.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: int):
     await manager.connect(websocket, client_id)
     try:
         while True:
             data = await websocket.receive_text()
+            websocket_messages_received_total.inc()
             # For now, we'll just echo the message back to the client
             await manager.send_personal_message(f"You wrote: {data}", websocket)
     except WebSocketDisconnect:
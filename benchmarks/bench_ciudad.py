@@ -0,0 +1,281 @@
+"""
+Benchmark de extremo a extremo con una ciudad sintética.
+
+Levanta la app (uvicorn en un hilo, contra la base definida en DATABASE_URL,
+que debe ser un Postgres/PostGIS local) o usa una ya levantada con --url, y
+simula N conductores conectados a /ws y M pasajeros creando solicitudes. Los
+conductores aceptan, inician, reportan ubicación, finalizan y cobran viajes por
+los endpoints de viajes.
+
+Imprime un JSON con el throughput, p50/p95/p99 por endpoint y la latencia de
+entrega por WebSocket, etiquetado con el commit actual para comparar corridas.
+
+Uso:
+    pip install -r benchmarks/requirements.txt
+    DATABASE_URL=postgresql://... SECRET_KEY=... \\
+        python -m benchmarks.bench_ciudad --conductores 50 --pasajeros 100 --solicitudes-por-pasajero 5
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+import httpx
+import numpy as np
+import websockets
+
+CENTRO = (-63.18, -17.78)
+SEMI_LADO_GRADOS = 0.05
+
+
+def _percentiles(valores) -> dict:
+    if not valores:
+        return {"n": 0}
+    arreglo = np.asarray(valores) * 1000.0
+    return {
+        "n": len(valores),
+        "p50_ms": round(float(np.percentile(arreglo, 50)), 2),
+        "p95_ms": round(float(np.percentile(arreglo, 95)), 2),
+        "p99_ms": round(float(np.percentile(arreglo, 99)), 2),
+    }
+
+
+def _commit_actual() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "desconocido"
+
+
+def _punto(rnd: random.Random):
+    return (
+        CENTRO[0] + rnd.uniform(-SEMI_LADO_GRADOS, SEMI_LADO_GRADOS),
+        CENTRO[1] + rnd.uniform(-SEMI_LADO_GRADOS, SEMI_LADO_GRADOS),
+    )
+
+
+def sembrar(conductores: int, pasajeros: int):
+    """
+    Crea usuarios, vehículos y una tarifa activa directamente en la base de datos.
+    Todas las cuentas comparten un único hash para no pagar bcrypt por usuario.
+    """
+    from database.database import SessionLocal
+    from core.security import get_password_hash, create_access_token
+    from models.usuario import Usuario
+    from models.vehiculo import Vehiculo
+    from models.tarifa import Tarifa
+    from models.enums import RolUsuario
+
+    corrida = uuid.uuid4().hex[:8]
+    password = get_password_hash("Benchmark123")
+    db = SessionLocal()
+    try:
+        if not db.query(Tarifa).filter(Tarifa.activo == True).first():
+            db.add(Tarifa(tarifa_base=5.0, costo_por_km=3.5, costo_por_minuto=0.5, activo=True))
+
+        usuarios_conductores = [
+            Usuario(nombre=f"Conductor {i}", email=f"bench-{corrida}-c{i}@example.com",
+                    password=password, rol=RolUsuario.conductor)
+            for i in range(conductores)
+        ]
+        usuarios_pasajeros = [
+            Usuario(nombre=f"Pasajero {i}", email=f"bench-{corrida}-p{i}@example.com",
+                    password=password, rol=RolUsuario.pasajero)
+            for i in range(pasajeros)
+        ]
+        db.add_all(usuarios_conductores + usuarios_pasajeros)
+        db.flush()
+        vehiculos = [
+            Vehiculo(conductor_id=u.id, marca="Bench", modelo="Sim", placa=f"B{corrida}{i}"[:20], color="blanco")
+            for i, u in enumerate(usuarios_conductores)
+        ]
+        db.add_all(vehiculos)
+        db.commit()
+
+        expira = timedelta(hours=2)
+        return (
+            [(u.id, create_access_token({"sub": u.email}, expira), v.id) for u, v in zip(usuarios_conductores, vehiculos)],
+            [(u.id, create_access_token({"sub": u.email}, expira)) for u in usuarios_pasajeros],
+        )
+    finally:
+        db.close()
+
+
+class Resultados:
+    def __init__(self):
+        self.latencias = defaultdict(list)
+        self.estados = defaultdict(lambda: defaultdict(int))
+        self.entrega_ws = []
+        self.enviadas = {}
+        self.viajes_completados = 0
+
+    def registrar(self, plantilla: str, segundos: float, status_code: int):
+        self.latencias[plantilla].append(segundos)
+        self.estados[plantilla][str(status_code)] += 1
+
+
+async def llamar(cliente, resultados, metodo, plantilla, url, token, **kwargs):
+    inicio = time.perf_counter()
+    respuesta = await cliente.request(metodo, url, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+    resultados.registrar(f"{metodo} {plantilla}", time.perf_counter() - inicio, respuesta.status_code)
+    return respuesta
+
+
+async def hacer_viaje(cliente, resultados, rnd, token, vehiculo_id, solicitud):
+    r = await llamar(cliente, resultados, "POST", "/viajes/", "/viajes/", token, json={
+        "solicitud_id": solicitud["id"], "vehiculo_id": vehiculo_id, "precio_final": solicitud["precio_ofrecido"],
+    })
+    if r.status_code != 200:
+        return
+    viaje_id = r.json()["id"]
+    await llamar(cliente, resultados, "PATCH", "/viajes/{viaje_id}/iniciar", f"/viajes/{viaje_id}/iniciar", token)
+    lon, lat = solicitud["origen_geom"]["coordinates"] if solicitud.get("origen_geom") else _punto(rnd)
+    for _ in range(3):
+        lon += rnd.uniform(-0.002, 0.002)
+        lat += rnd.uniform(-0.002, 0.002)
+        await llamar(cliente, resultados, "PUT", "/users/me/ubicacion", "/users/me/ubicacion", token,
+                     json={"lat": lat, "lon": lon})
+    await llamar(cliente, resultados, "PATCH", "/viajes/{viaje_id}/finalizar", f"/viajes/{viaje_id}/finalizar", token)
+    r = await llamar(cliente, resultados, "PATCH", "/viajes/{viaje_id}/marcar-pagado",
+                     f"/viajes/{viaje_id}/marcar-pagado", token)
+    if r.status_code == 200:
+        resultados.viajes_completados += 1
+
+
+async def conductor(url_ws, cliente, resultados, rnd, fin, listos, uid, token, vehiculo_id, prob_aceptar):
+    ocupado = asyncio.Lock()
+    async with websockets.connect(f"{url_ws}/ws/ws/{uid}", max_size=None) as ws:
+        listos.append(uid)
+        lon, lat = _punto(rnd)
+        await llamar(cliente, resultados, "PUT", "/users/me/ubicacion", "/users/me/ubicacion", token,
+                     json={"lat": lat, "lon": lon})
+        while not fin.is_set():
+            try:
+                mensaje = await asyncio.wait_for(ws.recv(), timeout=0.5)
+            except asyncio.TimeoutError:
+                continue
+            if not mensaje.startswith("New solicitud: "):
+                continue
+            solicitud = json.loads(mensaje[len("New solicitud: "):])
+            enviada = resultados.enviadas.get(solicitud["direccion_texto"])
+            if enviada is not None:
+                resultados.entrega_ws.append(time.perf_counter() - enviada)
+            if not ocupado.locked() and rnd.random() < prob_aceptar:
+                async def viaje():
+                    async with ocupado:
+                        await hacer_viaje(cliente, resultados, rnd, token, vehiculo_id, solicitud)
+                asyncio.create_task(viaje())
+
+
+async def pasajero(cliente, resultados, rnd, token, solicitudes, intervalo_s):
+    for _ in range(solicitudes):
+        (olon, olat), (dlon, dlat) = _punto(rnd), _punto(rnd)
+        marca = f"bench:{uuid.uuid4().hex}"
+        resultados.enviadas[marca] = time.perf_counter()
+        await llamar(cliente, resultados, "POST", "/solicitudes/", "/solicitudes/", token, json={
+            "direccion_texto": marca, "precio_ofrecido": round(rnd.uniform(10, 40), 2),
+            "origen_lat": olat, "origen_lon": olon, "destino_lat": dlat, "destino_lon": dlon,
+        })
+        await llamar(cliente, resultados, "GET", "/solicitudes/me", "/solicitudes/me", token)
+        await asyncio.sleep(rnd.expovariate(1.0 / intervalo_s))
+
+
+async def simular(args, url):
+    rnd = random.Random(args.semilla)
+    conductores, pasajeros = sembrar(args.conductores, args.pasajeros)
+    resultados = Resultados()
+    fin = asyncio.Event()
+    listos = []
+    url_ws = url.replace("http", "ws", 1)
+
+    limites = httpx.Limits(max_connections=args.conexiones_http)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=60) as cliente:
+        tareas_conductores = [
+            asyncio.create_task(conductor(url_ws, cliente, resultados, rnd, fin, listos, uid, token, vid, args.prob_aceptar))
+            for uid, token, vid in conductores
+        ]
+        while len(listos) < len(conductores):
+            await asyncio.sleep(0.05)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*[
+            pasajero(cliente, resultados, rnd, token, args.solicitudes_por_pasajero, args.intervalo_s)
+            for _, token in pasajeros
+        ])
+        # Dejar que terminen los viajes en curso
+        await asyncio.sleep(args.drenaje_s)
+        duracion = time.perf_counter() - inicio
+        fin.set()
+        await asyncio.gather(*tareas_conductores, return_exceptions=True)
+
+    total = sum(len(v) for v in resultados.latencias.values())
+    return {
+        "commit": _commit_actual(),
+        "parametros": vars(args),
+        "duracion_s": round(duracion, 2),
+        "peticiones": total,
+        "throughput_rps": round(total / duracion, 1),
+        "viajes_completados": resultados.viajes_completados,
+        "endpoints": {
+            plantilla: {**_percentiles(latencias), "estados": dict(resultados.estados[plantilla])}
+            for plantilla, latencias in sorted(resultados.latencias.items())
+        },
+        "entrega_websocket": _percentiles(resultados.entrega_ws),
+    }
+
+
+def _levantar_servidor(puerto: int):
+    import uvicorn
+    from main import app
+
+    servidor = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=puerto, log_level="warning"))
+    hilo = threading.Thread(target=servidor.run, daemon=True)
+    hilo.start()
+    while not servidor.started:
+        time.sleep(0.05)
+    return servidor, hilo
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="Usar un servidor ya levantado en lugar de uno en proceso")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--conductores", type=int, default=50)
+    parser.add_argument("--pasajeros", type=int, default=100)
+    parser.add_argument("--solicitudes-por-pasajero", type=int, default=5)
+    parser.add_argument("--intervalo-s", type=float, default=1.0, help="Tiempo medio entre solicitudes de un pasajero")
+    parser.add_argument("--prob-aceptar", type=float, default=0.2)
+    parser.add_argument("--conexiones-http", type=int, default=200)
+    parser.add_argument("--drenaje-s", type=float, default=5.0)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", help="Archivo donde escribir el JSON además de imprimirlo")
+    args = parser.parse_args()
+
+    servidor = None
+    url = args.url
+    if url is None:
+        servidor, hilo = _levantar_servidor(args.puerto)
+        url = f"http://127.0.0.1:{args.puerto}"
+
+    try:
+        reporte = asyncio.run(simular(args, url))
+    finally:
+        if servidor is not None:
+            servidor.should_exit = True
+            hilo.join()
+
+    texto = json.dumps(reporte, indent=2)
+    print(texto)
+    if args.salida:
+        with open(args.salida, "w") as f:
+            f.write(texto + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Costo de CPU frente a bytes ahorrados al comprimir payloads típicos de la API:
+listados de solicitudes de distinto tamaño (HTTP, gzip y brotli a varios
+niveles) y un mensaje de broadcast por WebSocket (permessage-deflate con la
+ventana por defecto frente a la ventana reducida de WS_DEFLATE_WINDOW_BITS).
+
+Sirve para elegir COMPRESSION_MIN_BYTES y los niveles: por debajo del umbral
+el ahorro no compensa el costo de CPU ni la cabecera gzip.
+
+Uso:
+    python -m benchmarks.bench_compresion --repeticiones 500
+"""
+import argparse
+import json
+import time
+import zlib
+
+from benchmarks.bench_json_listas import _filas
+from core.compression import WS_DEFLATE_MEM_LEVEL, WS_DEFLATE_WINDOW_BITS, brotli
+from core.responses import serializar_lista, serializar_objeto
+from schemas.solicitud import Solicitud
+
+
+def _gzip(nivel):
+    def comprimir(datos: bytes) -> bytes:
+        c = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+        return c.compress(datos) + c.flush()
+    return comprimir
+
+
+def _deflate_ws(window_bits, mem_level):
+    # Mismo esquema que permessage-deflate: deflate crudo terminado en sync flush
+    def comprimir(datos: bytes) -> bytes:
+        c = zlib.compressobj(6, zlib.DEFLATED, -window_bits, mem_level)
+        return (c.compress(datos) + c.flush(zlib.Z_SYNC_FLUSH))[:-4]
+    return comprimir
+
+
+def _memoria_kb(window_bits, mem_level) -> int:
+    """Memoria de zlib por contexto de compresión (fórmula de zconf.h)."""
+    return ((1 << (window_bits + 2)) + (1 << (mem_level + 9))) // 1024
+
+
+def _medir(comprimir, datos: bytes, repeticiones: int) -> dict:
+    salida = comprimir(datos)
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        comprimir(datos)
+    us = (time.perf_counter() - inicio) / repeticiones * 1e6
+    return {
+        "bytes": len(salida),
+        "ahorro_pct": round(100 * (1 - len(salida) / len(datos)), 1),
+        "cpu_us": round(us, 1),
+    }
+
+
+def correr(args) -> dict:
+    codecs = {f"gzip-{n}": _gzip(n) for n in (1, 6, 9)}
+    if brotli is not None:
+        for q in (1, 4, 11):
+            codecs[f"br-{q}"] = lambda d, q=q: brotli.compress(d, quality=q)
+
+    http = {}
+    for n in args.filas:
+        datos = serializar_lista(Solicitud, _filas(n))
+        http[f"{n}_filas"] = {"bytes_originales": len(datos)}
+        for nombre, comprimir in codecs.items():
+            http[f"{n}_filas"][nombre] = _medir(comprimir, datos, args.repeticiones)
+
+    mensaje = ("New solicitud: " + serializar_objeto(Solicitud, _filas(1)[0]).decode()).encode()
+    websocket = {
+        "bytes_originales": len(mensaje),
+        "deflate_15_8": _medir(_deflate_ws(15, 8), mensaje, args.repeticiones),
+        f"deflate_{WS_DEFLATE_WINDOW_BITS}_{WS_DEFLATE_MEM_LEVEL}": _medir(
+            _deflate_ws(WS_DEFLATE_WINDOW_BITS, WS_DEFLATE_MEM_LEVEL), mensaje, args.repeticiones
+        ),
+        "memoria_kb_15_8": _memoria_kb(15, 8),
+        f"memoria_kb_{WS_DEFLATE_WINDOW_BITS}_{WS_DEFLATE_MEM_LEVEL}": _memoria_kb(
+            WS_DEFLATE_WINDOW_BITS, WS_DEFLATE_MEM_LEVEL
+        ),
+    }
+    return {"brotli_disponible": brotli is not None, "http": http, "websocket": websocket}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--repeticiones", type=int, default=500)
+    args = parser.parse_args()
+    print(json.dumps(correr(args), indent=2))
+
+
+if __name__ == "__main__":
+    main()
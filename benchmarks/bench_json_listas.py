@@ -0,0 +1,91 @@
+"""
+Peticiones por segundo de un listado de 100 filas: serialización estándar de
+FastAPI (response_model + jsonable_encoder + json) frente a respuesta_lista
+(TypeAdapter.dump_json directo desde las filas).
+
+Las filas imitan a las del ORM (objetos con atributos, geometrías WKB) para
+no depender de la base de datos (DATABASE_URL debe estar definida, pero no se conecta).
+
+Uso:
+    python -m benchmarks.bench_json_listas --peticiones 2000
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import List
+
+import httpx
+from fastapi import FastAPI
+from geoalchemy2.elements import WKBElement
+from shapely.geometry import Point
+
+from core.responses import respuesta_lista
+from schemas.solicitud import Solicitud
+
+
+def _filas(n: int):
+    ahora = datetime.utcnow()
+    return [
+        SimpleNamespace(
+            id=i, pasajero_id=i % 17, direccion_texto=f"Calle {i} esquina Avenida {i * 3}",
+            precio_ofrecido=12.5 + i, estado="pendiente", fecha_creacion=ahora,
+            origen_geom=WKBElement(Point(-63.18 + i * 1e-4, -17.78).wkb, srid=4326),
+            destino_geom=WKBElement(Point(-63.17, -17.79 + i * 1e-4).wkb, srid=4326),
+        )
+        for i in range(n)
+    ]
+
+
+def _app(filas) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/antes", response_model=List[Solicitud])
+    def antes():
+        return filas
+
+    @app.get("/despues", response_model=List[Solicitud])
+    def despues():
+        return respuesta_lista(Solicitud, filas)
+
+    return app
+
+
+async def _medir(cliente, ruta: str, peticiones: int) -> float:
+    await cliente.get(ruta)
+    inicio = time.perf_counter()
+    for _ in range(peticiones):
+        respuesta = await cliente.get(ruta)
+        respuesta.raise_for_status()
+    return peticiones / (time.perf_counter() - inicio)
+
+
+async def correr(args):
+    app = _app(_filas(args.filas))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as cliente:
+        cuerpo_antes = (await cliente.get("/antes")).json()
+        cuerpo_despues = (await cliente.get("/despues")).json()
+        assert cuerpo_antes == cuerpo_despues, "Las dos rutas deben producir el mismo JSON"
+        rps_antes = await _medir(cliente, "/antes", args.peticiones)
+        rps_despues = await _medir(cliente, "/despues", args.peticiones)
+    return {
+        "filas": args.filas,
+        "peticiones": args.peticiones,
+        "rps_response_model": round(rps_antes, 1),
+        "rps_respuesta_lista": round(rps_despues, 1),
+        "aceleracion": round(rps_despues / rps_antes, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=100)
+    parser.add_argument("--peticiones", type=int, default=2000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(correr(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Simulador de ciudad para comparar la distancia media de recogida entre la
+asignación "primero que responde" actual y la asignación por lotes.
+
+Uso:
+    python -m benchmarks.bench_matching --solicitudes 60 --conductores 80 --rondas 200
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from services.geo import matriz_distancias_km, asignacion_greedy
+
+# Centro arbitrario; la ciudad se modela como un cuadrado de ~15 km de lado
+CENTRO = (-63.18, -17.78)
+SEMI_LADO_GRADOS = 0.07
+
+
+def _puntos(rng: np.random.Generator, n: int) -> np.ndarray:
+    return np.column_stack((
+        CENTRO[0] + rng.uniform(-SEMI_LADO_GRADOS, SEMI_LADO_GRADOS, n),
+        CENTRO[1] + rng.uniform(-SEMI_LADO_GRADOS, SEMI_LADO_GRADOS, n),
+    ))
+
+
+def primero_que_responde(distancias: np.ndarray, radio_km: float, rng: np.random.Generator) -> list:
+    """
+    Cada solicitud, en orden de llegada, la toma un conductor libre al azar
+    entre los que recibieron el broadcast dentro del radio.
+    """
+    libres = np.ones(distancias.shape[1], dtype=bool)
+    resultado = []
+    for fila in range(distancias.shape[0]):
+        candidatos = np.flatnonzero(libres & (distancias[fila] <= radio_km))
+        if candidatos.size == 0:
+            continue
+        columna = rng.choice(candidatos)
+        libres[columna] = False
+        resultado.append(float(distancias[fila, columna]))
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--solicitudes", type=int, default=60)
+    parser.add_argument("--conductores", type=int, default=80)
+    parser.add_argument("--rondas", type=int, default=200)
+    parser.add_argument("--radio-km", type=float, default=5.0)
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.semilla)
+    primero, lote = [], []
+    tiempo_lote = 0.0
+
+    for _ in range(args.rondas):
+        distancias = matriz_distancias_km(_puntos(rng, args.solicitudes), _puntos(rng, args.conductores))
+        primero.extend(primero_que_responde(distancias, args.radio_km, rng))
+
+        inicio = time.perf_counter()
+        asignaciones = asignacion_greedy(distancias, args.radio_km)
+        tiempo_lote += time.perf_counter() - inicio
+        lote.extend(d for _, _, d in asignaciones)
+
+    print(json.dumps({
+        "solicitudes_por_ronda": args.solicitudes,
+        "conductores_por_ronda": args.conductores,
+        "rondas": args.rondas,
+        "primero_que_responde": {"asignados": len(primero), "recogida_media_km": round(float(np.mean(primero)), 3)},
+        "lote_greedy": {
+            "asignados": len(lote),
+            "recogida_media_km": round(float(np.mean(lote)), 3),
+            "ms_por_ronda": round(tiempo_lote * 1000 / args.rondas, 3),
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Sobrecosto por petición del middleware de métricas.
+
+Llama directamente a la pila ASGI con y sin MetricsMiddleware sobre una app
+mínima, para aislar el costo del middleware del resto del framework.
+
+Uso:
+    python -m benchmarks.bench_metrics --peticiones 100000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from core.metrics import MetricsMiddleware
+
+
+class _Ruta:
+    path_format = "/viajes/{viaje_id}/iniciar"
+
+
+async def app_minima(scope, receive, send):
+    scope["route"] = _Ruta
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(mensaje):
+    pass
+
+
+async def medir(app, peticiones: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(peticiones):
+        scope = {"type": "http", "method": "PATCH", "path": "/viajes/1/iniciar"}
+        await app(scope, _receive, _send)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--peticiones", type=int, default=100000)
+    args = parser.parse_args()
+
+    base = asyncio.run(medir(app_minima, args.peticiones))
+    con_metricas = asyncio.run(medir(MetricsMiddleware(app_minima), args.peticiones))
+
+    print(json.dumps({
+        "peticiones": args.peticiones,
+        "us_por_peticion_sin_middleware": round(base * 1e6 / args.peticiones, 3),
+        "us_por_peticion_con_middleware": round(con_metricas * 1e6 / args.peticiones, 3),
+        "sobrecosto_us": round((con_metricas - base) * 1e6 / args.peticiones, 3),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
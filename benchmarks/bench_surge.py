@@ -0,0 +1,66 @@
+"""
+Costo por evento de actualización de la grilla de surge.
+
+Uso:
+    python -m benchmarks.bench_surge --eventos 200000 --conductores 2000
+"""
+import argparse
+import json
+import random
+import time
+
+from services.surge import SurgeGrid
+
+CENTRO = (-63.18, -17.78)
+SEMI_LADO_GRADOS = 0.07
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--eventos", type=int, default=200000)
+    parser.add_argument("--conductores", type=int, default=2000)
+    parser.add_argument("--ventana-s", type=float, default=600.0)
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.semilla)
+    # Reloj simulado: 20 eventos por segundo para que la ventana se llene y expire
+    reloj = {"t": 0.0}
+    grid = SurgeGrid(ventana_s=args.ventana_s, reloj=lambda: reloj["t"])
+
+    def punto():
+        return (
+            CENTRO[0] + rnd.uniform(-SEMI_LADO_GRADOS, SEMI_LADO_GRADOS),
+            CENTRO[1] + rnd.uniform(-SEMI_LADO_GRADOS, SEMI_LADO_GRADOS),
+        )
+
+    eventos = []
+    for _ in range(args.eventos):
+        if rnd.random() < 0.3:
+            eventos.append((None,) + punto())
+        else:
+            eventos.append((rnd.randrange(args.conductores),) + punto())
+
+    inicio = time.perf_counter()
+    for conductor_id, lon, lat in eventos:
+        reloj["t"] += 0.05
+        if conductor_id is None:
+            grid.registrar_solicitud(lon, lat)
+        else:
+            grid.registrar_conductor(conductor_id, lon, lat)
+    duracion = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    celdas = grid.grilla()
+    duracion_grilla = time.perf_counter() - inicio
+
+    print(json.dumps({
+        "eventos": args.eventos,
+        "us_por_evento": round(duracion * 1e6 / args.eventos, 3),
+        "celdas_activas": len(celdas),
+        "ms_grilla": round(duracion_grilla * 1000, 3),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Escalabilidad del fan-out de ConnectionManager.
+
+Abre N clientes WebSocket en proceso contra websocket_endpoint (a través de la
+pila ASGI real de FastAPI/Starlette, con colas en memoria en lugar de red) y mide:
+
+- memoria por conexión inactiva (tracemalloc),
+- tiempo de un broadcast completo y memoria por mensaje,
+- efecto de consumidores lentos (cada envío tarda --retraso-ms) y
+  bloqueados (nunca terminan de recibir) sobre el broadcast.
+
+Uso:
+    python -m benchmarks.bench_websockets --clientes 1000,10000,50000
+"""
+import argparse
+import asyncio
+import gc
+import json
+import time
+import tracemalloc
+
+from fastapi import FastAPI
+
+from api.endpoints import websockets as websockets_endpoints
+from core.websockets import manager
+
+
+class ClienteFalso:
+    def __init__(self, client_id: int, retraso_s: float = 0.0, bloqueado: bool = False):
+        self.client_id = client_id
+        self.retraso_s = retraso_s
+        self.bloqueado = bloqueado
+        self.entrada: asyncio.Queue = asyncio.Queue()
+        self.recibidos = 0
+        self.entrada.put_nowait({"type": "websocket.connect"})
+
+    async def receive(self):
+        return await self.entrada.get()
+
+    async def send(self, mensaje):
+        if mensaje["type"] != "websocket.send":
+            return
+        if self.bloqueado:
+            await asyncio.Event().wait()
+        if self.retraso_s:
+            await asyncio.sleep(self.retraso_s)
+        self.recibidos += 1
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(websockets_endpoints.router, prefix="/ws")
+    return app
+
+
+async def _conectar(app, clientes):
+    tareas = []
+    for cliente in clientes:
+        scope = {
+            "type": "websocket", "path": f"/ws/ws/{cliente.client_id}", "raw_path": b"",
+            "query_string": b"", "headers": [], "subprotocols": [], "scheme": "ws",
+            "server": ("test", 80), "client": ("test", 1), "root_path": "", "app": app,
+        }
+        tareas.append(asyncio.create_task(app(scope, cliente.receive, cliente.send)))
+    while len(manager.active_connections) < len(clientes):
+        await asyncio.sleep(0.01)
+    return tareas
+
+
+async def _cerrar(tareas):
+    # Se cancelan las tareas en lugar de desconectar: cada desconexión hace un
+    # broadcast a todos los demás, lo que volvería cuadrático el cierre
+    for tarea in tareas:
+        tarea.cancel()
+    await asyncio.gather(*tareas, return_exceptions=True)
+    manager.active_connections.clear()
+
+
+async def _broadcast_con_limite(mensaje: str, limite_s: float):
+    inicio = time.perf_counter()
+    try:
+        await asyncio.wait_for(manager.broadcast(mensaje), timeout=limite_s)
+        return time.perf_counter() - inicio, False
+    except asyncio.TimeoutError:
+        return time.perf_counter() - inicio, True
+
+
+async def escenario(n: int, args) -> dict:
+    app = _app()
+    mensaje = "x" * args.tamano_mensaje
+
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    clientes = [ClienteFalso(i) for i in range(n)]
+    tareas = await _conectar(app, clientes)
+    memoria_conexiones = tracemalloc.get_traced_memory()[0] - base
+
+    tracemalloc.reset_peak()
+    antes = tracemalloc.get_traced_memory()[0]
+    duracion, _ = await _broadcast_con_limite(mensaje, args.limite_s)
+    pico = tracemalloc.get_traced_memory()[1] - antes
+    tracemalloc.stop()
+    entregados = sum(c.recibidos for c in clientes)
+    await _cerrar(tareas)
+
+    # Consumidores lentos
+    lentos = max(1, int(n * args.fraccion_lentos))
+    clientes = [ClienteFalso(i, retraso_s=args.retraso_ms / 1000.0 if i < lentos else 0.0) for i in range(n)]
+    tareas = await _conectar(app, clientes)
+    duracion_lentos, agotado_lentos = await _broadcast_con_limite(mensaje, args.limite_s)
+    await _cerrar(tareas)
+
+    # Un único consumidor bloqueado a mitad de la lista
+    clientes = [ClienteFalso(i, bloqueado=(i == n // 2)) for i in range(n)]
+    tareas = await _conectar(app, clientes)
+    duracion_bloqueado, agotado_bloqueado = await _broadcast_con_limite(mensaje, args.limite_s)
+    entregados_bloqueado = sum(c.recibidos for c in clientes)
+    await _cerrar(tareas)
+
+    return {
+        "clientes": n,
+        "bytes_por_conexion_inactiva": round(memoria_conexiones / n),
+        "broadcast_ms": round(duracion * 1000, 2),
+        "entregados": entregados,
+        "bytes_pico_por_mensaje_entregado": round(pico / max(entregados, 1), 1),
+        "lentos": {
+            "clientes_lentos": lentos,
+            "retraso_ms": args.retraso_ms,
+            "broadcast_ms": round(duracion_lentos * 1000, 2),
+            "agotado": agotado_lentos,
+        },
+        "un_bloqueado": {
+            "broadcast_ms": round(duracion_bloqueado * 1000, 2),
+            "agotado": agotado_bloqueado,
+            "entregados_antes_de_bloquearse": entregados_bloqueado,
+        },
+    }
+
+
+async def correr(args):
+    return [await escenario(n, args) for n in args.clientes]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clientes", type=lambda v: [int(x) for x in v.split(",")], default=[1000, 10000, 50000])
+    parser.add_argument("--tamano-mensaje", type=int, default=512)
+    parser.add_argument("--fraccion-lentos", type=float, default=0.01)
+    parser.add_argument("--retraso-ms", type=float, default=50.0)
+    parser.add_argument("--limite-s", type=float, default=10.0, help="Tiempo máximo de espera por broadcast")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(correr(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
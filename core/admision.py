@@ -0,0 +1,241 @@
+"""
+Control de admisión y descarte de carga cuando el worker se satura.
+
+El middleware limita las peticiones HTTP en curso (ADMISSION_MAX_CONCURRENCY,
+por defecto igual al pool de hilos de anyio) y pone en cola al resto. Cuando
+se libera un lugar entra primero la petición de mayor prioridad:
+
+- critica: transiciones de viajes y creación de viajes y solicitudes. Tiene
+  ADMISSION_RESERVED_CRITICAL lugares reservados y la espera más larga.
+- normal: el resto.
+- baja: listados, exportaciones, analítica, búsqueda, importaciones y subida
+  de imágenes.
+
+La sobrecarga se detecta como en CoDel: si en un intervalo completo ninguna
+petición esperó menos de ADMISSION_TARGET_MS, la cola es persistente y no
+una ráfaga. Mientras dura, las peticiones de baja prioridad que no tienen
+lugar se rechazan de inmediato y las normales solo esperan el objetivo. Los
+rechazos son 503 rápidos con Retry-After, en lugar de respuestas que llegan
+tras decenas de segundos.
+"""
+import asyncio
+import os
+import re
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from dotenv import load_dotenv
+from fastapi import status
+from fastapi.responses import JSONResponse
+
+from core.metrics import registry, Counter, Gauge, Histogram
+
+load_dotenv()
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "40"))
+ADMISSION_RESERVED_CRITICAL = int(os.getenv("ADMISSION_RESERVED_CRITICAL", "8"))
+ADMISSION_TARGET_MS = float(os.getenv("ADMISSION_TARGET_MS", "50"))
+ADMISSION_INTERVAL_MS = float(os.getenv("ADMISSION_INTERVAL_MS", "500"))
+# Espera máxima en la cola sin sobrecarga (normal y baja) y para las críticas
+ADMISSION_QUEUE_TIMEOUT_MS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "2000"))
+ADMISSION_CRITICAL_TIMEOUT_MS = float(os.getenv("ADMISSION_CRITICAL_TIMEOUT_MS", "10000"))
+
+CRITICA = "critica"
+NORMAL = "normal"
+BAJA = "baja"
+PRIORIDADES = (CRITICA, NORMAL, BAJA)
+
+# (método o None para cualquiera, patrón de la ruta, prioridad); gana la primera que coincide
+REGLAS_PRIORIDAD = [
+    ("POST", re.compile(r"^/solicitudes/?$"), CRITICA),
+    ("POST", re.compile(r"^/viajes/?$"), CRITICA),
+    ("PATCH", re.compile(r"^/viajes/\d+/(iniciar|finalizar|marcar-pagado|status)$"), CRITICA),
+    (None, re.compile(r"/export$"), BAJA),
+    (None, re.compile(r"^/(analytics|busqueda|debug)(/|$)"), BAJA),
+    ("POST", re.compile(r"^/vehiculos/\d+/imagen$"), BAJA),
+    ("POST", re.compile(r"^/users/conductores/importar$"), BAJA),
+    ("GET", re.compile(r"^/(viajes|solicitudes|users|vehiculos|tarifas)/?$"), BAJA),
+    ("GET", re.compile(r"^/users/conductores$"), BAJA),
+]
+# Nunca se encolan: el scrape de métricas debe responder justo durante la sobrecarga
+RUTAS_EXENTAS = ("/metrics",)
+
+admission_in_flight = registry.register(Gauge(
+    "admission_in_flight", "Peticiones admitidas en curso"
+))
+admission_queue_length = registry.register(Gauge(
+    "admission_queue_length", "Peticiones esperando un lugar, por prioridad", ("prioridad",)
+))
+admission_overloaded = registry.register(Gauge(
+    "admission_overloaded", "1 si el control de admisión detecta cola persistente (CoDel)"
+))
+admission_queue_delay_seconds = registry.register(Histogram(
+    "admission_queue_delay_seconds", "Espera en la cola de admisión", ("prioridad",)
+))
+admission_shed_total = registry.register(Counter(
+    "admission_shed_total", "Peticiones descartadas con 503", ("prioridad", "motivo")
+))
+
+
+def prioridad_de(metodo: str, ruta: str) -> str:
+    for metodo_regla, patron, prioridad in REGLAS_PRIORIDAD:
+        if (metodo_regla is None or metodo_regla == metodo) and patron.search(ruta):
+            return prioridad
+    return NORMAL
+
+
+class ControlAdmision:
+    """Semáforo con colas por prioridad y detección de sobrecarga al estilo CoDel."""
+
+    def __init__(
+        self,
+        max_concurrencia: int = ADMISSION_MAX_CONCURRENCY,
+        reservados_criticos: int = ADMISSION_RESERVED_CRITICAL,
+        objetivo_s: float = ADMISSION_TARGET_MS / 1000,
+        intervalo_s: float = ADMISSION_INTERVAL_MS / 1000,
+        espera_s: float = ADMISSION_QUEUE_TIMEOUT_MS / 1000,
+        espera_critica_s: float = ADMISSION_CRITICAL_TIMEOUT_MS / 1000,
+    ):
+        self.max_concurrencia = max_concurrencia
+        self.reservados_criticos = min(reservados_criticos, max_concurrencia - 1)
+        self.objetivo_s = objetivo_s
+        self.intervalo_s = intervalo_s
+        self.espera_s = espera_s
+        self.espera_critica_s = espera_critica_s
+        self.en_curso = 0
+        self.sobrecargado = False
+        self._esperando: Dict[str, Deque[asyncio.Future]] = {p: deque() for p in PRIORIDADES}
+        self._min_demora = float("inf")
+        self._fin_intervalo = time.monotonic() + intervalo_s
+
+    def _limite(self, prioridad: str) -> int:
+        if prioridad == CRITICA:
+            return self.max_concurrencia
+        return self.max_concurrencia - self.reservados_criticos
+
+    def _hay_espera_prioritaria(self, prioridad: str) -> bool:
+        for otra in PRIORIDADES:
+            if any(not f.done() for f in self._esperando[otra]):
+                return True
+            if otra == prioridad:
+                return False
+        return False
+
+    def _reiniciar_intervalo(self, ahora: float):
+        self._min_demora = float("inf")
+        self._fin_intervalo = ahora + self.intervalo_s
+
+    def revisar_intervalo(self):
+        """
+        Cierra el intervalo si ya venció. Un intervalo sin peticiones no es
+        una cola persistente: no marca sobrecarga y apaga la que hubiera.
+        """
+        ahora = time.monotonic()
+        if ahora >= self._fin_intervalo:
+            self.sobrecargado = self._min_demora != float("inf") and self._min_demora > self.objetivo_s
+            self._reiniciar_intervalo(ahora)
+
+    def _registrar_demora(self, prioridad: str, demora: float):
+        """CoDel: la sobrecarga se decide por la demora mínima de cada intervalo."""
+        self.revisar_intervalo()
+        self._min_demora = min(self._min_demora, demora)
+        admission_queue_delay_seconds.observe(prioridad, valor=demora)
+
+    def _espera_maxima(self, prioridad: str) -> float:
+        if prioridad == CRITICA:
+            return self.espera_critica_s
+        return self.objetivo_s if self.sobrecargado else self.espera_s
+
+    async def entrar(self, prioridad: str) -> Optional[str]:
+        """Devuelve None si la petición fue admitida, o el motivo del rechazo."""
+        if self.en_curso < self._limite(prioridad) and not self._hay_espera_prioritaria(prioridad):
+            self.en_curso += 1
+            self._registrar_demora(prioridad, 0.0)
+            return None
+        if prioridad == BAJA and self.sobrecargado:
+            return "sobrecarga"
+
+        llegada = time.monotonic()
+        futuro = asyncio.get_running_loop().create_future()
+        self._esperando[prioridad].append(futuro)
+        try:
+            await asyncio.wait_for(futuro, self._espera_maxima(prioridad))
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            # Si justo se le había asignado un lugar, se devuelve
+            if futuro.done() and not futuro.cancelled():
+                self.salir()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return "espera"
+        self._registrar_demora(prioridad, time.monotonic() - llegada)
+        return None
+
+    def salir(self):
+        self.en_curso -= 1
+        for prioridad in PRIORIDADES:
+            cola = self._esperando[prioridad]
+            while cola and self.en_curso < self._limite(prioridad):
+                futuro = cola.popleft()
+                if futuro.done():
+                    continue
+                self.en_curso += 1
+                futuro.set_result(None)
+            if cola:
+                # Quedan pendientes de esta prioridad: las inferiores siguen esperando
+                return
+        if self.sobrecargado and self.en_curso < self._limite(BAJA):
+            # Colas vacías y lugares libres: la cola persistente terminó aunque no entre nadie más
+            self.sobrecargado = False
+            self._reiniciar_intervalo(time.monotonic())
+
+    def en_cola(self, prioridad: str) -> int:
+        return sum(1 for f in self._esperando[prioridad] if not f.done())
+
+
+class AdmissionControlMiddleware:
+    """
+    Middleware ASGI que admite, encola o descarta cada petición HTTP según su
+    prioridad. El lugar se ocupa hasta que termina de enviarse la respuesta
+    (incluidas las exportaciones en streaming).
+    """
+
+    def __init__(self, app, control: Optional[ControlAdmision] = None):
+        self.app = app
+        self.control = control or control_admision
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ADMISSION_ENABLED or scope["path"].startswith(RUTAS_EXENTAS):
+            await self.app(scope, receive, send)
+            return
+
+        prioridad = prioridad_de(scope["method"], scope["path"])
+        motivo = await self.control.entrar(prioridad)
+        if motivo is not None:
+            admission_shed_total.inc(prioridad, motivo)
+            respuesta = JSONResponse(
+                {"detail": "El servicio está saturado; vuelve a intentarlo en unos segundos"},
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"}
+            )
+            await respuesta(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.control.salir()
+
+
+control_admision = ControlAdmision()
+
+
+def _actualizar_metricas():
+    control_admision.revisar_intervalo()
+    admission_in_flight.set(valor=control_admision.en_curso)
+    admission_overloaded.set(valor=1 if control_admision.sobrecargado else 0)
+    for prioridad in PRIORIDADES:
+        admission_queue_length.set(prioridad, valor=control_admision.en_cola(prioridad))
+
+
+registry.add_collector(_actualizar_metricas)
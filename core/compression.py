@@ -0,0 +1,191 @@
+"""
+Compresión de respuestas para clientes con datos móviles.
+
+- CompressionMiddleware: middleware ASGI que comprime con brotli (si el
+  paquete está instalado y el cliente lo acepta) o gzip las respuestas de
+  tipos de texto que superan un umbral de tamaño. Las respuestas en streaming
+  se comprimen por fragmentos con flush, de modo que cada fragmento llega al
+  cliente sin esperar al final.
+- WebSocketProtocolDeflate: protocolo de uvicorn con permessage-deflate
+  configurable (ventana y memLevel acotan la memoria por conexión). Se activa
+  con `uvicorn main:app --ws core.compression:WebSocketProtocolDeflate`.
+"""
+import os
+import zlib
+
+from dotenv import load_dotenv
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional; sin él se usa solo gzip
+    brotli = None
+
+load_dotenv()
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+WS_DEFLATE_WINDOW_BITS = int(os.getenv("WS_DEFLATE_WINDOW_BITS", "12"))
+WS_DEFLATE_MEM_LEVEL = int(os.getenv("WS_DEFLATE_MEM_LEVEL", "5"))
+WS_DEFLATE_LEVEL = int(os.getenv("WS_DEFLATE_LEVEL", "6"))
+
+TIPOS_COMPRIMIBLES = ("application/json", "application/x-ndjson", "text/")
+
+
+class _Gzip:
+    nombre = "gzip"
+
+    def __init__(self, nivel: int):
+        self._c = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+
+    def fragmento(self, datos: bytes) -> bytes:
+        return self._c.compress(datos) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def final(self, datos: bytes) -> bytes:
+        return self._c.compress(datos) + self._c.flush()
+
+
+class _Brotli:
+    nombre = "br"
+
+    def __init__(self, calidad: int):
+        self._c = brotli.Compressor(quality=calidad)
+
+    def fragmento(self, datos: bytes) -> bytes:
+        return self._c.process(datos) + self._c.flush()
+
+    def final(self, datos: bytes) -> bytes:
+        return self._c.process(datos) + self._c.finish()
+
+
+def elegir_codificacion(accept_encoding: str):
+    """Devuelve 'br', 'gzip' o None según Accept-Encoding (respetando q=0)."""
+    aceptadas = {}
+    for parte in accept_encoding.lower().split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        calidad = 1.0
+        if parametros.strip().startswith("q="):
+            try:
+                calidad = float(parametros.strip()[2:])
+            except ValueError:
+                calidad = 0.0
+        aceptadas[nombre.strip()] = calidad
+    if brotli is not None and aceptadas.get("br", 0) > 0:
+        return "br"
+    if aceptadas.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app,
+        minimo_bytes: int = COMPRESSION_MIN_BYTES,
+        nivel_gzip: int = COMPRESSION_GZIP_LEVEL,
+        calidad_brotli: int = COMPRESSION_BROTLI_QUALITY,
+    ):
+        self.app = app
+        self.minimo_bytes = minimo_bytes
+        self.nivel_gzip = nivel_gzip
+        self.calidad_brotli = calidad_brotli
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        codificacion = elegir_codificacion(Headers(scope=scope).get("accept-encoding", ""))
+        if codificacion is None:
+            await self.app(scope, receive, send)
+            return
+        respuesta = _RespuestaComprimida(self, codificacion, send)
+        await self.app(scope, receive, respuesta.send)
+
+    def compresor(self, codificacion: str):
+        if codificacion == "br":
+            return _Brotli(self.calidad_brotli)
+        return _Gzip(self.nivel_gzip)
+
+
+class _RespuestaComprimida:
+    def __init__(self, middleware: CompressionMiddleware, codificacion: str, send):
+        self.middleware = middleware
+        self.codificacion = codificacion
+        self._send = send
+        self.inicio = None
+        self.compresor = None
+        self.sin_comprimir = False
+
+    def _comprimible(self, cuerpo: bytes, hay_mas: bool) -> bool:
+        if self.inicio["status"] in (204, 304):
+            return False
+        cabeceras = Headers(raw=self.inicio["headers"])
+        if "content-encoding" in cabeceras:
+            return False
+        if not cabeceras.get("content-type", "").startswith(TIPOS_COMPRIMIBLES):
+            return False
+        return hay_mas or len(cuerpo) >= self.middleware.minimo_bytes
+
+    async def send(self, mensaje):
+        tipo = mensaje["type"]
+        if tipo == "http.response.start":
+            self.inicio = mensaje
+            return
+        if tipo != "http.response.body" or self.sin_comprimir:
+            await self._send(mensaje)
+            return
+
+        cuerpo = mensaje.get("body", b"")
+        hay_mas = mensaje.get("more_body", False)
+
+        if self.compresor is None:
+            if not self._comprimible(cuerpo, hay_mas):
+                self.sin_comprimir = True
+                await self._send(self.inicio)
+                await self._send(mensaje)
+                return
+
+            self.compresor = self.middleware.compresor(self.codificacion)
+            cabeceras = MutableHeaders(scope=self.inicio)
+            cabeceras["Content-Encoding"] = self.compresor.nombre
+            cabeceras.add_vary_header("Accept-Encoding")
+            del cabeceras["Content-Length"]
+            if not hay_mas:
+                cuerpo = self.compresor.final(cuerpo)
+                cabeceras["Content-Length"] = str(len(cuerpo))
+                await self._send(self.inicio)
+                await self._send({"type": "http.response.body", "body": cuerpo})
+                return
+            await self._send(self.inicio)
+
+        if hay_mas:
+            datos = self.compresor.fragmento(cuerpo)
+        else:
+            datos = self.compresor.final(cuerpo)
+        await self._send({"type": "http.response.body", "body": datos, "more_body": hay_mas})
+
+
+def _fabrica_deflate():
+    from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory
+
+    return ServerPerMessageDeflateFactory(
+        server_max_window_bits=WS_DEFLATE_WINDOW_BITS,
+        compress_settings={"memLevel": WS_DEFLATE_MEM_LEVEL, "level": WS_DEFLATE_LEVEL},
+    )
+
+
+try:
+    from uvicorn.protocols.websockets.websockets_impl import WebSocketProtocol as _WebSocketProtocol
+except ImportError:  # uvicorn sin soporte de websockets
+    _WebSocketProtocol = None
+
+if _WebSocketProtocol is not None:
+    class WebSocketProtocolDeflate(_WebSocketProtocol):
+        """Protocolo WebSocket de uvicorn con permessage-deflate ajustado por variables de entorno."""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            if self.config.ws_per_message_deflate:
+                self.available_extensions = [_fabrica_deflate()]
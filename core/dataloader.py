@@ -0,0 +1,52 @@
+"""
+Carga por lotes al estilo DataLoader para una petición.
+
+Los consumidores piden claves (por ejemplo, los vehiculo_id de una página de
+viajes) y el cargador las resuelve todas con una sola llamada a la función
+de lote, típicamente un `WHERE id IN (...)`. Las claves repetidas se piden
+una sola vez y los resultados quedan en caché mientras viva el cargador,
+que debe crearse por petición (usa la sesión de esa petición).
+"""
+from typing import Callable, Dict, Generic, Hashable, Iterable, List, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class DataLoader(Generic[K, V]):
+    def __init__(self, cargar_lote: Callable[[List[K]], Dict[K, V]]):
+        self._cargar_lote = cargar_lote
+        self._cache: Dict[K, Optional[V]] = {}
+        self._pendientes: List[K] = []
+
+    def pedir(self, clave: Optional[K]):
+        """Encola una clave para el próximo lote (None se ignora)."""
+        if clave is not None and clave not in self._cache and clave not in self._pendientes:
+            self._pendientes.append(clave)
+
+    def pedir_varios(self, claves: Iterable[Optional[K]]):
+        for clave in claves:
+            self.pedir(clave)
+
+    def despachar(self):
+        """Resuelve todas las claves pendientes con una sola llamada a la función de lote."""
+        if not self._pendientes:
+            return
+        claves, self._pendientes = self._pendientes, []
+        encontrados = self._cargar_lote(claves)
+        for clave in claves:
+            self._cache[clave] = encontrados.get(clave)
+
+    def obtener(self, clave: Optional[K]) -> Optional[V]:
+        if clave is None:
+            return None
+        self.pedir(clave)
+        self.despachar()
+        return self._cache[clave]
+
+    def obtener_varios(self, claves: Iterable[K]) -> List[V]:
+        """Valores de las claves en el orden pedido, omitiendo las que no existen."""
+        claves = list(claves)
+        self.pedir_varios(claves)
+        self.despachar()
+        return [self._cache[c] for c in claves if self._cache.get(c) is not None]
@@ -0,0 +1,81 @@
+"""
+Exportación en streaming (NDJSON o CSV) para los informes de operadores.
+
+Las consultas de exportación devuelven tuplas con un cursor del lado del
+servidor (yield_per), y aquí se convierten en fragmentos de texto a medida
+que llegan: la memoria no depende de la cantidad de filas y todo el informe
+sale de una sola consulta. Cada fragmento agrupa un lote de filas para que
+el middleware de compresión no haga un flush por fila.
+"""
+import csv
+import enum
+import io
+import json
+from datetime import date, datetime
+from typing import Iterable, Sequence
+
+from fastapi.responses import StreamingResponse
+
+FILAS_POR_FRAGMENTO = 500
+
+FORMATOS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _valor(valor):
+    if isinstance(valor, enum.Enum):
+        return valor.value
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return valor
+
+
+def _ndjson(columnas: Sequence[str], filas: Iterable, filas_por_fragmento: int):
+    lineas = []
+    for fila in filas:
+        lineas.append(json.dumps(dict(zip(columnas, map(_valor, fila))), ensure_ascii=False))
+        if len(lineas) >= filas_por_fragmento:
+            lineas.append("")
+            yield "\n".join(lineas).encode()
+            lineas = []
+    if lineas:
+        lineas.append("")
+        yield "\n".join(lineas).encode()
+
+
+def _csv(columnas: Sequence[str], filas: Iterable, filas_por_fragmento: int):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(columnas)
+    pendientes = 0
+    for fila in filas:
+        escritor.writerow([_valor(v) for v in fila])
+        pendientes += 1
+        if pendientes >= filas_por_fragmento:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            pendientes = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def respuesta_exportacion(
+    columnas: Sequence[str],
+    filas: Iterable,
+    formato: str,
+    nombre_archivo: str,
+    filas_por_fragmento: int = FILAS_POR_FRAGMENTO
+) -> StreamingResponse:
+    """
+    Respuesta en streaming con las filas (tuplas en el orden de `columnas`)
+    en formato 'ndjson' o 'csv', descargable como archivo.
+    """
+    generador = _csv if formato == "csv" else _ndjson
+    return StreamingResponse(
+        generador(columnas, filas, filas_por_fragmento),
+        media_type=FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre_archivo}.{formato}"'}
+    )
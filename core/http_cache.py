@@ -0,0 +1,96 @@
+"""
+GET condicionales y caché de respuestas para recursos que cambian poco.
+
+El ETag fuerte se arma con el tipo, el id y la marca de fecha_actualizacion
+de la fila, así que puede calcularse con una consulta mínima, sin cargar ni
+serializar el recurso. Si coincide con If-None-Match se responde 304; si no,
+se reutilizan los bytes guardados en una caché LRU local cuando el ETag
+coincide, y solo en último caso se serializa. Las funciones de escritura del
+repositorio invalidan las entradas afectadas.
+"""
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Hashable, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi import Request, Response
+
+load_dotenv()
+
+HTTP_CACHE_SIZE = int(os.getenv("HTTP_CACHE_SIZE", "2000"))
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def calcular_etag(tipo: str, recurso_id, fecha_actualizacion: Optional[datetime]) -> str:
+    marca = int((fecha_actualizacion.replace(tzinfo=None) - EPOCH).total_seconds() * 1_000_000) if fecha_actualizacion else 0
+    return f'"{tipo}-{recurso_id}-{marca}"'
+
+
+def coincide_etag(request: Request, etag: str) -> bool:
+    cabecera = request.headers.get("if-none-match")
+    if not cabecera:
+        return False
+    if cabecera.strip() == "*":
+        return True
+    candidatos = (valor.strip() for valor in cabecera.split(","))
+    return any(candidato.removeprefix("W/") == etag for candidato in candidatos)
+
+
+class CacheRespuestas:
+    def __init__(self, max_entradas: int = HTTP_CACHE_SIZE):
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        # (tipo, clave) -> (etag, cuerpo)
+        self._entradas: "OrderedDict[Tuple[str, Hashable], Tuple[str, bytes]]" = OrderedDict()
+
+    def get(self, clave: Tuple[str, Hashable], etag: str) -> Optional[bytes]:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada[0] != etag:
+                return None
+            self._entradas.move_to_end(clave)
+            return entrada[1]
+
+    def put(self, clave: Tuple[str, Hashable], etag: str, cuerpo: bytes):
+        with self._lock:
+            self._entradas[clave] = (etag, cuerpo)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def invalidar(self, tipo: str, clave: Optional[Hashable] = None):
+        """Elimina una entrada, o todas las de un tipo si no se indica la clave."""
+        with self._lock:
+            if clave is not None:
+                self._entradas.pop((tipo, clave), None)
+                return
+            for llave in [llave for llave in self._entradas if llave[0] == tipo]:
+                del self._entradas[llave]
+
+
+cache_respuestas = CacheRespuestas()
+
+
+def respuesta_condicional(
+    request: Request,
+    clave: Tuple[str, Hashable],
+    etag: str,
+    cache_control: str,
+    serializar: Callable[[], bytes],
+) -> Response:
+    """
+    Responde 304 si el cliente ya tiene la versión actual; si no, devuelve el
+    cuerpo en caché para ese ETag o lo serializa con `serializar`.
+    """
+    cabeceras = {"ETag": etag, "Cache-Control": cache_control}
+    if coincide_etag(request, etag):
+        return Response(status_code=304, headers=cabeceras)
+
+    cuerpo = cache_respuestas.get(clave, etag)
+    if cuerpo is None:
+        cuerpo = serializar()
+        cache_respuestas.put(clave, etag, cuerpo)
+    return Response(content=cuerpo, media_type="application/json", headers=cabeceras)
@@ -0,0 +1,161 @@
+"""
+Métricas del proceso en formato de texto de Prometheus.
+
+Registro mínimo sin dependencias externas: contadores, gauges e histogramas
+con etiquetas, más colectores que calculan valores al momento del scrape.
+Todas las actualizaciones ocurren en el hilo del event loop, por lo que no
+se usan locks.
+"""
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _formatear_etiquetas(nombres: Sequence[str], valores: Sequence[str], extra: str = "") -> str:
+    partes = [
+        f'{nombre}="{str(valor).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for nombre, valor in zip(nombres, valores)
+    ]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def _formatear_valor(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+class Counter:
+    tipo = "counter"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.valores: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *valores_etiquetas: str, cantidad: float = 1.0):
+        self.valores[valores_etiquetas] = self.valores.get(valores_etiquetas, 0.0) + cantidad
+
+    def muestras(self) -> Iterable[str]:
+        for valores, valor in self.valores.items():
+            yield f"{self.nombre}{_formatear_etiquetas(self.etiquetas, valores)} {_formatear_valor(valor)}"
+
+
+class Gauge(Counter):
+    tipo = "gauge"
+
+    def set(self, *valores_etiquetas: str, valor: float):
+        self.valores[valores_etiquetas] = valor
+
+    def dec(self, *valores_etiquetas: str, cantidad: float = 1.0):
+        self.inc(*valores_etiquetas, cantidad=-cantidad)
+
+
+class Histogram:
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (), buckets: Sequence[float] = BUCKETS_LATENCIA):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.buckets = tuple(buckets)
+        # etiquetas -> [conteo por bucket (no acumulado) + desborde, suma]
+        self.valores: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, *valores_etiquetas: str, valor: float):
+        serie = self.valores.get(valores_etiquetas)
+        if serie is None:
+            serie = ([0] * (len(self.buckets) + 1), [0.0])
+            self.valores[valores_etiquetas] = serie
+        serie[0][bisect_left(self.buckets, valor)] += 1
+        serie[1][0] += valor
+
+    def muestras(self) -> Iterable[str]:
+        for valores, (conteos, suma) in self.valores.items():
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (float("inf"),), conteos):
+                acumulado += conteo
+                etiquetas = _formatear_etiquetas(self.etiquetas, valores, f'le="{_formatear_valor(limite)}"')
+                yield f"{self.nombre}_bucket{etiquetas} {acumulado}"
+            etiquetas = _formatear_etiquetas(self.etiquetas, valores)
+            yield f"{self.nombre}_sum{etiquetas} {_formatear_valor(suma[0])}"
+            yield f"{self.nombre}_count{etiquetas} {acumulado}"
+
+
+class Registry:
+    def __init__(self):
+        self._metricas = []
+        self._colectores: List[Callable[[], None]] = []
+
+    def register(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def add_collector(self, colector: Callable[[], None]):
+        """Registra una función que actualiza gauges justo antes de cada scrape."""
+        self._colectores.append(colector)
+
+    def render(self) -> str:
+        for colector in self._colectores:
+            colector()
+        lineas = []
+        for metrica in self._metricas:
+            lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+            lineas.extend(metrica.muestras())
+        return "\n".join(lineas) + "\n"
+
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "Peticiones HTTP atendidas", ("method", "route", "status_class")
+))
+http_requests_in_progress = registry.register(Gauge(
+    "http_requests_in_progress", "Peticiones HTTP en curso", ("method",)
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP por ruta", ("method", "route")
+))
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI puro (sin BaseHTTPMiddleware) que mide cada petición HTTP
+    y la etiqueta con la plantilla de la ruta, p. ej. /viajes/{viaje_id}/iniciar.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        estado = [500]
+
+        async def send_con_estado(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado[0] = mensaje["status"]
+            await send(mensaje)
+
+        http_requests_in_progress.inc(method)
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_con_estado)
+        finally:
+            duracion = time.perf_counter() - inicio
+            http_requests_in_progress.dec(method)
+            route = scope.get("route")
+            plantilla = getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+            http_requests_total.inc(method, plantilla, f"{estado[0] // 100}xx")
+            http_request_duration_seconds.observe(method, plantilla, valor=duracion)
@@ -0,0 +1,147 @@
+"""
+Perfilado bajo demanda del worker en ejecución.
+
+- Muestreador: un hilo que cada N ms toma la pila de todos los hilos con
+  sys._current_frames() y acumula pilas colapsadas ("f1;f2;f3 conteo"), el
+  formato que consumen flamegraph.pl y speedscope.
+- Snapshot de memoria: diferencia de tracemalloc entre dos instantes.
+- ProfilingMiddleware: perfila el worker mientras dura una petición que trae
+  la cabecera X-Profile-Token; el resultado se consulta luego por su
+  X-Profile-Id. Es un perfil de todo el proceso: si hay otras peticiones
+  concurrentes, sus pilas también aparecen. La raíz de cada pila es el
+  nombre del hilo, para poder separarlas.
+
+Solo puede haber un perfilado activo por worker a la vez.
+"""
+import os
+import sys
+import threading
+import tracemalloc
+import uuid
+from collections import Counter, OrderedDict
+from typing import Optional
+
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+
+load_dotenv()
+
+# Sin token configurado el perfilado por petición queda desactivado
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_REQUEST_INTERVAL_MS = float(os.getenv("PROFILE_REQUEST_INTERVAL_MS", "1"))
+PERFILES_GUARDADOS_MAX = 20
+
+perfil_lock = threading.Lock()
+perfiles_recientes: "OrderedDict[str, str]" = OrderedDict()
+
+
+def _etiqueta_frame(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Muestreador(threading.Thread):
+    def __init__(self, intervalo_s: float):
+        super().__init__(name="muestreador-perfil", daemon=True)
+        self.intervalo_s = intervalo_s
+        self.conteos: Counter = Counter()
+        self.muestras = 0
+        self._detener = threading.Event()
+
+    def run(self):
+        propio = threading.get_ident()
+        while not self._detener.wait(self.intervalo_s):
+            nombres = {hilo.ident: hilo.name for hilo in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == propio:
+                    continue
+                pila = []
+                while frame is not None:
+                    pila.append(_etiqueta_frame(frame))
+                    frame = frame.f_back
+                pila.append(nombres.get(ident, str(ident)))
+                self.conteos[";".join(reversed(pila))] += 1
+            self.muestras += 1
+
+    def detener(self):
+        self._detener.set()
+        self.join()
+
+    def colapsado(self) -> str:
+        return "\n".join(f"{pila} {conteo}" for pila, conteo in self.conteos.most_common()) + "\n"
+
+
+def snapshot_memoria_inicio() -> tuple:
+    """Inicia tracemalloc si hace falta y toma el snapshot base."""
+    ya_activo = tracemalloc.is_tracing()
+    if not ya_activo:
+        tracemalloc.start(10)
+    return ya_activo, tracemalloc.take_snapshot()
+
+
+def snapshot_memoria_fin(ya_activo: bool, antes, filtro: Optional[str], top: int) -> dict:
+    """Compara contra el snapshot base y devuelve los sitios de asignación que más crecieron."""
+    despues = tracemalloc.take_snapshot()
+    actual, pico = tracemalloc.get_traced_memory()
+    if not ya_activo:
+        tracemalloc.stop()
+
+    if filtro:
+        filtros = [tracemalloc.Filter(True, f"*{filtro}*")]
+        antes = antes.filter_traces(filtros)
+        despues = despues.filter_traces(filtros)
+
+    diferencias = despues.compare_to(antes, "lineno")[:top]
+    return {
+        "memoria_trazada_kb": round(actual / 1024, 1),
+        "pico_kb": round(pico / 1024, 1),
+        "top": [
+            {
+                "sitio": str(estadistica.traceback[0]),
+                "tamano_kb": round(estadistica.size / 1024, 1),
+                "diferencia_kb": round(estadistica.size_diff / 1024, 1),
+                "bloques": estadistica.count,
+            }
+            for estadistica in diferencias
+        ],
+    }
+
+
+def guardar_perfil(perfil_id: str, colapsado: str):
+    perfiles_recientes[perfil_id] = colapsado
+    while len(perfiles_recientes) > PERFILES_GUARDADOS_MAX:
+        perfiles_recientes.popitem(last=False)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROFILE_TOKEN:
+            await self.app(scope, receive, send)
+            return
+
+        token = dict(scope.get("headers", [])).get(b"x-profile-token")
+        if token is None or token.decode("latin-1") != PROFILE_TOKEN or not perfil_lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        perfil_id = uuid.uuid4().hex
+
+        async def send_con_id(mensaje):
+            if mensaje["type"] == "http.response.start":
+                cabeceras = list(mensaje.get("headers", []))
+                cabeceras.append((b"x-profile-id", perfil_id.encode("latin-1")))
+                mensaje = {**mensaje, "headers": cabeceras}
+            await send(mensaje)
+
+        muestreador = Muestreador(PROFILE_REQUEST_INTERVAL_MS / 1000.0)
+        muestreador.start()
+        try:
+            await self.app(scope, receive, send_con_id)
+        finally:
+            # join() espera al hilo: no debe bloquear el event loop
+            await run_in_threadpool(muestreador.detener)
+            guardar_perfil(perfil_id, muestreador.colapsado())
+            perfil_lock.release()
@@ -0,0 +1,232 @@
+"""
+Limitación de peticiones con token buckets por clase de ruta.
+
+Cada clase (login, registro, solicitudes) tiene una capacidad y un período:
+"10/60" permite ráfagas de 10 peticiones y recarga 10 tokens cada 60 s. El
+bucket se identifica por clase y por IP (rutas anónimas, en el middleware) o
+por usuario (rutas autenticadas, con la dependencia limitar_por_usuario).
+
+Detrás de un proxy la IP del socket es la del proxy. Si esa IP está en
+RATE_LIMIT_TRUSTED_PROXIES (redes separadas por comas; por defecto solo
+loopback, así que cada despliegue debe nombrar la de su proxy), el cliente
+se toma de X-Forwarded-For recorriéndolo de derecha a izquierda hasta la
+primera dirección que no es un proxy de confianza. Las entradas que agregó el propio cliente, a la izquierda, no
+cuentan.
+
+Backends (RATE_LIMIT_BACKEND):
+- memoria: un dict clave -> (tokens, última consulta) por worker. Los buckets
+  que ya se recargaron por completo se descartan periódicamente, así que el
+  tamaño depende de los clientes activos y no de los históricos. Con varios
+  workers cada uno lleva su propia cuenta.
+- postgres: tabla UNLOGGED compartida por todos los workers; cada consulta es
+  un único INSERT ... ON CONFLICT. Si la base falla, la petición se permite.
+"""
+import ipaddress
+import logging
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from core.metrics import registry, Counter
+from database.database import SessionLocal
+from repository import limite_tasa as repository_limite_tasa
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memoria")
+# Cada cuánto se descartan los buckets llenos (memoria) o sin uso (postgres)
+RATE_LIMIT_PURGE_SECONDS = float(os.getenv("RATE_LIMIT_PURGE_SECONDS", "60"))
+RATE_LIMIT_TRUSTED_PROXIES = os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "127.0.0.0/8,::1/128")
+
+LOGIN = "login"
+REGISTRO = "registro"
+SOLICITUDES = "solicitudes"
+
+LIMITES_POR_DEFECTO = {
+    LOGIN: "10/60",
+    REGISTRO: "5/3600",
+    SOLICITUDES: "10/60",
+}
+
+rate_limit_rejected_total = registry.register(Counter(
+    "rate_limit_rejected_total", "Peticiones rechazadas con 429 por el limitador", ("clase",)
+))
+
+
+def leer_limite(valor: str) -> Tuple[float, float]:
+    """'capacidad/segundos' -> (capacidad, tokens por segundo)."""
+    capacidad, periodo = valor.split("/")
+    return float(capacidad), float(capacidad) / float(periodo)
+
+
+def leer_redes(valor: str) -> List[ipaddress._BaseNetwork]:
+    return [ipaddress.ip_network(red.strip(), strict=False) for red in valor.split(",") if red.strip()]
+
+
+PROXIES_CONFIABLES = leer_redes(RATE_LIMIT_TRUSTED_PROXIES)
+
+
+def es_proxy_confiable(ip: str, redes: List[ipaddress._BaseNetwork] = PROXIES_CONFIABLES) -> bool:
+    try:
+        direccion = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(direccion in red for red in redes)
+
+
+def ip_cliente(scope, redes: List[ipaddress._BaseNetwork] = PROXIES_CONFIABLES) -> str:
+    """IP del cliente: la del socket, o la de X-Forwarded-For si llegó por un proxy de confianza."""
+    cliente = scope.get("client")
+    ip = cliente[0] if cliente else "desconocido"
+    if not es_proxy_confiable(ip, redes):
+        return ip
+    reenviado = [
+        valor.decode("latin-1") for nombre, valor in scope.get("headers", []) if nombre == b"x-forwarded-for"
+    ]
+    saltos = [salto.strip() for salto in ",".join(reenviado).split(",") if salto.strip()]
+    for salto in reversed(saltos):
+        ip = salto
+        if not es_proxy_confiable(salto, redes):
+            break
+    return ip
+
+
+class BucketsMemoria:
+    def __init__(self, purgar_cada_s: float = RATE_LIMIT_PURGE_SECONDS):
+        self.purgar_cada_s = purgar_cada_s
+        self._lock = threading.Lock()
+        # clave -> (tokens, última consulta, segundos hasta llenarse desde esa consulta)
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+        self._proxima_purga = time.monotonic() + purgar_cada_s
+
+    def _purgar(self, ahora: float):
+        self._buckets = {
+            clave: bucket for clave, bucket in self._buckets.items() if bucket[1] + bucket[2] > ahora
+        }
+        self._proxima_purga = ahora + self.purgar_cada_s
+
+    def consumir(self, clave: str, capacidad: float, tasa: float) -> Tuple[bool, float]:
+        ahora = time.monotonic()
+        with self._lock:
+            if ahora >= self._proxima_purga:
+                self._purgar(ahora)
+            bucket = self._buckets.get(clave)
+            tokens = capacidad if bucket is None else min(capacidad, bucket[0] + (ahora - bucket[1]) * tasa)
+            permitido = tokens >= 1
+            if permitido:
+                tokens -= 1
+            self._buckets[clave] = (tokens, ahora, (capacidad - tokens) / tasa)
+        return permitido, tokens
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class BucketsPostgres:
+    def __init__(self, purgar_cada_s: float = RATE_LIMIT_PURGE_SECONDS):
+        self.purgar_cada_s = purgar_cada_s
+        self._proxima_purga = time.time() + purgar_cada_s
+        self._inactividad_s = 0.0
+
+    def consumir(self, clave: str, capacidad: float, tasa: float) -> Tuple[bool, float]:
+        ahora = time.time()
+        self._inactividad_s = max(self._inactividad_s, capacidad / tasa)
+        db = SessionLocal()
+        try:
+            permitido, tokens = repository_limite_tasa.consumir_token(db, clave, capacidad, tasa, ahora)
+            if ahora >= self._proxima_purga:
+                self._proxima_purga = ahora + self.purgar_cada_s
+                repository_limite_tasa.purgar_buckets(db, ahora - self._inactividad_s)
+        except Exception:
+            logger.exception("Falló el limitador compartido; se permite la petición")
+            return True, capacidad
+        finally:
+            db.close()
+        return permitido, tokens
+
+
+class LimitadorTasa:
+    def __init__(self, backend: str = RATE_LIMIT_BACKEND, habilitado: bool = RATE_LIMIT_ENABLED):
+        self.habilitado = habilitado
+        self.buckets = BucketsPostgres() if backend == "postgres" else BucketsMemoria()
+        self.limites = {
+            clase: leer_limite(os.getenv(f"RATE_LIMIT_{clase.upper()}", valor))
+            for clase, valor in LIMITES_POR_DEFECTO.items()
+        }
+
+    def consumir(self, clase: str, identificador: str) -> Optional[int]:
+        """
+        Consume un token del bucket (clase, identificador). Devuelve None si la
+        petición se permite, o los segundos de espera para el Retry-After.
+        """
+        if not self.habilitado:
+            return None
+        capacidad, tasa = self.limites[clase]
+        permitido, tokens = self.buckets.consumir(f"{clase}:{identificador}", capacidad, tasa)
+        if permitido:
+            return None
+        rate_limit_rejected_total.inc(clase)
+        return max(1, math.ceil((1 - tokens) / tasa))
+
+
+limitador = LimitadorTasa()
+
+DETALLE_429 = "Demasiadas peticiones; vuelve a intentarlo más tarde"
+
+
+def error_limite(reintentar_en: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=DETALLE_429,
+        headers={"Retry-After": str(reintentar_en)}
+    )
+
+
+class RateLimitMiddleware:
+    """
+    Middleware ASGI que limita por IP las rutas anónimas costosas antes de
+    leer el cuerpo: el login (bcrypt) y el registro de usuarios.
+    """
+
+    RUTAS = {
+        ("POST", "/auth/token"): LOGIN,
+        ("POST", "/users"): REGISTRO,
+    }
+
+    def __init__(self, app, limitador_tasa: LimitadorTasa = limitador):
+        self.app = app
+        self.limitador = limitador_tasa
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.limitador.habilitado:
+            await self.app(scope, receive, send)
+            return
+        clase = self.RUTAS.get((scope["method"], scope["path"].rstrip("/")))
+        if clase is None:
+            await self.app(scope, receive, send)
+            return
+
+        ip = ip_cliente(scope)
+        if isinstance(self.limitador.buckets, BucketsPostgres):
+            reintentar_en = await run_in_threadpool(self.limitador.consumir, clase, ip)
+        else:
+            reintentar_en = self.limitador.consumir(clase, ip)
+        if reintentar_en is None:
+            await self.app(scope, receive, send)
+            return
+        respuesta = JSONResponse(
+            {"detail": DETALLE_429},
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            headers={"Retry-After": str(reintentar_en)}
+        )
+        await respuesta(scope, receive, send)
@@ -0,0 +1,40 @@
+"""
+Serialización rápida de listas de filas ORM.
+
+FastAPI valida cada elemento con el response_model, lo convierte a dict con
+jsonable_encoder y recién entonces lo codifica con json de la stdlib. Para los
+listados de hasta cientos de filas usamos un TypeAdapter de Pydantic por
+esquema: valida directamente desde los atributos de las filas y
+dump_json produce los bytes en Rust, sin dicts intermedios.
+"""
+from typing import Dict, List, Type
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+_adaptadores: Dict[type, TypeAdapter] = {}
+
+
+def _adaptador(esquema: Type) -> TypeAdapter:
+    adaptador = _adaptadores.get(esquema)
+    if adaptador is None:
+        adaptador = TypeAdapter(List[esquema])
+        _adaptadores[esquema] = adaptador
+    return adaptador
+
+
+def serializar_lista(esquema: Type, filas) -> bytes:
+    adaptador = _adaptador(esquema)
+    return adaptador.dump_json(adaptador.validate_python(filas, from_attributes=True))
+
+
+def respuesta_lista(esquema: Type, filas) -> Response:
+    """
+    Respuesta JSON para una lista de filas ORM según el esquema dado.
+    La ruta conserva su response_model para la documentación de OpenAPI.
+    """
+    return Response(content=serializar_lista(esquema, filas), media_type="application/json")
+
+
+def serializar_objeto(esquema: Type, fila) -> bytes:
+    return esquema.model_validate(fila).model_dump_json().encode()
@@ -0,0 +1,133 @@
+"""
+Trazado de consultas SQL por petición.
+
+Los eventos del engine de SQLAlchemy atribuyen cada sentencia y su duración a
+la petición en curso (vía contextvars, que Starlette copia a los hilos del
+threadpool). Al responder se agrega la cabecera Server-Timing, se registran en
+el log las peticiones que exceden el presupuesto de consultas o de tiempo en
+base de datos y se marcan las sentencias idénticas repetidas (patrón N+1).
+"""
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+from core.metrics import registry, Counter, Histogram
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SQL_TRACING_ENABLED = os.getenv("SQL_TRACING_ENABLED", "true").lower() == "true"
+SQL_QUERY_BUDGET = int(os.getenv("SQL_QUERY_BUDGET", "15"))
+SQL_TIME_BUDGET_MS = float(os.getenv("SQL_TIME_BUDGET_MS", "200"))
+# Veces que una misma sentencia puede repetirse en una petición antes de marcarla como N+1
+SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "5"))
+
+http_request_sql_queries = registry.register(Histogram(
+    "http_request_sql_queries", "Consultas SQL por petición", ("route",),
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100)
+))
+http_request_sql_seconds = registry.register(Histogram(
+    "http_request_sql_seconds", "Tiempo en base de datos por petición", ("route",)
+))
+sql_n_plus_one_total = registry.register(Counter(
+    "sql_n_plus_one_total", "Peticiones con sentencias repetidas (posible N+1)", ("route",)
+))
+
+
+class TrazaSQL:
+    __slots__ = ("consultas", "segundos", "por_sentencia")
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+        self.por_sentencia: Dict[str, int] = {}
+
+    def registrar(self, sentencia: str, segundos: float):
+        self.consultas += 1
+        self.segundos += segundos
+        self.por_sentencia[sentencia] = self.por_sentencia.get(sentencia, 0) + 1
+
+    def repetidas(self, umbral: int) -> Dict[str, int]:
+        return {sentencia: veces for sentencia, veces in self.por_sentencia.items() if veces >= umbral}
+
+
+_traza_actual: ContextVar[Optional[TrazaSQL]] = ContextVar("traza_sql", default=None)
+
+
+def traza_actual() -> Optional[TrazaSQL]:
+    return _traza_actual.get()
+
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    # El inicio va en el contexto de ejecución de la sentencia: si falla, se
+    # descarta con ella en lugar de quedar en la conexión del pool
+    if _traza_actual.get() is not None and context is not None:
+        context._inicio_traza = time.perf_counter()
+
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    traza = _traza_actual.get()
+    inicio = getattr(context, "_inicio_traza", None)
+    if traza is None or inicio is None:
+        return
+    traza.registrar(statement, time.perf_counter() - inicio)
+
+
+def instalar_trazado(engine):
+    """Engancha los eventos de trazado al engine."""
+    event.listen(engine, "before_cursor_execute", _antes_de_ejecutar)
+    event.listen(engine, "after_cursor_execute", _despues_de_ejecutar)
+
+
+class SQLTracingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traza = TrazaSQL()
+        token = _traza_actual.set(traza)
+
+        async def send_con_timing(mensaje):
+            if mensaje["type"] == "http.response.start":
+                cabeceras = list(mensaje.get("headers", []))
+                valor = f'db;dur={traza.segundos * 1000:.1f};desc="{traza.consultas} queries"'
+                cabeceras.append((b"server-timing", valor.encode("latin-1")))
+                mensaje = {**mensaje, "headers": cabeceras}
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, send_con_timing)
+        finally:
+            _traza_actual.reset(token)
+            self._evaluar(scope, traza)
+
+    def _evaluar(self, scope, traza: TrazaSQL):
+        route = scope.get("route")
+        plantilla = getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+        http_request_sql_queries.observe(plantilla, valor=traza.consultas)
+        http_request_sql_seconds.observe(plantilla, valor=traza.segundos)
+
+        repetidas = traza.repetidas(SQL_REPEAT_THRESHOLD)
+        if repetidas:
+            sql_n_plus_one_total.inc(plantilla)
+            for sentencia, veces in repetidas.items():
+                logger.warning(
+                    "Posible N+1 en %s %s: sentencia repetida %d veces: %s",
+                    scope["method"], plantilla, veces, " ".join(sentencia.split())[:300]
+                )
+
+        if traza.consultas > SQL_QUERY_BUDGET or traza.segundos * 1000 > SQL_TIME_BUDGET_MS:
+            logger.warning(
+                "Petición %s %s excede el presupuesto de base de datos: %d consultas, %.1f ms",
+                scope["method"], plantilla, traza.consultas, traza.segundos * 1000
+            )
@@ -1,13 +1,30 @@
 from typing import Dict
 from fastapi import WebSocket
+from core.metrics import registry, Counter, Gauge
+
+websocket_connections = registry.register(Gauge(
+    "websocket_connections", "Conexiones WebSocket activas"
+))
+websocket_connections_total = registry.register(Counter(
+    "websocket_connections_total", "Conexiones WebSocket aceptadas"
+))
+websocket_messages_sent_total = registry.register(Counter(
+    "websocket_messages_sent_total", "Mensajes enviados por WebSocket", ("kind",)
+))
+websocket_messages_received_total = registry.register(Counter(
+    "websocket_messages_received_total", "Mensajes recibidos por WebSocket"
+))
 
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[int, WebSocket] = {}
+        # Canales con audiencia restringida (p. ej. "operadores"), aparte de las conexiones generales
+        self.canales: Dict[str, Dict[int, WebSocket]] = {}
 
     async def connect(self, websocket: WebSocket, client_id: int):
         await websocket.accept()
         self.active_connections[client_id] = websocket
+        websocket_connections_total.inc()
 
     def disconnect(self, client_id: int):
         if client_id in self.active_connections:
@@ -15,13 +32,45 @@ class ConnectionManager:
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
         await websocket.send_text(message)
+        websocket_messages_sent_total.inc("personal")
     
     async def send_personal_message_by_id(self, message: str, client_id: int):
         if client_id in self.active_connections:
             await self.active_connections[client_id].send_text(message)
+            websocket_messages_sent_total.inc("personal")
+
+    async def connect_canal(self, websocket: WebSocket, canal: str, client_id: int):
+        await websocket.accept()
+        self.canales.setdefault(canal, {})[client_id] = websocket
+        websocket_connections_total.inc()
+
+    def disconnect_canal(self, canal: str, client_id: int):
+        conexiones = self.canales.get(canal)
+        if conexiones and client_id in conexiones:
+            del conexiones[client_id]
+
+    def tiene_suscriptores(self, canal: str) -> bool:
+        return bool(self.canales.get(canal))
+
+    async def broadcast_canal(self, canal: str, message: str):
+        enviados = 0
+        for client_id, connection in list(self.canales.get(canal, {}).items()):
+            try:
+                await connection.send_text(message)
+            except Exception:
+                # Un socket cerrado sin desconectar no debe cortar el envío al resto
+                self.disconnect_canal(canal, client_id)
+                continue
+            enviados += 1
+        websocket_messages_sent_total.inc("canal", cantidad=enviados)
 
     async def broadcast(self, message: str):
         for connection in self.active_connections.values():
             await connection.send_text(message)
+        websocket_messages_sent_total.inc("broadcast", cantidad=len(self.active_connections))
 
 manager = ConnectionManager()
+
+registry.add_collector(lambda: websocket_connections.set(
+    valor=len(manager.active_connections) + sum(len(c) for c in manager.canales.values())
+))
@@ -0,0 +1,34 @@
+"""
+Agrega en una base existente las columnas nuevas de tablas que ya existían
+(create_all solo crea tablas nuevas, no altera las existentes). Cada sentencia
+usa ADD COLUMN IF NOT EXISTS, así que el script se puede correr varias veces.
+
+Correr antes de desplegar una versión que lea las columnas nuevas:
+    python -m database.columnas
+"""
+from sqlalchemy import text
+
+from database.database import engine
+
+# (tabla, columna, definición SQL)
+COLUMNAS = [
+    ("usuarios", "fecha_ubicacion", "timestamp"),
+    ("viajes", "recorrido_polyline", "text"),
+    ("viajes", "distancia_km", "float"),
+    ("viajes", "duracion_min", "float"),
+    ("viajes", "precio_calculado", "float(10)"),
+    ("usuarios", "fecha_actualizacion", "timestamp DEFAULT now()"),
+    ("vehiculos", "fecha_actualizacion", "timestamp DEFAULT now()"),
+]
+
+
+def agregar_columnas_faltantes():
+    with engine.begin() as conn:
+        for tabla, columna, definicion in COLUMNAS:
+            ddl = f"ALTER TABLE {tabla} ADD COLUMN IF NOT EXISTS {columna} {definicion}"
+            print(ddl)
+            conn.execute(text(ddl))
+
+
+if __name__ == "__main__":
+    agregar_columnas_faltantes()
@@ -1,21 +1,109 @@
-from sqlalchemy import create_engine
+from sqlalchemy import DDL, create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from fastapi import Depends
+from starlette.requests import HTTPConnection
+from typing import Dict, Optional
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Réplica de solo lectura para los endpoints de consulta (opcional)
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+# Tras escribir, las lecturas del mismo usuario van al primario durante este tiempo
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
 
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+replica_engine = (
+    create_engine(
+        DATABASE_REPLICA_URL,
+        pool_pre_ping=True,
+        execution_options={"postgresql_readonly": True}
+    )
+    if DATABASE_REPLICA_URL else None
+)
+SessionLectura = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine) if replica_engine else None
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+# Los índices de búsqueda por trigramas necesitan la extensión pg_trgm
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+
+class EscriturasPorUsuario:
+    """
+    Recuerda qué usuarios confirmaron una escritura en el primario hace menos
+    de `ventana` segundos, para que sus lecturas no vean la réplica atrasada
+    desde ningún dispositivo ni con un token renovado. El estado es por proceso.
+    """
+
+    def __init__(self, ventana: float = READ_YOUR_WRITES_SECONDS, maximo: int = 10000):
+        self.ventana = ventana
+        self.maximo = maximo
+        self._lock = threading.Lock()
+        self._hasta: Dict[str, float] = {}
+
+    def marcar(self, usuario: str):
+        ahora = time.monotonic()
+        with self._lock:
+            if len(self._hasta) >= self.maximo:
+                self._hasta = {u: t for u, t in self._hasta.items() if t > ahora}
+            self._hasta[usuario] = ahora + self.ventana
+
+    def reciente(self, usuario: Optional[str]) -> bool:
+        if usuario is None:
+            return False
+        with self._lock:
+            hasta = self._hasta.get(usuario)
+        return hasta is not None and hasta > time.monotonic()
+
+
+escrituras_por_usuario = EscriturasPorUsuario()
+
+
+def usuario_de_conexion(conexion: HTTPConnection) -> Optional[str]:
+    """'sub' (email) del token Bearer de la petición; las anónimas no se siguen."""
+    from core.security import get_token_subject
+
+    esquema, _, token = conexion.headers.get("authorization", "").partition(" ")
+    if esquema.lower() != "bearer" or not token:
+        return None
+    return get_token_subject(token)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _marcar_escritura(session):
+    usuario = session.info.get("usuario")
+    if usuario is not None:
+        escrituras_por_usuario.marcar(usuario)
+
+
+def get_db(conexion: HTTPConnection):
+    db = SessionLocal(info={"usuario": usuario_de_conexion(conexion)})
     try:
         yield db
     finally:
         db.close()
+
+
+def get_db_lectura(conexion: HTTPConnection, db: Session = Depends(get_db)):
+    """
+    Sesión para endpoints de solo lectura. Usa la réplica si está configurada,
+    salvo que el mismo usuario haya escrito hace poco; en ese caso (o sin
+    réplica) devuelve la misma sesión del primario de la petición.
+    """
+    if SessionLectura is None or escrituras_por_usuario.reciente(db.info.get("usuario")):
+        yield db
+        return
+    # El primario queda a mano para lo que todavía no se replicó (p. ej. un usuario recién creado)
+    lectura = SessionLectura(info={"primario": db})
+    try:
+        yield lectura
+    finally:
+        lectura.close()
@@ -0,0 +1,31 @@
+"""
+Crea en una base existente los índices declarados en los modelos que falten
+(create_all solo los crea junto con tablas nuevas). Usa CREATE INDEX
+CONCURRENTLY para no bloquear las escrituras en tablas grandes.
+
+Uso:
+    python -m database.indices
+"""
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+from database.database import Base, engine
+import models  # noqa: F401  (registra las tablas en Base.metadata)
+
+
+def crear_indices_faltantes():
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for tabla in Base.metadata.sorted_tables:
+            for indice in sorted(tabla.indexes, key=lambda i: i.name):
+                ddl = str(CreateIndex(indice, if_not_exists=True).compile(dialect=postgresql.dialect()))
+                ddl = ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1).replace(
+                    "CREATE UNIQUE INDEX", "CREATE UNIQUE INDEX CONCURRENTLY", 1
+                )
+                print(ddl)
+                conn.execute(text(ddl))
+
+
+if __name__ == "__main__":
+    crear_indices_faltantes()
@@ -1,8 +1,21 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from database.database import engine, Base
-from api.endpoints import users, auth, solicitudes, tarifas, vehiculos, roles, viajes, websockets
+from database.database import engine, replica_engine, Base
+from api.endpoints import users, auth, solicitudes, tarifas, vehiculos, roles, viajes, websockets, metrics, debug, analytics, busqueda
+from core.metrics import MetricsMiddleware
+from core.compression import CompressionMiddleware
+from core.profiling import ProfilingMiddleware
+from core.rate_limit import RateLimitMiddleware
+from core.admision import AdmissionControlMiddleware
+from core.sql_tracing import SQLTracingMiddleware, SQL_TRACING_ENABLED, instalar_trazado
+from services.matching import matching_engine
+from services.expiracion import expiracion_scheduler
+from services.tablero import tablero
+from services.mapa_demanda import mapa_demanda
+from services.sugerencia_precio import sugerencia_precios
+import asyncio
 import os
 from dotenv import load_dotenv
 
@@ -17,7 +30,28 @@ os.makedirs(UPLOADS_DIR, exist_ok=True)
 # Base.metadata.drop_all(bind=engine)
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Empresa Taxi API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Mapa de demanda precalculado (memoria mapeada), si ya fue generado
+    mapa_demanda.cargar()
+    # Matriz de precios aceptados por par de zonas, si ya fue generada
+    sugerencia_precios.cargar()
+
+    # Tareas en segundo plano que viven mientras el worker está activo
+    tareas = []
+    if matching_engine.habilitado:
+        tareas.append(asyncio.create_task(matching_engine.run()))
+    if expiracion_scheduler.habilitado:
+        tareas.append(asyncio.create_task(expiracion_scheduler.run()))
+    if tablero.habilitado:
+        tareas.append(asyncio.create_task(tablero.run()))
+    yield
+    for tarea in tareas:
+        tarea.cancel()
+
+
+app = FastAPI(title="Empresa Taxi API", version="1.0.0", lifespan=lifespan)
 
 # Configuración de CORS
 # En desarrollo, permitir todos los orígenes. En producción, especificar los dominios permitidos.
@@ -40,6 +74,30 @@ else:
         "http://192.168.100.58:8081",
     ]
 
+# Compresión gzip/brotli de respuestas grandes (listados) para clientes móviles
+app.add_middleware(CompressionMiddleware)
+
+# Trazado de consultas SQL por petición (cabecera Server-Timing y detección de N+1)
+if SQL_TRACING_ENABLED:
+    instalar_trazado(engine)
+    if replica_engine is not None:
+        instalar_trazado(replica_engine)
+    app.add_middleware(SQLTracingMiddleware)
+
+# Perfilado de peticiones individuales con la cabecera X-Profile-Token
+app.add_middleware(ProfilingMiddleware)
+
+# Control de admisión: encola o descarta con 503 según la prioridad de la ruta
+app.add_middleware(AdmissionControlMiddleware)
+
+# Límite por IP del login y el registro (los 429 quedan en las métricas)
+app.add_middleware(RateLimitMiddleware)
+
+# Métricas por ruta; va por fuera del resto para medir también los 429 y 503
+app.add_middleware(MetricsMiddleware)
+
+# CORS se agrega al final para que sea el middleware más externo: las
+# respuestas de los demás (429, 503) también llevan las cabeceras CORS
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -57,6 +115,10 @@ app.include_router(tarifas.router, prefix="/tarifas", tags=["tarifas"])
 app.include_router(roles.router, prefix="/roles", tags=["roles"])
 app.include_router(viajes.router, prefix="/viajes", tags=["viajes"])
 app.include_router(websockets.router, prefix="/ws", tags=["websockets"])
+app.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
+app.include_router(debug.router, prefix="/debug", tags=["debug"])
+app.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+app.include_router(busqueda.router, prefix="/busqueda", tags=["busqueda"])
 
 # Servir archivos estáticos (imágenes de vehículos)
 app.mount("/uploads", StaticFiles(directory=UPLOADS_DIR), name="uploads")
\ No newline at end of file
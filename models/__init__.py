@@ -5,4 +5,7 @@ from .tarifa import Tarifa
 from .rol import Rol
 
 from .viaje import Viaje
+from .idempotencia import IdempotencyKey
+from .ganancias import GananciaDiaria
+from .limite_tasa import BucketLimite
 from .enums import RolUsuario, EstadoViaje
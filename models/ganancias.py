@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, Float, Date, ForeignKey
+from database.database import Base
+
+class GananciaDiaria(Base):
+    """Resumen diario de ganancias por conductor, actualizado junto con cada viaje."""
+    __tablename__ = "ganancias_diarias"
+
+    conductor_id = Column(Integer, ForeignKey("usuarios.id"), primary_key=True)
+    fecha = Column(Date, primary_key=True)  # Día local (GANANCIAS_ZONA_HORARIA) de la hora de fin
+    viajes = Column(Integer, nullable=False, default=0)
+    ingresos = Column(Float(10, 2), nullable=False, default=0)
+    pagado = Column(Float(10, 2), nullable=False, default=0)
+    pendiente = Column(Float(10, 2), nullable=False, default=0)
+    minutos_en_viaje = Column(Float, nullable=False, default=0)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, UniqueConstraint
+from database.database import Base
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (UniqueConstraint("clave", "usuario_id", "ruta", name="uq_idempotency_clave"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    clave = Column(String(255), nullable=False)
+    usuario_id = Column(Integer, nullable=False)
+    ruta = Column(String(100), nullable=False)
+    status_code = Column(Integer, nullable=True)  # NULL mientras la petición original está en curso
+    respuesta = Column(JSON(none_as_null=True), nullable=True)
+    fecha_creacion = Column(DateTime, nullable=False)
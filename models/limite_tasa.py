@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, Float, Boolean
+from database.database import Base
+
+class BucketLimite(Base):
+    """
+    Token bucket compartido del limitador de peticiones (RATE_LIMIT_BACKEND=postgres).
+    UNLOGGED: si la base se reinicia, los buckets vuelven a empezar llenos.
+    """
+    __tablename__ = "rate_limit_buckets"
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    clave = Column(String(200), primary_key=True)  # "<clase>:<ip>" o "<clase>:u<usuario_id>"
+    tokens = Column(Float, nullable=False)
+    actualizado = Column(Float, nullable=False)  # Segundos epoch de la última consulta
+    permitido = Column(Boolean, nullable=False)  # Resultado de la última consulta
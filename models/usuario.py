@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean, Enum
+from sqlalchemy import Column, Integer, String, Boolean, Enum, DateTime, Index
+from sqlalchemy.sql import func
 from geoalchemy2 import Geometry
 from sqlalchemy.orm import relationship
 from database.database import Base
@@ -14,9 +15,28 @@ class Usuario(Base):
     telefono = Column(String(20))
     rol = Column(Enum(RolUsuario), nullable=False)
     ubicacion = Column(Geometry('POINT', srid=4326))
+    fecha_ubicacion = Column(DateTime, nullable=True)  # Último reporte de ubicación (PUT /users/me/ubicacion)
     activo = Column(Boolean, default=True)
+    fecha_actualizacion = Column(DateTime, default=func.now(), onupdate=func.now())
 
     vehiculos = relationship("Vehiculo", back_populates="conductor")
     solicitudes = relationship("Solicitud", back_populates="pasajero")
 
     viajes_conductor = relationship("Viaje", back_populates="conductor", foreign_keys="[Viaje.conductor_id]")
+
+# Búsqueda de operadores: trigramas (pg_trgm) para subcadenas y similitud,
+# y lower(...) text_pattern_ops para el camino rápido por prefijo
+Index("ix_usuarios_nombre_trgm", Usuario.nombre, postgresql_using="gin", postgresql_ops={"nombre": "gin_trgm_ops"})
+Index("ix_usuarios_email_trgm", Usuario.email, postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"})
+Index("ix_usuarios_telefono_trgm", Usuario.telefono, postgresql_using="gin", postgresql_ops={"telefono": "gin_trgm_ops"})
+Index(
+    "ix_usuarios_nombre_prefijo",
+    func.lower(Usuario.nombre).label("nombre_lower"),
+    postgresql_ops={"nombre_lower": "text_pattern_ops"},
+)
+Index(
+    "ix_usuarios_email_prefijo",
+    func.lower(Usuario.email).label("email_lower"),
+    postgresql_ops={"email_lower": "text_pattern_ops"},
+)
+Index("ix_usuarios_telefono_prefijo", Usuario.telefono, postgresql_ops={"telefono": "text_pattern_ops"})
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, Index
+from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database.database import Base
 
@@ -14,6 +15,15 @@ class Vehiculo(Base):
     anio = Column(Integer, nullable=True)
     activo = Column(Boolean, default=True)
     imagen = Column(String(255), nullable=True)  # Ruta de la imagen
+    fecha_actualizacion = Column(DateTime, default=func.now(), onupdate=func.now())
 
     conductor = relationship("Usuario", back_populates="vehiculos")
     viajes = relationship("Viaje", back_populates="vehiculo")
+
+# Búsqueda de operadores por placa: trigramas para subcadenas y prefijo en mayúsculas
+Index("ix_vehiculos_placa_trgm", Vehiculo.placa, postgresql_using="gin", postgresql_ops={"placa": "gin_trgm_ops"})
+Index(
+    "ix_vehiculos_placa_prefijo",
+    func.upper(Vehiculo.placa).label("placa_upper"),
+    postgresql_ops={"placa_upper": "text_pattern_ops"},
+)
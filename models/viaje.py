@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, DateTime, Boolean, ForeignKey, Enum
+from sqlalchemy import Column, Integer, Float, DateTime, Boolean, ForeignKey, Enum, Text
 from sqlalchemy.orm import relationship
 from database.database import Base
 from models.enums import EstadoViaje
@@ -16,6 +16,11 @@ class Viaje(Base):
     hora_fin = Column(DateTime)
     completado = Column(Boolean, default=False)
     pagado = Column(Boolean, default=False)
+    # Recorrido GPS registrado entre el inicio y el fin (encoded polyline)
+    recorrido_polyline = Column(Text, nullable=True)
+    distancia_km = Column(Float, nullable=True)
+    duracion_min = Column(Float, nullable=True)
+    precio_calculado = Column(Float(10, 2), nullable=True)  # Según la tarifa activa al finalizar
 
     solicitud = relationship("Solicitud", back_populates="viaje")
     conductor = relationship("Usuario", back_populates="viajes_conductor", foreign_keys=[conductor_id])
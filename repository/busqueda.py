@@ -0,0 +1,90 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import String, case, cast, func, literal, null, select, union_all, or_
+from models.usuario import Usuario
+from models.vehiculo import Vehiculo
+
+# Con menos caracteres no hay trigramas útiles: se busca solo por prefijo
+MIN_CARACTERES_TRIGRAMA = 3
+
+ESCAPE = "!"
+
+def _escapar_like(texto: str) -> str:
+    return texto.replace(ESCAPE, ESCAPE * 2).replace("%", ESCAPE + "%").replace("_", ESCAPE + "_")
+
+def buscar_usuarios_y_vehiculos(db: Session, q: str, limit: int = 20):
+    """
+    Busca usuarios (nombre, email, teléfono) y vehículos (placa) en una sola
+    consulta UNION ALL y devuelve las mejores coincidencias ordenadas por puntaje.
+
+    - Consultas cortas: solo prefijo, con los índices lower(...)/upper(...) text_pattern_ops.
+    - Resto: subcadena (ILIKE) o similitud de palabra (%>) con los índices GIN de
+      trigramas; el puntaje es la similitud, con un bono para los prefijos.
+    """
+    q = q.strip()
+    q_lower = q.lower()
+    prefijo_lower = _escapar_like(q_lower) + "%"
+    prefijo_upper = _escapar_like(q.upper()) + "%"
+    subcadena = "%" + _escapar_like(q_lower) + "%"
+    telefono = func.coalesce(Usuario.telefono, "")
+
+    es_prefijo_usuario = or_(
+        func.lower(Usuario.nombre).like(prefijo_lower, escape=ESCAPE),
+        func.lower(Usuario.email).like(prefijo_lower, escape=ESCAPE),
+        Usuario.telefono.like(prefijo_lower, escape=ESCAPE),
+    )
+    es_prefijo_vehiculo = func.upper(Vehiculo.placa).like(prefijo_upper, escape=ESCAPE)
+
+    if len(q) < MIN_CARACTERES_TRIGRAMA:
+        filtro_usuario, filtro_vehiculo = es_prefijo_usuario, es_prefijo_vehiculo
+        # A igual prefijo, primero los textos más cortos (más parecidos a lo escrito)
+        puntaje_usuario = 1.0 / (1 + func.length(Usuario.nombre))
+        puntaje_vehiculo = 1.0 / (1 + func.length(Vehiculo.placa))
+    else:
+        filtro_usuario = or_(
+            Usuario.nombre.ilike(subcadena, escape=ESCAPE),
+            Usuario.email.ilike(subcadena, escape=ESCAPE),
+            Usuario.telefono.like(subcadena, escape=ESCAPE),
+            Usuario.nombre.op("%>")(q),
+        )
+        filtro_vehiculo = or_(Vehiculo.placa.ilike(subcadena, escape=ESCAPE), Vehiculo.placa.op("%>")(q))
+        puntaje_usuario = func.greatest(
+            func.word_similarity(q, Usuario.nombre),
+            func.word_similarity(q, Usuario.email),
+            func.word_similarity(q, telefono),
+        ) + case((es_prefijo_usuario, 1.0), else_=0.0)
+        puntaje_vehiculo = func.word_similarity(q, Vehiculo.placa) + case((es_prefijo_vehiculo, 1.0), else_=0.0)
+
+    usuarios = (
+        select(
+            literal("usuario").label("tipo"),
+            Usuario.id.label("id"),
+            Usuario.nombre.label("titulo"),
+            Usuario.email.label("detalle"),
+            Usuario.telefono.label("telefono"),
+            cast(Usuario.rol, String).label("rol"),
+            cast(null(), Usuario.id.type).label("conductor_id"),
+            puntaje_usuario.label("puntaje"),
+        )
+        .where(filtro_usuario)
+        .order_by(puntaje_usuario.desc(), Usuario.id)
+        .limit(limit)
+    )
+    vehiculos = (
+        select(
+            literal("vehiculo").label("tipo"),
+            Vehiculo.id.label("id"),
+            Vehiculo.placa.label("titulo"),
+            func.concat_ws(" ", Vehiculo.marca, Vehiculo.modelo, Vehiculo.color).label("detalle"),
+            cast(null(), String).label("telefono"),
+            cast(null(), String).label("rol"),
+            Vehiculo.conductor_id.label("conductor_id"),
+            puntaje_vehiculo.label("puntaje"),
+        )
+        .where(filtro_vehiculo)
+        .order_by(puntaje_vehiculo.desc(), Vehiculo.id)
+        .limit(limit)
+    )
+    combinada = union_all(usuarios.subquery().select(), vehiculos.subquery().select()).subquery()
+    return db.execute(
+        select(combinada).order_by(combinada.c.puntaje.desc(), combinada.c.tipo, combinada.c.id).limit(limit)
+    ).all()
@@ -0,0 +1,95 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import case, func, literal, select
+from sqlalchemy.dialects.postgresql import insert
+from models.ganancias import GananciaDiaria
+from models.viaje import Viaje
+from datetime import date
+from typing import Optional
+
+def _sumar(db: Session, conductor_id: int, fecha: date, **deltas):
+    """
+    Suma los deltas a la fila (conductor, día) con un solo INSERT ... ON CONFLICT.
+    No hace commit: se confirma en la misma transacción que el cambio del viaje.
+    """
+    valores = {"viajes": 0, "ingresos": 0, "pagado": 0, "pendiente": 0, "minutos_en_viaje": 0, **deltas}
+    stmt = insert(GananciaDiaria).values(conductor_id=conductor_id, fecha=fecha, **valores)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[GananciaDiaria.conductor_id, GananciaDiaria.fecha],
+        set_={
+            campo: getattr(GananciaDiaria, campo) + getattr(stmt.excluded, campo)
+            for campo in deltas
+        },
+    )
+    db.execute(stmt)
+
+def sumar_viaje_finalizado(db: Session, conductor_id: int, fecha: date, monto: float, minutos: float):
+    _sumar(db, conductor_id, fecha, viajes=1, ingresos=monto, pendiente=monto, minutos_en_viaje=minutos)
+
+def sumar_pago(db: Session, conductor_id: int, fecha: date, monto: float):
+    _sumar(db, conductor_id, fecha, pagado=monto, pendiente=-monto)
+
+def get_resumen_periodos(db: Session, conductor_id: int, periodos: dict):
+    """
+    Suma las filas diarias del conductor para varios periodos a la vez.
+    `periodos` es {nombre: fecha_inicio}; todos terminan hoy. Lee como mucho
+    un mes de filas, sin importar cuántos viajes tenga el conductor.
+    """
+    columnas = []
+    for nombre, inicio in periodos.items():
+        en_periodo = GananciaDiaria.fecha >= inicio
+        for campo in ("viajes", "ingresos", "pagado", "pendiente", "minutos_en_viaje"):
+            columnas.append(
+                func.coalesce(func.sum(case((en_periodo, getattr(GananciaDiaria, campo)), else_=0)), 0)
+                .label(f"{nombre}__{campo}")
+            )
+    fila = db.execute(
+        select(*columnas).where(
+            GananciaDiaria.conductor_id == conductor_id,
+            GananciaDiaria.fecha >= min(periodos.values()),
+        )
+    ).one()
+    return fila._asdict()
+
+def recalcular_ganancias(db: Session, zona_horaria: str, desde: Optional[date] = None, conductor_id: Optional[int] = None):
+    """
+    Reconstruye las filas diarias desde la tabla de viajes (backfill) con un
+    INSERT ... SELECT agrupado en una transacción. Devuelve las filas escritas.
+    """
+    dia = func.date(func.timezone(zona_horaria, func.timezone("UTC", Viaje.hora_fin)))
+    minutos = func.coalesce(
+        Viaje.duracion_min,
+        func.extract("epoch", Viaje.hora_fin - Viaje.hora_inicio) / 60.0,
+        0,
+    )
+    monto = func.coalesce(Viaje.precio_final, 0)
+    origen = (
+        select(
+            Viaje.conductor_id,
+            dia.label("fecha"),
+            func.count().label("viajes"),
+            func.sum(monto).label("ingresos"),
+            func.sum(case((Viaje.pagado.is_(True), monto), else_=literal(0.0))).label("pagado"),
+            func.sum(case((Viaje.pagado.is_(True), literal(0.0)), else_=monto)).label("pendiente"),
+            func.sum(minutos).label("minutos_en_viaje"),
+        )
+        .where(Viaje.completado.is_(True), Viaje.hora_fin.isnot(None), Viaje.conductor_id.isnot(None))
+        .group_by(Viaje.conductor_id, dia)
+    )
+    borrar = db.query(GananciaDiaria)
+    if desde is not None:
+        origen = origen.where(dia >= desde)
+        borrar = borrar.filter(GananciaDiaria.fecha >= desde)
+    if conductor_id is not None:
+        origen = origen.where(Viaje.conductor_id == conductor_id)
+        borrar = borrar.filter(GananciaDiaria.conductor_id == conductor_id)
+
+    borrar.delete(synchronize_session=False)
+    campos = ["conductor_id", "fecha", "viajes", "ingresos", "pagado", "pendiente", "minutos_en_viaje"]
+    stmt = insert(GananciaDiaria).from_select(campos, origen)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[GananciaDiaria.conductor_id, GananciaDiaria.fecha],
+        set_={campo: getattr(stmt.excluded, campo) for campo in campos[2:]},
+    )
+    escritas = db.execute(stmt).rowcount
+    db.commit()
+    return escritas
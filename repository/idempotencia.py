@@ -0,0 +1,61 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import or_, and_
+from sqlalchemy.dialects.postgresql import insert
+from models.idempotencia import IdempotencyKey
+from datetime import datetime, timedelta
+
+def reservar_clave(db: Session, clave: str, usuario_id: int, ruta: str, ttl_s: float, bloqueo_s: float) -> bool:
+    """
+    Intenta reservar la clave para procesar la petición en un solo INSERT ... ON CONFLICT.
+    Una clave existente solo se reutiliza si venció su TTL o si quedó en curso
+    más de bloqueo_s (el worker que la tomó murió). Devuelve True si se reservó.
+    """
+    ahora = datetime.utcnow()
+    tabla = IdempotencyKey.__table__
+    stmt = insert(IdempotencyKey).values(
+        clave=clave, usuario_id=usuario_id, ruta=ruta, fecha_creacion=ahora
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_idempotency_clave",
+        set_={"status_code": None, "respuesta": None, "fecha_creacion": ahora},
+        where=or_(
+            tabla.c.fecha_creacion < ahora - timedelta(seconds=ttl_s),
+            and_(tabla.c.status_code.is_(None), tabla.c.fecha_creacion < ahora - timedelta(seconds=bloqueo_s)),
+        ),
+    ).returning(IdempotencyKey.id)
+    reservada = db.execute(stmt).first() is not None
+    db.commit()
+    return reservada
+
+def get_clave(db: Session, clave: str, usuario_id: int, ruta: str):
+    return db.query(IdempotencyKey).filter(
+        IdempotencyKey.clave == clave,
+        IdempotencyKey.usuario_id == usuario_id,
+        IdempotencyKey.ruta == ruta,
+    ).first()
+
+def completar_clave(db: Session, clave: str, usuario_id: int, ruta: str, status_code: int, respuesta):
+    db.query(IdempotencyKey).filter(
+        IdempotencyKey.clave == clave,
+        IdempotencyKey.usuario_id == usuario_id,
+        IdempotencyKey.ruta == ruta,
+    ).update({"status_code": status_code, "respuesta": respuesta}, synchronize_session=False)
+    db.commit()
+
+def liberar_clave(db: Session, clave: str, usuario_id: int, ruta: str):
+    """Elimina una reserva en curso para que el cliente pueda reintentar tras un error."""
+    db.rollback()
+    db.query(IdempotencyKey).filter(
+        IdempotencyKey.clave == clave,
+        IdempotencyKey.usuario_id == usuario_id,
+        IdempotencyKey.ruta == ruta,
+        IdempotencyKey.status_code.is_(None),
+    ).delete(synchronize_session=False)
+    db.commit()
+
+def purgar_claves(db: Session, antes_de: datetime) -> int:
+    eliminadas = db.query(IdempotencyKey).filter(
+        IdempotencyKey.fecha_creacion < antes_de
+    ).delete(synchronize_session=False)
+    db.commit()
+    return eliminadas
@@ -0,0 +1,33 @@
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+from models.limite_tasa import BucketLimite
+
+def consumir_token(db: Session, clave: str, capacidad: float, tasa: float, ahora: float):
+    """
+    Recarga el bucket según el tiempo transcurrido y consume un token si hay,
+    en un solo INSERT ... ON CONFLICT atómico entre workers.
+    Devuelve (permitido, tokens restantes).
+    """
+    tabla = BucketLimite.__table__
+    recargados = func.least(capacidad, tabla.c.tokens + (ahora - tabla.c.actualizado) * tasa)
+    stmt = insert(BucketLimite).values(clave=clave, tokens=capacidad - 1, actualizado=ahora, permitido=True)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[tabla.c.clave],
+        set_={
+            "tokens": case((recargados >= 1, recargados - 1), else_=recargados),
+            "actualizado": ahora,
+            "permitido": recargados >= 1,
+        },
+    ).returning(BucketLimite.permitido, BucketLimite.tokens)
+    permitido, tokens = db.execute(stmt).one()
+    db.commit()
+    return permitido, tokens
+
+def purgar_buckets(db: Session, antes_de: float) -> int:
+    """Elimina los buckets sin uso desde antes_de (ya estarían llenos de nuevo)."""
+    eliminados = db.query(BucketLimite).filter(
+        BucketLimite.actualizado < antes_de
+    ).delete(synchronize_session=False)
+    db.commit()
+    return eliminados
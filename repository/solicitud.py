@@ -1,7 +1,13 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import func, update
 from models.solicitud import Solicitud
+from models.viaje import Viaje
 from schemas.solicitud import SolicitudCreate
 from models.usuario import Usuario
+from models.enums import EstadoViaje
+from services import tablero as servicio_tablero
+from datetime import datetime
+from typing import List, Optional
 
 def create_solicitud(db: Session, solicitud: SolicitudCreate, pasajero_id: int):
     # Crear las geometrías POINT a partir de las coordenadas
@@ -14,11 +20,13 @@ def create_solicitud(db: Session, solicitud: SolicitudCreate, pasajero_id: int):
         precio_ofrecido=solicitud.precio_ofrecido,
         pasajero_id=pasajero_id,
         origen_geom=origen_geom,
-        destino_geom=destino_geom
+        destino_geom=destino_geom,
+        fecha_creacion=datetime.utcnow()
     )
     db.add(db_solicitud)
     db.commit()
     db.refresh(db_solicitud)
+    servicio_tablero.tablero.ajustar(servicio_tablero.SOLICITUDES_PENDIENTES, 1)
     return db_solicitud
 
 def get_solicitudes(db: Session, skip: int = 0, limit: int = 100):
@@ -28,4 +36,119 @@ def get_solicitud_by_id(db: Session, solicitud_id: int):
     return db.query(Solicitud).filter(Solicitud.id == solicitud_id).first()
 
 def get_solicitudes_by_pasajero(db: Session, pasajero_id: int, skip: int = 0, limit: int = 100):
-    return db.query(Solicitud).filter(Solicitud.pasajero_id == pasajero_id).offset(skip).limit(limit).all()
\ No newline at end of file
+    return db.query(Solicitud).filter(Solicitud.pasajero_id == pasajero_id).offset(skip).limit(limit).all()
+
+def get_solicitudes_pendientes_coords(db: Session, limit: int = 500):
+    """
+    Devuelve (id, lon, lat) del origen de las solicitudes pendientes,
+    las más antiguas primero. Las coordenadas se extraen en la consulta
+    para no decodificar WKB en Python.
+    """
+    return (
+        db.query(Solicitud.id, func.ST_X(Solicitud.origen_geom), func.ST_Y(Solicitud.origen_geom))
+        .filter(Solicitud.estado == EstadoViaje.pendiente, Solicitud.origen_geom.isnot(None))
+        .order_by(Solicitud.id)
+        .limit(limit)
+        .all()
+    )
+
+def get_solicitudes_pendientes_expiracion(db: Session):
+    """
+    Devuelve (id, pasajero_id, fecha_creacion) de todas las solicitudes pendientes.
+    Se usa una sola vez al arrancar para reconstruir los vencimientos en memoria.
+    """
+    return (
+        db.query(Solicitud.id, Solicitud.pasajero_id, Solicitud.fecha_creacion)
+        .filter(Solicitud.estado == EstadoViaje.pendiente)
+        .all()
+    )
+
+def expirar_solicitudes(db: Session, solicitud_ids: List[int]):
+    """
+    Cancela en un solo UPDATE las solicitudes indicadas que sigan pendientes.
+    Devuelve (id, pasajero_id) de las que realmente se cancelaron; las que ya
+    fueron aceptadas (o expiradas por otro worker) no se tocan.
+    """
+    if not solicitud_ids:
+        return []
+    resultado = db.execute(
+        update(Solicitud)
+        .where(Solicitud.id.in_(solicitud_ids), Solicitud.estado == EstadoViaje.pendiente)
+        .values(estado=EstadoViaje.cancelado)
+        .returning(Solicitud.id, Solicitud.pasajero_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    servicio_tablero.tablero.ajustar(servicio_tablero.SOLICITUDES_PENDIENTES, -len(resultado))
+    return resultado
+
+def consulta_exportacion_solicitudes(
+    db: Session,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    conductor_id: Optional[int] = None,
+    estado: Optional[EstadoViaje] = None,
+    lote: int = 1000
+):
+    """
+    Consulta de exportación de solicitudes (tuplas, con las coordenadas ya
+    extraídas y el conductor del viaje si lo hubo). Se lee con un cursor del
+    lado del servidor en lotes de `lote` filas, sin cargar el resultado completo.
+    """
+    consulta = (
+        db.query(
+            Solicitud.id,
+            Solicitud.pasajero_id,
+            Viaje.conductor_id,
+            Solicitud.estado,
+            Solicitud.fecha_creacion,
+            Solicitud.precio_ofrecido,
+            Solicitud.direccion_texto,
+            func.ST_X(Solicitud.origen_geom).label("origen_lon"),
+            func.ST_Y(Solicitud.origen_geom).label("origen_lat"),
+            func.ST_X(Solicitud.destino_geom).label("destino_lon"),
+            func.ST_Y(Solicitud.destino_geom).label("destino_lat"),
+        )
+        .outerjoin(Viaje, Viaje.solicitud_id == Solicitud.id)
+    )
+    if desde is not None:
+        consulta = consulta.filter(Solicitud.fecha_creacion >= desde)
+    if hasta is not None:
+        consulta = consulta.filter(Solicitud.fecha_creacion < hasta)
+    if conductor_id is not None:
+        consulta = consulta.filter(Viaje.conductor_id == conductor_id)
+    if estado is not None:
+        consulta = consulta.filter(Solicitud.estado == estado)
+    return consulta.order_by(Solicitud.id).yield_per(lote)
+
+def get_extension_origenes(db: Session, percentil: float = 0.01):
+    """
+    Devuelve (lon_min, lat_min, lon_max, lat_max) de los orígenes de las
+    solicitudes, entre los percentiles `percentil` y 1 - `percentil` de cada
+    eje, para que unos pocos orígenes erróneos no agranden la extensión.
+    """
+    lon = func.ST_X(Solicitud.origen_geom)
+    lat = func.ST_Y(Solicitud.origen_geom)
+    return db.query(
+        func.percentile_cont(percentil).within_group(lon),
+        func.percentile_cont(percentil).within_group(lat),
+        func.percentile_cont(1 - percentil).within_group(lon),
+        func.percentile_cont(1 - percentil).within_group(lat),
+    ).filter(
+        Solicitud.origen_geom.isnot(None)
+    ).one()
+
+def consulta_origenes_por_hora(db: Session, zona_horaria: str, desde: Optional[datetime] = None, lote: int = 10000):
+    """
+    (lon, lat, hora de la semana 0..167) del origen de cada solicitud, con la
+    hora calculada en la zona horaria dada (0 = lunes 00h). Se lee con un
+    cursor del lado del servidor en lotes de `lote` filas.
+    """
+    local = func.timezone(zona_horaria, func.timezone("UTC", Solicitud.fecha_creacion))
+    hora_semana = (func.extract("isodow", local) - 1) * 24 + func.extract("hour", local)
+    consulta = db.query(
+        func.ST_X(Solicitud.origen_geom), func.ST_Y(Solicitud.origen_geom), hora_semana
+    ).filter(Solicitud.origen_geom.isnot(None), Solicitud.fecha_creacion.isnot(None))
+    if desde is not None:
+        consulta = consulta.filter(Solicitud.fecha_creacion >= desde)
+    return consulta.yield_per(lote)
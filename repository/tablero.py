@@ -0,0 +1,42 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from models.solicitud import Solicitud
+from models.viaje import Viaje
+from models.usuario import Usuario
+from models.enums import EstadoViaje, RolUsuario
+from datetime import datetime, timedelta
+
+def get_contadores_tablero(db: Session):
+    """
+    Cuenta, en una sola consulta con subconsultas escalares, las solicitudes
+    pendientes, los viajes en curso y los viajes finalizados sin cobrar.
+    """
+    def contar(*condiciones, modelo):
+        return select(func.count()).select_from(modelo).where(*condiciones).scalar_subquery()
+
+    fila = db.execute(
+        select(
+            contar(Solicitud.estado == EstadoViaje.pendiente, modelo=Solicitud).label("solicitudes_pendientes"),
+            contar(Solicitud.estado == EstadoViaje.en_curso, modelo=Solicitud).label("viajes_en_curso"),
+            contar(Viaje.completado.is_(True), Viaje.pagado.is_(False), modelo=Viaje).label("viajes_sin_cobrar"),
+        )
+    ).one()
+    return fila._asdict()
+
+def get_conductores_en_linea(db: Session, ventana_s: float):
+    """
+    Devuelve (id, segundos desde su último reporte de ubicación) de los
+    conductores activos que reportaron ubicación dentro de la ventana.
+    """
+    # fecha_ubicacion se guarda en UTC sin zona horaria
+    antiguedad = func.extract("epoch", func.timezone("UTC", func.now()) - Usuario.fecha_ubicacion)
+    return (
+        db.query(Usuario.id, antiguedad)
+        .filter(
+            Usuario.rol == RolUsuario.conductor,
+            Usuario.activo == True,
+            Usuario.ubicacion.isnot(None),
+            Usuario.fecha_ubicacion >= datetime.utcnow() - timedelta(seconds=ventana_s),
+        )
+        .all()
+    )
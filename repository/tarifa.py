@@ -4,6 +4,7 @@ from schemas.tarifa import TarifaCreate, TarifaUpdate
 from fastapi import HTTPException
 from sqlalchemy.sql import func
 from datetime import datetime
+from core.http_cache import cache_respuestas
 
 def create_tarifa(db: Session, tarifa: TarifaCreate):
     """
@@ -11,13 +12,16 @@ def create_tarifa(db: Session, tarifa: TarifaCreate):
     """
     # Desactivar todas las tarifas activas existentes
     if tarifa.activo:
-        db.query(Tarifa).filter(Tarifa.activo == True).update({"activo": False})
+        db.query(Tarifa).filter(Tarifa.activo == True).update(
+            {"activo": False, "fecha_actualizacion": datetime.utcnow()}
+        )
     
     db_tarifa = Tarifa(**tarifa.model_dump())
     db_tarifa.fecha_actualizacion = datetime.utcnow()
     db.add(db_tarifa)
     db.commit()
     db.refresh(db_tarifa)
+    cache_respuestas.invalidar("tarifa")
     return db_tarifa
 
 def get_tarifa_activa(db: Session):
@@ -26,6 +30,12 @@ def get_tarifa_activa(db: Session):
     """
     return db.query(Tarifa).filter(Tarifa.activo == True).first()
 
+def get_tarifa_activa_version(db: Session):
+    """
+    Obtiene solo (id, fecha_actualizacion) de la tarifa activa, para calcular el ETag.
+    """
+    return db.query(Tarifa.id, Tarifa.fecha_actualizacion).filter(Tarifa.activo == True).first()
+
 def get_tarifas(db: Session, skip: int = 0, limit: int = 100):
     """
     Obtiene todas las tarifas.
@@ -38,6 +48,12 @@ def get_tarifa_by_id(db: Session, tarifa_id: int):
     """
     return db.query(Tarifa).filter(Tarifa.id == tarifa_id).first()
 
+def get_tarifa_version(db: Session, tarifa_id: int):
+    """
+    Obtiene solo (id, fecha_actualizacion) de una tarifa, para calcular el ETag.
+    """
+    return db.query(Tarifa.id, Tarifa.fecha_actualizacion).filter(Tarifa.id == tarifa_id).first()
+
 def update_tarifa(db: Session, tarifa_id: int, tarifa_update: TarifaUpdate):
     """
     Actualiza una tarifa existente.
@@ -50,7 +66,9 @@ def update_tarifa(db: Session, tarifa_id: int, tarifa_update: TarifaUpdate):
     
     # Si se va a activar esta tarifa, desactivar las demás primero
     if update_data.get("activo") is True:
-        db.query(Tarifa).filter(Tarifa.id != tarifa_id).update({"activo": False})
+        db.query(Tarifa).filter(Tarifa.id != tarifa_id, Tarifa.activo == True).update(
+            {"activo": False, "fecha_actualizacion": datetime.utcnow()}
+        )
 
     for key, value in update_data.items():
         setattr(db_tarifa, key, value)
@@ -58,6 +76,7 @@ def update_tarifa(db: Session, tarifa_id: int, tarifa_update: TarifaUpdate):
     db_tarifa.fecha_actualizacion = datetime.utcnow()
     db.commit()
     db.refresh(db_tarifa)
+    cache_respuestas.invalidar("tarifa")
     return db_tarifa
 
 def deactivate_tarifa(db: Session, tarifa_id: int):
@@ -72,4 +91,5 @@ def deactivate_tarifa(db: Session, tarifa_id: int):
     db_tarifa.fecha_actualizacion = datetime.utcnow()
     db.commit()
     db.refresh(db_tarifa)
+    cache_respuestas.invalidar("tarifa")
     return db_tarifa
\ No newline at end of file
@@ -1,8 +1,16 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, literal, select, union_all
+from typing import Dict, List
+from datetime import datetime
 from models.usuario import Usuario
+from models.vehiculo import Vehiculo
 from schemas.usuario import UserCreate
 from core.security import pwd_context
-from models.enums import RolUsuario
+from core.http_cache import cache_respuestas
+from core.dataloader import DataLoader
+from services.tablero import tablero
+from models.enums import RolUsuario, EstadoViaje
+from models.viaje import Viaje
 
 def get_user_by_email(db: Session, email: str):
     return db.query(Usuario).filter(Usuario.email == email).first()
@@ -36,11 +44,104 @@ def update_user(db: Session, db_user: Usuario, user_update: dict):
             setattr(db_user, field, value)
     db.commit()
     db.refresh(db_user)
+    cache_respuestas.invalidar("usuario", db_user.id)
     return db_user
 
 def update_password(db: Session, db_user: Usuario, new_password: str):
     hashed_password = pwd_context.hash(new_password[:72])
     db_user.password = hashed_password
     db.commit()
+    cache_respuestas.invalidar("usuario", db_user.id)
     return True
 
+def update_ubicacion(db: Session, db_user: Usuario, lat: float, lon: float):
+    db_user.ubicacion = f'SRID=4326;POINT({lon} {lat})'
+    db_user.fecha_ubicacion = datetime.utcnow()
+    # La ubicación no cambia la versión del perfil: sin esto el onupdate movería
+    # el ETag de /auth/me y /users/{id} con cada reporte del conductor
+    db_user.fecha_actualizacion = Usuario.fecha_actualizacion
+    db.commit()
+    db.refresh(db_user)
+    cache_respuestas.invalidar("usuario", db_user.id)
+    if db_user.rol == RolUsuario.conductor:
+        tablero.conductor_visto(db_user.id)
+    return db_user
+
+def get_conductores_disponibles_coords(db: Session, ubicacion_desde: datetime, limit: int = 500):
+    """
+    Devuelve (id, lon, lat) de los conductores activos que reportaron su
+    ubicación desde `ubicacion_desde` y no tienen un viaje abierto.
+    """
+    viaje_abierto = (
+        db.query(Viaje.id)
+        .filter(
+            Viaje.conductor_id == Usuario.id,
+            Viaje.completado == False,
+            Viaje.estado != EstadoViaje.cancelado,
+        )
+        .exists()
+    )
+    return (
+        db.query(Usuario.id, func.ST_X(Usuario.ubicacion), func.ST_Y(Usuario.ubicacion))
+        .filter(
+            Usuario.rol == RolUsuario.conductor,
+            Usuario.activo == True,
+            Usuario.ubicacion.isnot(None),
+            Usuario.fecha_ubicacion >= ubicacion_desde,
+            ~viaje_abierto,
+        )
+        .limit(limit)
+        .all()
+    )
+
+def buscar_emails_y_placas_existentes(db: Session, emails: List[str], placas: List[str]):
+    """
+    Devuelve (tipo, valor) de los emails y placas que ya existen, con una sola
+    consulta (UNION ALL) para validar un lote de importación completo.
+    """
+    existentes_emails = select(literal("email").label("tipo"), Usuario.email.label("valor")).where(
+        Usuario.email.in_(emails)
+    )
+    existentes_placas = select(literal("placa").label("tipo"), Vehiculo.placa.label("valor")).where(
+        Vehiculo.placa.in_(placas)
+    )
+    return db.execute(union_all(existentes_emails, existentes_placas)).all()
+
+def insertar_conductores_en_lote(db: Session, conductores: List[dict], vehiculos_por_email: Dict[str, dict]):
+    """
+    Inserta los conductores y sus vehículos con INSERT masivos (RETURNING) en
+    una sola transacción. `conductores` trae las contraseñas ya hasheadas.
+    Devuelve {email: (usuario_id, vehiculo_id o None)}.
+    """
+    try:
+        usuarios = db.execute(
+            insert(Usuario).returning(Usuario.id, Usuario.email, sort_by_parameter_order=True),
+            conductores
+        ).all()
+        ids = {email: usuario_id for usuario_id, email in usuarios}
+
+        vehiculos = [
+            {**datos, "conductor_id": ids[email]} for email, datos in vehiculos_por_email.items()
+        ]
+        vehiculo_ids = {}
+        if vehiculos:
+            filas = db.execute(
+                insert(Vehiculo).returning(Vehiculo.id, Vehiculo.conductor_id, sort_by_parameter_order=True),
+                vehiculos
+            ).all()
+            vehiculo_ids = {conductor_id: vehiculo_id for vehiculo_id, conductor_id in filas}
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return {email: (usuario_id, vehiculo_ids.get(usuario_id)) for email, usuario_id in ids.items()}
+
+def get_users_by_ids(db: Session, user_ids: List[int]) -> Dict[int, Usuario]:
+    """Obtiene varios usuarios con una sola consulta IN, indexados por ID."""
+    if not user_ids:
+        return {}
+    return {u.id: u for u in db.query(Usuario).filter(Usuario.id.in_(user_ids)).all()}
+
+def cargador_usuarios(db: Session) -> DataLoader:
+    """Cargador por lotes de usuarios para una petición."""
+    return DataLoader(lambda ids: get_users_by_ids(db, ids))
@@ -2,6 +2,9 @@ from sqlalchemy.orm import Session
 from models.vehiculo import Vehiculo
 from schemas.vehiculo import VehiculoCreate, VehiculoUpdate
 from fastapi import HTTPException
+from core.http_cache import cache_respuestas
+from core.dataloader import DataLoader
+from typing import Dict, List
 
 def create_vehiculo(db: Session, vehiculo: VehiculoCreate, conductor_id: int):
     """
@@ -19,6 +22,12 @@ def get_vehiculo_by_id(db: Session, vehiculo_id: int):
     """
     return db.query(Vehiculo).filter(Vehiculo.id == vehiculo_id).first()
 
+def get_vehiculo_version(db: Session, vehiculo_id: int):
+    """
+    Obtiene solo (id, fecha_actualizacion) de un vehículo, para calcular el ETag.
+    """
+    return db.query(Vehiculo.id, Vehiculo.fecha_actualizacion).filter(Vehiculo.id == vehiculo_id).first()
+
 def get_all_vehiculos(db: Session, skip: int = 0, limit: int = 100):
     """
     Obtiene todos los vehículos.
@@ -50,6 +59,7 @@ def update_vehiculo(db: Session, vehiculo_id: int, vehiculo_update: VehiculoUpda
     
     db.commit()
     db.refresh(db_vehiculo)
+    cache_respuestas.invalidar("vehiculo", vehiculo_id)
     return db_vehiculo
 
 def delete_vehiculo(db: Session, vehiculo_id: int, conductor_id: int):
@@ -67,6 +77,7 @@ def delete_vehiculo(db: Session, vehiculo_id: int, conductor_id: int):
 
     db.delete(db_vehiculo)
     db.commit()
+    cache_respuestas.invalidar("vehiculo", vehiculo_id)
     return {"detail": "Vehículo eliminado"}
 
 
@@ -85,6 +96,7 @@ def update_vehiculo_imagen(db: Session, vehiculo_id: int, imagen_path: str, cond
     db_vehiculo.imagen = imagen_path
     db.commit()
     db.refresh(db_vehiculo)
+    cache_respuestas.invalidar("vehiculo", vehiculo_id)
     return db_vehiculo
 
 
@@ -100,4 +112,17 @@ def update_vehiculo_imagen_operador(db: Session, vehiculo_id: int, imagen_path:
     db_vehiculo.imagen = imagen_path
     db.commit()
     db.refresh(db_vehiculo)
+    cache_respuestas.invalidar("vehiculo", vehiculo_id)
     return db_vehiculo
+
+def get_vehiculos_by_ids(db: Session, vehiculo_ids: List[int]) -> Dict[int, Vehiculo]:
+    """
+    Obtiene varios vehículos con una sola consulta IN, indexados por ID.
+    """
+    if not vehiculo_ids:
+        return {}
+    return {v.id: v for v in db.query(Vehiculo).filter(Vehiculo.id.in_(vehiculo_ids)).all()}
+
+def cargador_vehiculos(db: Session) -> DataLoader:
+    """Cargador por lotes de vehículos para una petición."""
+    return DataLoader(lambda ids: get_vehiculos_by_ids(db, ids))
@@ -1,16 +1,37 @@
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import case, func
 from models.viaje import Viaje
 from models.solicitud import Solicitud
 from models.enums import EstadoViaje
 from schemas.viaje import ViajeCreate, ViajeStatusUpdate
+from repository import tarifa as repository_tarifa
+from services.geo import codificar_polyline, distancia_recorrido_km
+from services.tarifas import calcular_precio
+from services import ganancias as servicio_ganancias
+from services import tablero as servicio_tablero
 from fastapi import HTTPException
 from datetime import datetime
-
-def get_viaje_by_id(db: Session, viaje_id: int):
-    return db.query(Viaje).filter(Viaje.id == viaje_id).first()
+from typing import Optional, Tuple
+import numpy as np
+
+def get_viaje_by_id(db: Session, viaje_id: int, bloquear: bool = False):
+    """
+    Obtiene un viaje junto con su solicitud en una sola consulta (JOIN).
+    La solicitud se necesita para serializar la respuesta y para conocer
+    al pasajero que se debe notificar, así evitamos la carga perezosa.
+    Con bloquear=True toma la fila del viaje con SELECT ... FOR UPDATE hasta
+    el commit: las transiciones verifican el estado y lo cambian sin que un
+    reintento concurrente pase la misma verificación.
+    """
+    consulta = db.query(Viaje).options(joinedload(Viaje.solicitud)).filter(Viaje.id == viaje_id)
+    if bloquear:
+        consulta = consulta.with_for_update(of=Viaje).populate_existing()
+    return consulta.first()
 
 def create_viaje(db: Session, viaje: ViajeCreate, conductor_id: int):
-    solicitud = db.query(Solicitud).filter(Solicitud.id == viaje.solicitud_id).first()
+    # La fila de la solicitud queda bloqueada hasta el commit: dos aceptaciones
+    # concurrentes no pasan ambas la verificación ni ajustan dos veces el tablero
+    solicitud = db.query(Solicitud).filter(Solicitud.id == viaje.solicitud_id).with_for_update().first()
     if not solicitud:
         raise HTTPException(status_code=404, detail="Solicitud not found")
 
@@ -19,6 +40,10 @@ def create_viaje(db: Session, viaje: ViajeCreate, conductor_id: int):
     if existing_viaje:
         raise HTTPException(status_code=400, detail="A trip for this request already exists")
 
+    # Una solicitud expirada o cancelada ya no se puede aceptar
+    if solicitud.estado != EstadoViaje.pendiente:
+        raise HTTPException(status_code=409, detail="Solicitud is no longer pending")
+
     # Cambiar el estado de la solicitud a 'en_curso'
     solicitud.estado = EstadoViaje.en_curso
 
@@ -30,15 +55,28 @@ def create_viaje(db: Session, viaje: ViajeCreate, conductor_id: int):
     )
     db.add(db_viaje)
     db.commit()
+    servicio_tablero.tablero.ajustar(servicio_tablero.SOLICITUDES_PENDIENTES, -1)
+    servicio_tablero.tablero.ajustar(servicio_tablero.VIAJES_EN_CURSO, 1)
     return get_viaje_by_id(db, db_viaje.id)
 
+def get_viajes(db: Session, skip: int = 0, limit: int = 100):
+    """Obtiene una página de viajes (los más recientes primero) con su solicitud"""
+    return (
+        db.query(Viaje)
+        .options(joinedload(Viaje.solicitud))
+        .order_by(Viaje.id.desc())
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
 def get_viajes_by_conductor(db: Session, conductor_id: int):
     """Obtiene todos los viajes de un conductor con la información de la solicitud"""
     return db.query(Viaje).options(joinedload(Viaje.solicitud)).filter(Viaje.conductor_id == conductor_id).all()
 
 def iniciar_viaje(db: Session, viaje_id: int, conductor_id: int):
     """Marca un viaje como iniciado"""
-    db_viaje = get_viaje_by_id(db, viaje_id)
+    db_viaje = get_viaje_by_id(db, viaje_id, bloquear=True)
     if not db_viaje:
         raise HTTPException(status_code=404, detail="Viaje not found")
 
@@ -50,12 +88,20 @@ def iniciar_viaje(db: Session, viaje_id: int, conductor_id: int):
 
     db_viaje.hora_inicio = datetime.utcnow()
     db.commit()
-    db.refresh(db_viaje)
-    return db_viaje
-
-def finalizar_viaje(db: Session, viaje_id: int, conductor_id: int):
-    """Marca un viaje como finalizado"""
-    db_viaje = get_viaje_by_id(db, viaje_id)
+    return get_viaje_by_id(db, viaje_id)
+
+def finalizar_viaje(
+    db: Session,
+    viaje_id: int,
+    conductor_id: int,
+    recorrido: Optional[Tuple[np.ndarray, np.ndarray]] = None
+):
+    """
+    Marca un viaje como finalizado.
+    Si se registró el recorrido GPS (lons, lats), se guarda junto con la
+    distancia, la duración y el precio según la tarifa activa en la misma escritura.
+    """
+    db_viaje = get_viaje_by_id(db, viaje_id, bloquear=True)
     if not db_viaje:
         raise HTTPException(status_code=404, detail="Viaje not found")
 
@@ -70,18 +116,31 @@ def finalizar_viaje(db: Session, viaje_id: int, conductor_id: int):
 
     db_viaje.hora_fin = datetime.utcnow()
     db_viaje.completado = True
-
-    # Actualizar el estado de la solicitud a 'finalizado'
-    solicitud = db.query(Solicitud).filter(Solicitud.id == db_viaje.solicitud_id).first()
-    if solicitud:
-        solicitud.estado = EstadoViaje.finalizado
-
+    db_viaje.duracion_min = round((db_viaje.hora_fin - db_viaje.hora_inicio).total_seconds() / 60.0, 2)
+
+    if recorrido is not None and len(recorrido[0]) > 1:
+        lons, lats = recorrido
+        db_viaje.recorrido_polyline = codificar_polyline(lons, lats)
+        db_viaje.distancia_km = round(distancia_recorrido_km(lons, lats), 3)
+        tarifa = repository_tarifa.get_tarifa_activa(db)
+        if tarifa:
+            db_viaje.precio_calculado = calcular_precio(tarifa, db_viaje.distancia_km, db_viaje.duracion_min)
+
+    # Actualizar el estado de la solicitud a 'finalizado' (ya cargada con el viaje)
+    estaba_en_curso = db_viaje.solicitud is not None and db_viaje.solicitud.estado == EstadoViaje.en_curso
+    if db_viaje.solicitud:
+        db_viaje.solicitud.estado = EstadoViaje.finalizado
+
+    # El resumen diario de ganancias se confirma en la misma transacción
+    servicio_ganancias.registrar_viaje_finalizado(db, db_viaje)
     db.commit()
-    db.refresh(db_viaje)
-    return db_viaje
+    if estaba_en_curso:
+        servicio_tablero.tablero.ajustar(servicio_tablero.VIAJES_EN_CURSO, -1)
+    servicio_tablero.tablero.ajustar(servicio_tablero.VIAJES_SIN_COBRAR, 1)
+    return get_viaje_by_id(db, viaje_id)
 
 def update_viaje_status(db: Session, viaje_id: int, status_update: ViajeStatusUpdate, conductor_id: int):
-    db_viaje = get_viaje_by_id(db, viaje_id)
+    db_viaje = get_viaje_by_id(db, viaje_id, bloquear=True)
     if not db_viaje:
         raise HTTPException(status_code=404, detail="Viaje not found")
 
@@ -91,12 +150,11 @@ def update_viaje_status(db: Session, viaje_id: int, status_update: ViajeStatusUp
     # Assuming 'estado' is part of ViajeStatusUpdate schema
     db_viaje.estado = status_update.estado
     db.commit()
-    db.refresh(db_viaje)
-    return db_viaje
+    return get_viaje_by_id(db, viaje_id)
 
 def marcar_como_pagado(db: Session, viaje_id: int, conductor_id: int):
     """Marca un viaje como pagado (pago en efectivo)"""
-    db_viaje = get_viaje_by_id(db, viaje_id)
+    db_viaje = get_viaje_by_id(db, viaje_id, bloquear=True)
     if not db_viaje:
         raise HTTPException(status_code=404, detail="Viaje not found")
 
@@ -110,7 +168,83 @@ def marcar_como_pagado(db: Session, viaje_id: int, conductor_id: int):
         raise HTTPException(status_code=400, detail="Trip already marked as paid")
 
     db_viaje.pagado = True
+    servicio_ganancias.registrar_pago(db, db_viaje)
     db.commit()
-    db.refresh(db_viaje)
-    return db_viaje
-
+    servicio_tablero.tablero.ajustar(servicio_tablero.VIAJES_SIN_COBRAR, -1)
+    return get_viaje_by_id(db, viaje_id)
+
+
+def consulta_exportacion_viajes(
+    db: Session,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    conductor_id: Optional[int] = None,
+    estado: Optional[EstadoViaje] = None,
+    lote: int = 1000
+):
+    """
+    Consulta de exportación de viajes (tuplas, con el pasajero y la fecha de
+    la solicitud). El rango de fechas se aplica sobre la fecha de creación de
+    la solicitud. El estado es el de la solicitud: las transiciones del viaje
+    lo mantienen al día, mientras que Viaje.estado solo cambia con /status.
+    Se lee con un cursor del lado del servidor en lotes de `lote` filas.
+    """
+    estado_viaje = case(
+        (Viaje.estado == EstadoViaje.cancelado, Viaje.estado),
+        else_=Solicitud.estado,
+    )
+    consulta = (
+        db.query(
+            Viaje.id,
+            Viaje.solicitud_id,
+            Solicitud.pasajero_id,
+            Viaje.conductor_id,
+            Viaje.vehiculo_id,
+            estado_viaje.label("estado"),
+            Solicitud.fecha_creacion,
+            Viaje.hora_inicio,
+            Viaje.hora_fin,
+            Viaje.precio_final,
+            Viaje.precio_calculado,
+            Viaje.distancia_km,
+            Viaje.duracion_min,
+            Viaje.completado,
+            Viaje.pagado,
+        )
+        .join(Solicitud, Viaje.solicitud_id == Solicitud.id)
+    )
+    if desde is not None:
+        consulta = consulta.filter(Solicitud.fecha_creacion >= desde)
+    if hasta is not None:
+        consulta = consulta.filter(Solicitud.fecha_creacion < hasta)
+    if conductor_id is not None:
+        consulta = consulta.filter(Viaje.conductor_id == conductor_id)
+    if estado is not None:
+        consulta = consulta.filter(estado_viaje == estado)
+    return consulta.order_by(Viaje.id).yield_per(lote)
+
+def consulta_precios_aceptados(db: Session, desde: Optional[datetime] = None, lote: int = 10000):
+    """
+    (origen_lon, origen_lat, destino_lon, destino_lat, precio_final) de los
+    viajes completados, del más antiguo al más reciente. Se lee con un cursor
+    del lado del servidor en lotes de `lote` filas.
+    """
+    consulta = (
+        db.query(
+            func.ST_X(Solicitud.origen_geom),
+            func.ST_Y(Solicitud.origen_geom),
+            func.ST_X(Solicitud.destino_geom),
+            func.ST_Y(Solicitud.destino_geom),
+            Viaje.precio_final,
+        )
+        .join(Solicitud, Viaje.solicitud_id == Solicitud.id)
+        .filter(
+            Viaje.completado.is_(True),
+            Viaje.precio_final.isnot(None),
+            Solicitud.origen_geom.isnot(None),
+            Solicitud.destino_geom.isnot(None),
+        )
+    )
+    if desde is not None:
+        consulta = consulta.filter(Viaje.hora_fin >= desde)
+    return consulta.order_by(Viaje.hora_fin).yield_per(lote)
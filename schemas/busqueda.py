@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class ResultadoBusqueda(BaseModel):
+    tipo: str  # "usuario" o "vehiculo"
+    id: int
+    titulo: str  # Nombre del usuario o placa del vehículo
+    detalle: Optional[str] = None  # Email del usuario o marca/modelo/color del vehículo
+    telefono: Optional[str] = None
+    rol: Optional[str] = None
+    conductor_id: Optional[int] = None
+    puntaje: float
+
+    class Config:
+        from_attributes = True
@@ -25,3 +25,26 @@ class Tarifa(TarifaBase):
 
     class Config:
         from_attributes = True
+
+class CotizacionTarifa(BaseModel):
+    tarifa_id: int
+    precio_base: float
+    multiplicador: float
+    precio: float
+    moneda: str
+
+class SugerenciaPrecio(BaseModel):
+    p25: Optional[float] = None
+    p50: Optional[float] = None
+    p75: Optional[float] = None
+    muestras: int
+    fuente: Optional[str] = None  # "zona", "distancia" o None si no hay historial
+
+class CeldaSurge(BaseModel):
+    celda_x: int
+    celda_y: int
+    lon: float
+    lat: float
+    demanda: int
+    oferta: int
+    multiplicador: float
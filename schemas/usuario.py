@@ -1,5 +1,5 @@
 from pydantic import BaseModel, field_validator, EmailStr
-from typing import Optional
+from typing import List, Optional
 from models.enums import RolUsuario
 from .common import Point
 from geoalchemy2.elements import WKBElement
@@ -54,6 +54,34 @@ class UserUpdate(BaseModel):
     email: Optional[EmailStr] = None
     telefono: Optional[str] = None
 
+class UbicacionUpdate(BaseModel):
+    lat: float
+    lon: float
+
 class PasswordChange(BaseModel):
     current_password: str
     new_password: str
+
+class ConductorImportacion(UserCreate):
+    """Fila de la importación masiva: un conductor y, opcionalmente, su vehículo."""
+    rol: RolUsuario = RolUsuario.conductor
+    marca: Optional[str] = None
+    modelo: Optional[str] = None
+    placa: Optional[str] = None
+    color: Optional[str] = None
+    anio: Optional[int] = None
+
+class ResultadoFilaImportacion(BaseModel):
+    fila: int
+    email: Optional[str] = None
+    placa: Optional[str] = None
+    creado: bool
+    usuario_id: Optional[int] = None
+    vehiculo_id: Optional[int] = None
+    errores: List[str] = []
+
+class ReporteImportacion(BaseModel):
+    total: int
+    creados: int
+    rechazados: int
+    filas: List[ResultadoFilaImportacion]
@@ -27,7 +27,32 @@ class Viaje(ViajeBase):
     hora_fin: Optional[datetime] = None
     completado: bool
     pagado: bool = False
+    recorrido_polyline: Optional[str] = None
+    distancia_km: Optional[float] = None
+    duracion_min: Optional[float] = None
+    precio_calculado: Optional[float] = None
     solicitud: Optional[Solicitud] = None
 
     class Config:
         from_attributes = True
+
+from schemas.vehiculo import Vehiculo
+from schemas.usuario import User
+
+class ViajeExpandido(Viaje):
+    """Viaje con las entidades pedidas en ?include= (las demás quedan en null)."""
+    vehiculo: Optional[Vehiculo] = None
+    conductor: Optional[User] = None
+    pasajero: Optional[User] = None
+
+class ResumenGanancias(BaseModel):
+    viajes: int = 0
+    ingresos: float = 0
+    pagado: float = 0
+    pendiente: float = 0
+    minutos_en_viaje: float = 0
+
+class GananciasConductor(BaseModel):
+    hoy: ResumenGanancias
+    semana: ResumenGanancias
+    mes: ResumenGanancias
@@ -0,0 +1,134 @@
+"""
+Expiración programada de solicitudes pendientes.
+
+Cada solicitud pendiente tiene un vencimiento (fecha_creacion + TTL) guardado
+en un heap en memoria. La tarea duerme hasta el vencimiento más próximo, toma
+todos los vencidos y los cancela con un único UPDATE ... RETURNING, sin
+recorrer la tabla periódicamente. El heap se reconstruye desde la base de
+datos al arrancar el worker.
+"""
+import asyncio
+import heapq
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+
+from database.database import SessionLocal
+from repository import solicitud as repository_solicitud
+from core.websockets import manager
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# 0 desactiva la expiración
+SOLICITUD_TTL_SECONDS = float(os.getenv("SOLICITUD_TTL_SECONDS", "900"))
+# Vencimientos que se agrupan en un mismo UPDATE
+EXPIRACION_LOTE_MAX = int(os.getenv("EXPIRACION_LOTE_MAX", "500"))
+REINTENTO_SEGUNDOS = 5.0
+
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def _epoch_utc(fecha: datetime) -> float:
+    """fecha_creacion se guarda en UTC sin zona horaria."""
+    return (fecha.replace(tzinfo=None) - EPOCH).total_seconds()
+
+
+class ExpiracionScheduler:
+    def __init__(self, ttl_s: float = SOLICITUD_TTL_SECONDS, lote_max: int = EXPIRACION_LOTE_MAX):
+        self.ttl_s = ttl_s
+        self.lote_max = lote_max
+        # (vencimiento en epoch, solicitud_id, pasajero_id)
+        self._heap: List[Tuple[float, int, int]] = []
+        self._despertar: Optional[asyncio.Event] = None
+
+    @property
+    def habilitado(self) -> bool:
+        return self.ttl_s > 0
+
+    def programar(self, solicitud_id: int, pasajero_id: int, fecha_creacion: Optional[datetime] = None):
+        """Agrega el vencimiento de una solicitud nueva. Debe llamarse desde el event loop."""
+        if not self.habilitado:
+            return
+        creada = _epoch_utc(fecha_creacion) if fecha_creacion else time.time()
+        vencimiento = creada + self.ttl_s
+        adelanta = not self._heap or vencimiento < self._heap[0][0]
+        heapq.heappush(self._heap, (vencimiento, solicitud_id, pasajero_id))
+        if adelanta and self._despertar is not None:
+            self._despertar.set()
+
+    def _reconstruir(self):
+        db = SessionLocal()
+        try:
+            pendientes = repository_solicitud.get_solicitudes_pendientes_expiracion(db)
+        finally:
+            db.close()
+        ahora = time.time()
+        heap = []
+        for solicitud_id, pasajero_id, fecha_creacion in pendientes:
+            # Las solicitudes antiguas sin fecha_creacion vencen un TTL después del arranque
+            creada = _epoch_utc(fecha_creacion) if fecha_creacion else ahora
+            heap.append((creada + self.ttl_s, solicitud_id, pasajero_id))
+        heapq.heapify(heap)
+        return heap
+
+    def _expirar(self, solicitud_ids: List[int]):
+        db = SessionLocal()
+        try:
+            return repository_solicitud.expirar_solicitudes(db, solicitud_ids)
+        finally:
+            db.close()
+
+    def _tomar_vencidos(self, ahora: float) -> List[Tuple[float, int, int]]:
+        vencidos = []
+        while self._heap and self._heap[0][0] <= ahora and len(vencidos) < self.lote_max:
+            vencidos.append(heapq.heappop(self._heap))
+        return vencidos
+
+    async def run(self):
+        self._despertar = asyncio.Event()
+        try:
+            for entrada in await run_in_threadpool(self._reconstruir):
+                heapq.heappush(self._heap, entrada)
+        except Exception:
+            logger.exception("No se pudo reconstruir los vencimientos desde la base de datos")
+
+        while True:
+            self._despertar.clear()
+            ahora = time.time()
+            vencidos = self._tomar_vencidos(ahora)
+            if vencidos:
+                try:
+                    expiradas = await run_in_threadpool(self._expirar, [sid for _, sid, _ in vencidos])
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception("Error expirando solicitudes")
+                    # Reintentar el lote más tarde
+                    for _, solicitud_id, pasajero_id in vencidos:
+                        heapq.heappush(self._heap, (ahora + REINTENTO_SEGUNDOS, solicitud_id, pasajero_id))
+                    await asyncio.sleep(REINTENTO_SEGUNDOS)
+                    continue
+                for solicitud_id, pasajero_id in expiradas:
+                    await manager.send_personal_message_by_id(
+                        f"Solicitud expired: {json.dumps({'solicitud_id': solicitud_id})}",
+                        pasajero_id
+                    )
+                continue
+
+            espera = self._heap[0][0] - ahora if self._heap else None
+            try:
+                await asyncio.wait_for(self._despertar.wait(), timeout=espera)
+            except asyncio.TimeoutError:
+                pass
+
+
+expiracion_scheduler = ExpiracionScheduler()
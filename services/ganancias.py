@@ -0,0 +1,83 @@
+"""
+Resúmenes de ganancias de los conductores (hoy, esta semana, este mes).
+
+La tabla ganancias_diarias guarda una fila por conductor y día, que se
+actualiza en la misma transacción que finaliza o cobra el viaje. Consultar
+un periodo suma como mucho ~31 filas, sin importar cuántos viajes tenga el
+conductor. Los días se cuentan en GANANCIAS_ZONA_HORARIA.
+
+Backfill (reconstruye la tabla desde los viajes):
+    python -m services.ganancias --desde 2024-01-01 [--conductor-id 7]
+"""
+import argparse
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+from repository import ganancias as repository_ganancias
+from schemas.viaje import GananciasConductor
+
+load_dotenv()
+
+GANANCIAS_ZONA_HORARIA = os.getenv("GANANCIAS_ZONA_HORARIA", "UTC")
+_zona = ZoneInfo(GANANCIAS_ZONA_HORARIA)
+
+
+def dia_local(momento_utc: datetime) -> date:
+    """Día local de un datetime naive en UTC (así se guardan hora_inicio/hora_fin)."""
+    return momento_utc.replace(tzinfo=timezone.utc).astimezone(_zona).date()
+
+
+def periodos(hoy: date) -> dict:
+    return {
+        "hoy": hoy,
+        "semana": hoy - timedelta(days=hoy.weekday()),
+        "mes": hoy.replace(day=1),
+    }
+
+
+def registrar_viaje_finalizado(db: Session, viaje):
+    repository_ganancias.sumar_viaje_finalizado(
+        db, viaje.conductor_id, dia_local(viaje.hora_fin), viaje.precio_final or 0, viaje.duracion_min or 0
+    )
+
+
+def registrar_pago(db: Session, viaje):
+    repository_ganancias.sumar_pago(db, viaje.conductor_id, dia_local(viaje.hora_fin), viaje.precio_final or 0)
+
+
+def resumen_conductor(db: Session, conductor_id: int) -> GananciasConductor:
+    rangos = periodos(dia_local(datetime.utcnow()))
+    fila = repository_ganancias.get_resumen_periodos(db, conductor_id, rangos)
+    datos = {nombre: {} for nombre in rangos}
+    for clave, valor in fila.items():
+        nombre, campo = clave.split("__")
+        datos[nombre][campo] = valor
+    return GananciasConductor(**datos)
+
+
+def backfill(desde: Optional[date] = None, conductor_id: Optional[int] = None) -> int:
+    from database.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return repository_ganancias.recalcular_ganancias(db, GANANCIAS_ZONA_HORARIA, desde, conductor_id)
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruye ganancias_diarias desde la tabla de viajes")
+    parser.add_argument("--desde", type=date.fromisoformat, default=None)
+    parser.add_argument("--conductor-id", type=int, default=None)
+    args = parser.parse_args()
+    escritas = backfill(args.desde, args.conductor_id)
+    print(f"Filas de ganancias recalculadas: {escritas}")
+
+
+if __name__ == "__main__":
+    main()
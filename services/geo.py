@@ -0,0 +1,100 @@
+"""
+Utilidades geográficas puras (sin base de datos) compartidas por los servicios.
+"""
+import math
+from typing import List, Tuple
+
+import numpy as np
+
+RADIO_TIERRA_KM = 6371.0088
+
+
+def matriz_distancias_km(origenes: np.ndarray, destinos: np.ndarray) -> np.ndarray:
+    """
+    Distancia haversine entre cada par (origen, destino).
+    Ambos arreglos tienen forma (n, 2) con columnas (lon, lat) en grados.
+    Devuelve una matriz (n_origenes, n_destinos) en kilómetros.
+    """
+    o = np.radians(np.asarray(origenes, dtype=np.float64))
+    d = np.radians(np.asarray(destinos, dtype=np.float64))
+    lon1, lat1 = o[:, 0:1], o[:, 1:2]
+    lon2, lat2 = d[None, :, 0], d[None, :, 1]
+    a = (
+        np.sin((lat2 - lat1) / 2.0) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2
+    )
+    return 2.0 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def asignacion_greedy(distancias: np.ndarray, radio_km: float) -> List[Tuple[int, int, float]]:
+    """
+    Asigna filas (solicitudes) a columnas (conductores) tomando siempre el par
+    libre más cercano. Ignora los pares a más de radio_km.
+    Devuelve una lista de (fila, columna, distancia_km).
+    """
+    if distancias.size == 0:
+        return []
+
+    filas_totales, columnas_totales = distancias.shape
+    candidatos = np.flatnonzero(distancias.ravel() <= radio_km)
+    orden = candidatos[np.argsort(distancias.ravel()[candidatos], kind="stable")]
+
+    filas_usadas = np.zeros(filas_totales, dtype=bool)
+    columnas_usadas = np.zeros(columnas_totales, dtype=bool)
+    maximo = min(filas_totales, columnas_totales)
+    resultado: List[Tuple[int, int, float]] = []
+
+    for fila, columna in zip(*np.unravel_index(orden, distancias.shape)):
+        if filas_usadas[fila] or columnas_usadas[columna]:
+            continue
+        filas_usadas[fila] = True
+        columnas_usadas[columna] = True
+        resultado.append((int(fila), int(columna), float(distancias[fila, columna])))
+        if len(resultado) == maximo:
+            break
+
+    return resultado
+
+
+def celda(lon: float, lat: float, tamano_grados: float) -> Tuple[int, int]:
+    """Índices (x, y) de la celda cuadrada de la grilla que contiene el punto."""
+    return (math.floor(lon / tamano_grados), math.floor(lat / tamano_grados))
+
+
+def centro_celda(indice: Tuple[int, int], tamano_grados: float) -> Tuple[float, float]:
+    """Coordenadas (lon, lat) del centro de una celda."""
+    return ((indice[0] + 0.5) * tamano_grados, (indice[1] + 0.5) * tamano_grados)
+
+
+def distancia_recorrido_km(lons: np.ndarray, lats: np.ndarray) -> float:
+    """Longitud total en km de la polilínea formada por los puntos consecutivos."""
+    if len(lons) < 2:
+        return 0.0
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    a = (
+        np.sin(np.diff(lat) / 2.0) ** 2
+        + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2.0) ** 2
+    )
+    return float(np.sum(2.0 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))))
+
+
+def codificar_polyline(lons, lats, precision: int = 5) -> str:
+    """
+    Codifica los puntos con el algoritmo "encoded polyline" de Google,
+    el mismo formato que consumen OSRM y las librerías de mapas del cliente.
+    """
+    factor = 10 ** precision
+    salida = []
+    lat_previa = lon_previa = 0
+    for lon, lat in zip(lons, lats):
+        lat_entera = int(round(lat * factor))
+        lon_entera = int(round(lon * factor))
+        for delta in (lat_entera - lat_previa, lon_entera - lon_previa):
+            valor = ~(delta << 1) if delta < 0 else delta << 1
+            while valor >= 0x20:
+                salida.append(chr((0x20 | (valor & 0x1F)) + 63))
+                valor >>= 5
+            salida.append(chr(valor + 63))
+        lat_previa, lon_previa = lat_entera, lon_entera
+    return "".join(salida)
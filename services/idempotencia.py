@@ -0,0 +1,133 @@
+"""
+Soporte de la cabecera Idempotency-Key para los POST que crean recursos.
+
+Un reintento con la misma clave (por el mismo usuario y en la misma ruta)
+devuelve la respuesta guardada sin repetir el INSERT ni el broadcast. Las
+respuestas completadas se guardan en la tabla idempotency_keys, compartida
+por todos los workers, y en una caché LRU local acotada y con TTL que evita
+la consulta en los reintentos más comunes.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+from repository import idempotencia as repository_idempotencia
+
+load_dotenv()
+
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+# Cada cuántas respuestas completadas se borran de la tabla las claves vencidas
+IDEMPOTENCY_PURGE_EVERY = int(os.getenv("IDEMPOTENCY_PURGE_EVERY", "1000"))
+
+# Longitud de la columna idempotency_keys.clave
+MAX_LONGITUD_CLAVE = 255
+
+Clave = Tuple[str, int, str]
+
+
+class IdempotenciaStore:
+    def __init__(
+        self,
+        ttl_s: float = IDEMPOTENCY_TTL_SECONDS,
+        bloqueo_s: float = IDEMPOTENCY_LOCK_SECONDS,
+        max_entradas: int = IDEMPOTENCY_CACHE_SIZE,
+        purgar_cada: int = IDEMPOTENCY_PURGE_EVERY,
+    ):
+        self.ttl_s = ttl_s
+        self.bloqueo_s = bloqueo_s
+        self.max_entradas = max_entradas
+        self.purgar_cada = purgar_cada
+        self._lock = threading.Lock()
+        # (clave, usuario_id, ruta) -> (expira, status_code, respuesta)
+        self._cache: "OrderedDict[Clave, Tuple[float, int, object]]" = OrderedDict()
+        self._completadas = 0
+
+    def _cache_get(self, clave: Clave):
+        with self._lock:
+            entrada = self._cache.get(clave)
+            if entrada is None:
+                return None
+            if entrada[0] <= time.monotonic():
+                del self._cache[clave]
+                return None
+            self._cache.move_to_end(clave)
+            return entrada
+
+    def _cache_put(self, clave: Clave, status_code: int, respuesta, restante_s: float):
+        with self._lock:
+            self._cache[clave] = (time.monotonic() + restante_s, status_code, respuesta)
+            self._cache.move_to_end(clave)
+            while len(self._cache) > self.max_entradas:
+                self._cache.popitem(last=False)
+
+    @staticmethod
+    def _respuesta_guardada(status_code: int, respuesta) -> JSONResponse:
+        return JSONResponse(content=respuesta, status_code=status_code, headers={"Idempotent-Replayed": "true"})
+
+    def iniciar(self, db: Session, clave: Optional[str], usuario_id: int, ruta: str) -> Optional[JSONResponse]:
+        """
+        Reserva la clave antes de procesar la petición.
+        Devuelve la respuesta guardada si la clave ya se completó, None si la
+        petición debe procesarse, o lanza 409 si otra petición con la misma
+        clave sigue en curso. Las claves de más de MAX_LONGITUD_CLAVE
+        caracteres se rechazan con 400.
+        """
+        if not clave:
+            return None
+        if len(clave) > MAX_LONGITUD_CLAVE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"La Idempotency-Key admite como máximo {MAX_LONGITUD_CLAVE} caracteres"
+            )
+
+        llave = (clave, usuario_id, ruta)
+        entrada = self._cache_get(llave)
+        if entrada is not None:
+            return self._respuesta_guardada(entrada[1], entrada[2])
+
+        if repository_idempotencia.reservar_clave(db, clave, usuario_id, ruta, self.ttl_s, self.bloqueo_s):
+            return None
+
+        db_clave = repository_idempotencia.get_clave(db, clave, usuario_id, ruta)
+        if db_clave is not None and db_clave.status_code is not None:
+            restante = (db_clave.fecha_creacion + timedelta(seconds=self.ttl_s) - datetime.utcnow()).total_seconds()
+            if restante > 0:
+                self._cache_put(llave, db_clave.status_code, db_clave.respuesta, restante)
+            return self._respuesta_guardada(db_clave.status_code, db_clave.respuesta)
+
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ya hay una petición en curso con esta Idempotency-Key"
+        )
+
+    def completar(self, db: Session, clave: Optional[str], usuario_id: int, ruta: str, respuesta, status_code: int = 200):
+        """Guarda la respuesta (ya serializable a JSON) de una petición procesada."""
+        if not clave:
+            return
+        repository_idempotencia.completar_clave(db, clave, usuario_id, ruta, status_code, respuesta)
+        self._cache_put((clave, usuario_id, ruta), status_code, respuesta, self.ttl_s)
+
+        with self._lock:
+            self._completadas += 1
+            purgar = self._completadas % self.purgar_cada == 0
+        if purgar:
+            repository_idempotencia.purgar_claves(db, datetime.utcnow() - timedelta(seconds=self.ttl_s))
+
+    def liberar(self, db: Session, clave: Optional[str], usuario_id: int, ruta: str):
+        """Libera la reserva tras un error para que el reintento vuelva a procesarse."""
+        if not clave:
+            return
+        repository_idempotencia.liberar_clave(db, clave, usuario_id, ruta)
+
+
+idempotencia_store = IdempotenciaStore()
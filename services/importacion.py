@@ -0,0 +1,186 @@
+"""
+Importación masiva de conductores (y sus vehículos) desde CSV o NDJSON.
+
+Todas las filas se validan primero. Los emails y las placas repetidos se
+detectan dentro del archivo y contra la base con una sola consulta. Los
+hashes bcrypt, que son lo más costoso, se calculan en paralelo: la librería
+bcrypt libera el GIL, así que un pool de hilos ocupa todos los núcleos. Al
+final las filas válidas se insertan con INSERT masivos en una transacción.
+El reporte indica el resultado de cada fila.
+"""
+import csv
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from core.security import get_password_hash
+from models.enums import RolUsuario
+from repository import usuario as repository_usuario
+from schemas.usuario import ConductorImportacion, ReporteImportacion, ResultadoFilaImportacion
+from schemas.vehiculo import VehiculoCreate
+
+load_dotenv()
+
+IMPORT_MAX_FILAS = int(os.getenv("IMPORT_MAX_FILAS", "5000"))
+IMPORT_HASH_WORKERS = int(os.getenv("IMPORT_HASH_WORKERS", str(os.cpu_count() or 1)))
+
+CAMPOS_VEHICULO = ("marca", "modelo", "placa", "color", "anio")
+
+
+def leer_filas(contenido: bytes, formato: str) -> List[object]:
+    """
+    Devuelve una entrada por fila de datos: un dict con los campos, o un str
+    con el error si la línea NDJSON no se pudo decodificar.
+    """
+    try:
+        texto = contenido.decode("utf-8-sig")
+    except UnicodeDecodeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El archivo debe estar codificado en UTF-8 (byte inválido en la posición {e.start}); "
+                   "en Excel, guárdalo como 'CSV UTF-8'"
+        )
+    if formato == "csv":
+        return [
+            {campo: (valor.strip() or None) if isinstance(valor, str) else valor for campo, valor in fila.items()}
+            for fila in csv.DictReader(io.StringIO(texto))
+        ]
+    filas = []
+    for linea in texto.splitlines():
+        if not linea.strip():
+            continue
+        try:
+            datos = json.loads(linea)
+        except json.JSONDecodeError as e:
+            filas.append(f"JSON inválido: {e.msg}")
+            continue
+        filas.append(datos if isinstance(datos, dict) else "Cada línea debe ser un objeto JSON")
+    return filas
+
+
+def _errores_validacion(error: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in error.errors()]
+
+
+def _validar(datos: dict):
+    """Devuelve (conductor, vehiculo o None, errores)."""
+    datos = {**datos, "rol": RolUsuario.conductor}
+    try:
+        conductor = ConductorImportacion.model_validate(datos)
+    except ValidationError as e:
+        return None, None, _errores_validacion(e)
+
+    if not any(getattr(conductor, campo) is not None for campo in CAMPOS_VEHICULO):
+        return conductor, None, []
+    try:
+        vehiculo = VehiculoCreate(**{campo: getattr(conductor, campo) for campo in CAMPOS_VEHICULO})
+    except ValidationError as e:
+        return conductor, None, _errores_validacion(e)
+    return conductor, vehiculo, []
+
+
+def importar_conductores(db: Session, contenido: bytes, formato: str) -> ReporteImportacion:
+    filas = leer_filas(contenido, formato)
+    if len(filas) > IMPORT_MAX_FILAS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"El archivo supera el máximo de {IMPORT_MAX_FILAS} filas"
+        )
+
+    resultados: List[ResultadoFilaImportacion] = []
+    validas = []  # (resultado, conductor, vehiculo)
+    primera_fila_email: Dict[str, int] = {}
+    primera_fila_placa: Dict[str, int] = {}
+
+    for numero, datos in enumerate(filas, start=1):
+        resultado = ResultadoFilaImportacion(fila=numero, creado=False)
+        resultados.append(resultado)
+        if isinstance(datos, str):
+            resultado.errores.append(datos)
+            continue
+
+        conductor, vehiculo, errores = _validar(datos)
+        resultado.errores.extend(errores)
+        if conductor is None:
+            continue
+        resultado.email = conductor.email
+        resultado.placa = vehiculo.placa if vehiculo else None
+
+        anterior = primera_fila_email.setdefault(conductor.email, numero)
+        if anterior != numero:
+            resultado.errores.append(f"Email repetido en el archivo (fila {anterior})")
+        if vehiculo is not None:
+            anterior = primera_fila_placa.setdefault(vehiculo.placa, numero)
+            if anterior != numero:
+                resultado.errores.append(f"Placa repetida en el archivo (fila {anterior})")
+        if not resultado.errores:
+            validas.append((resultado, conductor, vehiculo))
+
+    if validas:
+        existentes = repository_usuario.buscar_emails_y_placas_existentes(
+            db,
+            [conductor.email for _, conductor, _ in validas],
+            [vehiculo.placa for _, _, vehiculo in validas if vehiculo is not None],
+        )
+        emails_existentes = {valor for tipo, valor in existentes if tipo == "email"}
+        placas_existentes = {valor for tipo, valor in existentes if tipo == "placa"}
+        for resultado, conductor, vehiculo in validas:
+            if conductor.email in emails_existentes:
+                resultado.errores.append("Email already registered")
+            if vehiculo is not None and vehiculo.placa in placas_existentes:
+                resultado.errores.append("Placa ya registrada")
+        validas = [v for v in validas if not v[0].errores]
+
+    if validas:
+        with ThreadPoolExecutor(max_workers=IMPORT_HASH_WORKERS) as pool:
+            hashes = list(pool.map(get_password_hash, [conductor.password for _, conductor, _ in validas]))
+
+        conductores = [
+            {
+                "nombre": conductor.nombre,
+                "email": conductor.email,
+                "telefono": conductor.telefono,
+                "rol": RolUsuario.conductor,
+                "password": password_hash,
+                "activo": True,
+            }
+            for (_, conductor, _), password_hash in zip(validas, hashes)
+        ]
+        vehiculos_por_email = {
+            conductor.email: {**vehiculo.model_dump(), "activo": True}
+            for _, conductor, vehiculo in validas
+            if vehiculo is not None
+        }
+        try:
+            creados = repository_usuario.insertar_conductores_en_lote(db, conductores, vehiculos_por_email)
+        except IntegrityError:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Otro proceso registró alguno de los emails o placas; reintenta la importación"
+            )
+        for resultado, conductor, _ in validas:
+            resultado.usuario_id, resultado.vehiculo_id = creados[conductor.email]
+            resultado.creado = True
+
+    total_creados = sum(1 for r in resultados if r.creado)
+    return ReporteImportacion(
+        total=len(resultados),
+        creados=total_creados,
+        rechazados=len(resultados) - total_creados,
+        filas=resultados
+    )
+
+
+def formato_de_archivo(nombre: Optional[str], formato: Optional[str]) -> str:
+    """El formato explícito manda; si no, se deduce de la extensión del archivo."""
+    if formato:
+        return formato
+    return "csv" if (nombre or "").lower().endswith(".csv") else "ndjson"
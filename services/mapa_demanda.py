@@ -0,0 +1,226 @@
+"""
+Mapa de calor histórico de la demanda (orígenes de solicitudes).
+
+Los orígenes se agrupan en una grilla cuadrada de HEATMAP_CELL_DEGREES y por
+hora de la semana (0 = lunes 00h, en HEATMAP_ZONA_HORARIA). El resultado es
+un arreglo uint32 de forma (168, filas, columnas) guardado como .npy, con
+sus metadatos (origen de la grilla, tamaño de celda) en un .json al lado.
+
+Cada worker abre el .npy con memoria mapeada al arrancar: responder una hora
+es recorrer una rebanada contigua del archivo. Las solicitudes nuevas suman
+directamente en el mapa compartido, así que los workers ven los mismos
+conteos. Si el archivo se regenera, los workers lo vuelven a abrir.
+
+La extensión de la grilla sale de HEATMAP_BBOX ("lon_min,lat_min,lon_max,lat_max")
+o, si no se configura, de los percentiles 1 y 99 de los orígenes; los puntos
+fuera de ella no se cuentan. Si la grilla supera HEATMAP_MAX_CELDAS celdas
+por hora, no se genera.
+
+Generación (recorre las solicitudes en streaming, por lotes con NumPy):
+    python -m services.mapa_demanda [--desde 2024-01-01] [--celda 0.005]
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from dotenv import load_dotenv
+
+from database.database import SessionLocal
+from repository import solicitud as repository_solicitud
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+HORAS_SEMANA = 168
+HEATMAP_PATH = os.getenv(
+    "HEATMAP_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "heatmap.npy")
+)
+HEATMAP_CELL_DEGREES = float(os.getenv("HEATMAP_CELL_DEGREES", "0.005"))
+HEATMAP_ZONA_HORARIA = os.getenv("HEATMAP_ZONA_HORARIA", "UTC")
+HEATMAP_BBOX = os.getenv("HEATMAP_BBOX")
+# 250000 celdas por hora son ~168 MB en disco (168 horas, uint32)
+HEATMAP_MAX_CELDAS = int(os.getenv("HEATMAP_MAX_CELDAS", "250000"))
+# Cada cuánto se comprueba si el archivo fue regenerado
+HEATMAP_RECARGA_SECONDS = float(os.getenv("HEATMAP_RECARGA_SECONDS", "30"))
+LOTE_FILAS = 50000
+
+
+def _ruta_meta(ruta: str) -> str:
+    return os.path.splitext(ruta)[0] + ".json"
+
+
+def leer_bbox(valor: Optional[str]) -> Optional[Tuple[float, float, float, float]]:
+    """'lon_min,lat_min,lon_max,lat_max' -> tupla de floats, o None si no se configuró."""
+    if not valor:
+        return None
+    lon_min, lat_min, lon_max, lat_max = (float(v) for v in valor.split(","))
+    if lon_min >= lon_max or lat_min >= lat_max:
+        raise ValueError(f"HEATMAP_BBOX inválido: {valor}")
+    return lon_min, lat_min, lon_max, lat_max
+
+
+def binear(conteos_planos: np.ndarray, meta: dict, lons, lats, horas):
+    """Suma un lote de puntos a los conteos (arreglo plano de 168*filas*columnas)."""
+    lons = np.asarray(lons, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+    horas = np.asarray(horas, dtype=np.int64)
+    filas, columnas = meta["filas"], meta["columnas"]
+    col = np.floor((lons - meta["lon_min"]) / meta["celda_grados"]).astype(np.int64)
+    fil = np.floor((lats - meta["lat_min"]) / meta["celda_grados"]).astype(np.int64)
+    dentro = (col >= 0) & (col < columnas) & (fil >= 0) & (fil < filas) & (horas >= 0) & (horas < HORAS_SEMANA)
+    indices = (horas[dentro] * filas + fil[dentro]) * columnas + col[dentro]
+    unicos, cantidades = np.unique(indices, return_counts=True)
+    conteos_planos[unicos] += cantidades.astype(conteos_planos.dtype)
+
+
+class MapaDemanda:
+    def __init__(self, ruta: str = HEATMAP_PATH, zona_horaria: str = HEATMAP_ZONA_HORARIA):
+        self.ruta = ruta
+        self.zona = ZoneInfo(zona_horaria)
+        self._lock = threading.Lock()
+        self._conteos: Optional[np.ndarray] = None
+        self._meta: Optional[dict] = None
+        self._inodo = None
+        self._proxima_revision = 0.0
+
+    @property
+    def disponible(self) -> bool:
+        self._revisar_archivo()
+        return self._conteos is not None
+
+    def cargar(self):
+        """Abre el arreglo con memoria mapeada (lectura y escritura compartida)."""
+        try:
+            with open(_ruta_meta(self.ruta)) as f:
+                meta = json.load(f)
+            conteos = np.load(self.ruta, mmap_mode="r+")
+            inodo = os.stat(self.ruta).st_ino
+        except FileNotFoundError:
+            return
+        except Exception:
+            logger.exception("No se pudo abrir el mapa de demanda %s", self.ruta)
+            return
+        with self._lock:
+            self._conteos, self._meta, self._inodo = conteos, meta, inodo
+
+    def _revisar_archivo(self):
+        ahora = time.monotonic()
+        if ahora < self._proxima_revision:
+            return
+        self._proxima_revision = ahora + HEATMAP_RECARGA_SECONDS
+        try:
+            inodo = os.stat(self.ruta).st_ino
+        except FileNotFoundError:
+            return
+        if inodo != self._inodo:
+            self.cargar()
+
+    def hora_semana(self, fecha_utc: datetime) -> int:
+        local = fecha_utc.replace(tzinfo=timezone.utc).astimezone(self.zona)
+        return local.weekday() * 24 + local.hour
+
+    def registrar_solicitud(self, lon: float, lat: float, fecha_creacion: Optional[datetime] = None):
+        """Camino incremental: suma la solicitud nueva a su celda y hora."""
+        if self._conteos is None:
+            return
+        hora = self.hora_semana(fecha_creacion or datetime.utcnow())
+        with self._lock:
+            binear(self._conteos.reshape(-1), self._meta, [lon], [lat], [hora])
+
+    def celdas(self, hora: int):
+        """
+        Devuelve (metadatos, lista [lon, lat, solicitudes] del centro de cada
+        celda con demanda) para la hora de la semana indicada.
+        """
+        self._revisar_archivo()
+        with self._lock:
+            conteos, meta = self._conteos, self._meta
+        rebanada = conteos[hora]
+        fil, col = np.nonzero(rebanada)
+        celda_grados = meta["celda_grados"]
+        lons = np.round(meta["lon_min"] + (col + 0.5) * celda_grados, 6)
+        lats = np.round(meta["lat_min"] + (fil + 0.5) * celda_grados, 6)
+        return meta, list(zip(lons.tolist(), lats.tolist(), rebanada[fil, col].tolist()))
+
+
+def generar(db, ruta: str = HEATMAP_PATH, celda_grados: float = HEATMAP_CELL_DEGREES,
+            zona_horaria: str = HEATMAP_ZONA_HORARIA, desde: Optional[datetime] = None,
+            bbox: Optional[Tuple[float, float, float, float]] = leer_bbox(HEATMAP_BBOX),
+            max_celdas: int = HEATMAP_MAX_CELDAS) -> dict:
+    """
+    Recorre los orígenes de las solicitudes en streaming y escribe el arreglo
+    y sus metadatos. Se escribe en archivos temporales y se reemplazan al final,
+    así los workers nunca leen un archivo a medio escribir.
+    """
+    lon_min, lat_min, lon_max, lat_max = bbox or repository_solicitud.get_extension_origenes(db)
+    if lon_min is None:
+        raise ValueError("No hay solicitudes con origen para generar el mapa")
+    meta = {
+        "lon_min": float(lon_min),
+        "lat_min": float(lat_min),
+        "celda_grados": celda_grados,
+        "columnas": int((lon_max - lon_min) // celda_grados) + 1,
+        "filas": int((lat_max - lat_min) // celda_grados) + 1,
+        "zona_horaria": zona_horaria,
+        "generado": datetime.utcnow().isoformat(),
+    }
+    if meta["filas"] * meta["columnas"] > max_celdas:
+        raise ValueError(
+            f"La grilla de {meta['filas']}x{meta['columnas']} celdas supera HEATMAP_MAX_CELDAS={max_celdas}; "
+            "configura HEATMAP_BBOX o una celda más grande"
+        )
+
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    temporal = ruta + ".tmp.npy"
+    conteos = np.lib.format.open_memmap(
+        temporal, mode="w+", dtype=np.uint32, shape=(HORAS_SEMANA, meta["filas"], meta["columnas"])
+    )
+    planos = conteos.reshape(-1)
+    filas = iter(repository_solicitud.consulta_origenes_por_hora(db, zona_horaria, desde, lote=LOTE_FILAS))
+    total = 0
+    while True:
+        lote = list(itertools.islice(filas, LOTE_FILAS))
+        if not lote:
+            break
+        datos = np.array(lote, dtype=np.float64)
+        binear(planos, meta, datos[:, 0], datos[:, 1], datos[:, 2])
+        total += len(lote)
+    conteos.flush()
+    del conteos, planos
+
+    meta["solicitudes"] = total
+    with open(_ruta_meta(temporal), "w") as f:
+        json.dump(meta, f)
+    os.replace(_ruta_meta(temporal), _ruta_meta(ruta))
+    os.replace(temporal, ruta)
+    return meta
+
+
+mapa_demanda = MapaDemanda()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera el mapa de calor de demanda por hora de la semana")
+    parser.add_argument("--desde", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--celda", type=float, default=HEATMAP_CELL_DEGREES)
+    parser.add_argument("--bbox", type=leer_bbox, default=HEATMAP_BBOX, help="lon_min,lat_min,lon_max,lat_max")
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        meta = generar(db, celda_grados=args.celda, desde=args.desde, bbox=args.bbox)
+    finally:
+        db.close()
+    print(json.dumps(meta, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Motor de asignación por lotes conductor–solicitud.
+
+En lugar de que gane el primer conductor que responde al broadcast, el motor
+toma periódicamente todas las solicitudes 'pendiente' y los conductores libres
+con ubicación conocida, calcula la matriz de distancias de recogida de forma
+vectorizada y resuelve una asignación greedy que minimiza la distancia total.
+
+Cada asignación se ofrece al conductor por WebSocket y queda reservada durante
+unos segundos: el conductor la acepta con el flujo normal de POST /viajes/.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+
+from database.database import SessionLocal
+from repository import solicitud as repository_solicitud
+from repository import usuario as repository_usuario
+from core.websockets import manager
+from services.geo import matriz_distancias_km, asignacion_greedy
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+MATCHING_ENABLED = os.getenv("MATCHING_ENABLED", "false").lower() == "true"
+MATCHING_INTERVAL_SECONDS = float(os.getenv("MATCHING_INTERVAL_SECONDS", "5"))
+MATCHING_RADIUS_KM = float(os.getenv("MATCHING_RADIUS_KM", "5"))
+MATCHING_RESERVATION_SECONDS = float(os.getenv("MATCHING_RESERVATION_SECONDS", "20"))
+MATCHING_BATCH_LIMIT = int(os.getenv("MATCHING_BATCH_LIMIT", "500"))
+# Conductores sin reportar ubicación en este tiempo se consideran desconectados
+MATCHING_UBICACION_MAX_SECONDS = float(os.getenv("MATCHING_UBICACION_MAX_SECONDS", "120"))
+
+
+class MatchingEngine:
+    def __init__(
+        self,
+        habilitado: bool = MATCHING_ENABLED,
+        intervalo_s: float = MATCHING_INTERVAL_SECONDS,
+        radio_km: float = MATCHING_RADIUS_KM,
+        reserva_s: float = MATCHING_RESERVATION_SECONDS,
+        limite: int = MATCHING_BATCH_LIMIT,
+        ubicacion_max_s: float = MATCHING_UBICACION_MAX_SECONDS,
+    ):
+        self.habilitado = habilitado
+        self.intervalo_s = intervalo_s
+        self.radio_km = radio_km
+        self.reserva_s = reserva_s
+        self.limite = limite
+        self.ubicacion_max_s = ubicacion_max_s
+        # solicitud_id -> (conductor_id, instante de vencimiento). La ronda corre
+        # en el pool de hilos y los endpoints en el event loop: todo acceso va con el lock
+        self.reservas: Dict[int, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def _purgar_reservas(self, ahora: float):
+        vencidas = [sid for sid, (_, vence) in self.reservas.items() if vence <= ahora]
+        for sid in vencidas:
+            del self.reservas[sid]
+
+    def conductor_reservado(self, solicitud_id: int) -> Optional[int]:
+        """Devuelve el conductor al que está reservada la solicitud, si la reserva sigue vigente."""
+        with self._lock:
+            reserva = self.reservas.get(solicitud_id)
+            if reserva is None:
+                return None
+            conductor_id, vence = reserva
+            if vence <= time.monotonic():
+                self.reservas.pop(solicitud_id, None)
+                return None
+            return conductor_id
+
+    def liberar(self, solicitud_id: int):
+        with self._lock:
+            self.reservas.pop(solicitud_id, None)
+
+    def calcular_ronda(self, db) -> List[Tuple[int, int, float]]:
+        """
+        Ejecuta una ronda de asignación y registra las reservas.
+        Devuelve una lista de (solicitud_id, conductor_id, distancia_km).
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            self._purgar_reservas(ahora)
+            solicitudes_reservadas = set(self.reservas)
+            conductores_reservados = {cid for cid, _ in self.reservas.values()}
+
+        solicitudes = [
+            fila for fila in repository_solicitud.get_solicitudes_pendientes_coords(db, limit=self.limite)
+            if fila[0] not in solicitudes_reservadas
+        ]
+        conductores = [
+            fila for fila in repository_usuario.get_conductores_disponibles_coords(
+                db,
+                ubicacion_desde=datetime.utcnow() - timedelta(seconds=self.ubicacion_max_s),
+                limit=self.limite,
+            )
+            if fila[0] not in conductores_reservados
+        ]
+        if not solicitudes or not conductores:
+            return []
+
+        origenes = np.array([(lon, lat) for _, lon, lat in solicitudes], dtype=np.float64)
+        posiciones = np.array([(lon, lat) for _, lon, lat in conductores], dtype=np.float64)
+        distancias = matriz_distancias_km(origenes, posiciones)
+
+        asignaciones = []
+        with self._lock:
+            for fila, columna, distancia in asignacion_greedy(distancias, self.radio_km):
+                solicitud_id = solicitudes[fila][0]
+                conductor_id = conductores[columna][0]
+                self.reservas[solicitud_id] = (conductor_id, ahora + self.reserva_s)
+                asignaciones.append((solicitud_id, conductor_id, distancia))
+        return asignaciones
+
+    def _ronda_con_sesion(self) -> List[Tuple[int, int, float]]:
+        db = SessionLocal()
+        try:
+            return self.calcular_ronda(db)
+        finally:
+            db.close()
+
+    async def ejecutar_ronda(self):
+        asignaciones = await run_in_threadpool(self._ronda_con_sesion)
+        for solicitud_id, conductor_id, distancia in asignaciones:
+            oferta = {
+                "solicitud_id": solicitud_id,
+                "distancia_km": round(distancia, 3),
+                "reserva_segundos": self.reserva_s,
+            }
+            await manager.send_personal_message_by_id(
+                f"Matched solicitud: {json.dumps(oferta)}",
+                conductor_id
+            )
+
+    async def run(self):
+        while True:
+            try:
+                await self.ejecutar_ronda()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Error en la ronda de asignación")
+            await asyncio.sleep(self.intervalo_s)
+
+
+matching_engine = MatchingEngine()
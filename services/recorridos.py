@@ -0,0 +1,94 @@
+"""
+Buffer en memoria del recorrido GPS de los viajes en curso.
+
+Entre iniciar_viaje y finalizar_viaje cada ubicación reportada por el
+conductor se agrega a un array('d') con (lon, lat) intercalados: 16 bytes por
+punto, sin un dict por muestra. Al finalizar, el recorrido se persiste en una
+sola escritura como encoded polyline junto con la distancia calculada.
+Los recorridos viven solo en el worker que los recibió.
+"""
+import math
+import os
+import threading
+from array import array
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Separación mínima entre puntos consecutivos; descarta el ruido del GPS detenido
+RECORRIDO_MIN_METROS = float(os.getenv("RECORRIDO_MIN_METROS", "10"))
+
+METROS_POR_GRADO = 111_320.0
+
+
+class Recorrido:
+    __slots__ = ("viaje_id", "conductor_id", "coords")
+
+    def __init__(self, viaje_id: int, conductor_id: int):
+        self.viaje_id = viaje_id
+        self.conductor_id = conductor_id
+        self.coords = array("d")
+
+    def __len__(self):
+        return len(self.coords) // 2
+
+    def agregar(self, lon: float, lat: float, min_metros: float) -> bool:
+        coords = self.coords
+        if coords:
+            # Aproximación equirectangular: suficiente para filtrar puntos cercanos
+            dx = (lon - coords[-2]) * math.cos(math.radians(lat))
+            dy = lat - coords[-1]
+            if math.hypot(dx, dy) * METROS_POR_GRADO < min_metros:
+                return False
+        coords.append(lon)
+        coords.append(lat)
+        return True
+
+
+class RecorridoRegistry:
+    def __init__(self, min_metros: float = RECORRIDO_MIN_METROS):
+        self.min_metros = min_metros
+        self._lock = threading.Lock()
+        self._por_viaje: Dict[int, Recorrido] = {}
+        self._por_conductor: Dict[int, Recorrido] = {}
+
+    def iniciar(self, viaje_id: int, conductor_id: int):
+        with self._lock:
+            anterior = self._por_conductor.pop(conductor_id, None)
+            if anterior is not None:
+                self._por_viaje.pop(anterior.viaje_id, None)
+            recorrido = Recorrido(viaje_id, conductor_id)
+            self._por_viaje[viaje_id] = recorrido
+            self._por_conductor[conductor_id] = recorrido
+
+    def agregar_punto(self, conductor_id: int, lon: float, lat: float) -> bool:
+        """Agrega el punto al viaje en curso del conductor, si tiene uno."""
+        with self._lock:
+            recorrido = self._por_conductor.get(conductor_id)
+            if recorrido is None:
+                return False
+            return recorrido.agregar(lon, lat, self.min_metros)
+
+    def obtener(self, viaje_id: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Copia (lons, lats) del recorrido del viaje. La copia se hace bajo el
+        lock para que un punto nuevo no modifique el buffer mientras se lee.
+        """
+        with self._lock:
+            recorrido = self._por_viaje.get(viaje_id)
+            if recorrido is None:
+                return None
+            puntos = np.array(recorrido.coords, dtype=np.float64).reshape(-1, 2)
+        return puntos[:, 0], puntos[:, 1]
+
+    def descartar(self, viaje_id: int):
+        with self._lock:
+            recorrido = self._por_viaje.pop(viaje_id, None)
+            if recorrido is not None:
+                self._por_conductor.pop(recorrido.conductor_id, None)
+
+
+recorridos = RecorridoRegistry()
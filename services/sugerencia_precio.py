@@ -0,0 +1,203 @@
+"""
+Sugerencia de precio a partir de los precios aceptados en viajes anteriores.
+
+Los viajes completados se agrupan por par (zona de origen, zona de destino),
+con zonas cuadradas de SUGERENCIA_ZONA_GRADOS. Cada par conserva los últimos
+SUGERENCIA_MAX_MUESTRAS precios finales, ordenados para calcular percentiles
+sin ordenar en cada consulta. Cuando un par tiene pocas muestras se usa la
+distribución global de precio por kilómetro multiplicada por la distancia.
+
+La matriz se construye fuera de línea y se guarda en un JSON que cada worker
+carga al arrancar. Los viajes que finalizan se suman en memoria, así que las
+consultas nunca tocan la base de datos.
+
+Generación:
+    python -m services.sugerencia_precio [--desde 2024-01-01]
+"""
+import argparse
+import bisect
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from geoalchemy2.shape import to_shape
+
+from database.database import SessionLocal
+from repository import viaje as repository_viaje
+from services.geo import celda, matriz_distancias_km
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SUGERENCIA_PATH = os.getenv(
+    "SUGERENCIA_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "precios_zonas.json")
+)
+SUGERENCIA_ZONA_GRADOS = float(os.getenv("SUGERENCIA_ZONA_GRADOS", "0.02"))
+SUGERENCIA_MAX_MUESTRAS = int(os.getenv("SUGERENCIA_MAX_MUESTRAS", "200"))
+SUGERENCIA_MIN_MUESTRAS = int(os.getenv("SUGERENCIA_MIN_MUESTRAS", "5"))
+SUGERENCIA_MAX_MUESTRAS_KM = int(os.getenv("SUGERENCIA_MAX_MUESTRAS_KM", "5000"))
+# Por debajo de esta distancia el precio por km no es representativo
+DISTANCIA_MINIMA_KM = 0.5
+
+Zona = Tuple[int, int]
+
+
+def percentil(ordenados: List[float], p: float) -> float:
+    """Percentil con interpolación lineal (como numpy.percentile) sobre una lista ordenada."""
+    posicion = (len(ordenados) - 1) * p / 100.0
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicion - inferior)
+
+
+def _distancia_km(origen_lon, origen_lat, destino_lon, destino_lat) -> float:
+    return float(matriz_distancias_km([[origen_lon, origen_lat]], [[destino_lon, destino_lat]])[0, 0])
+
+
+class _Muestras:
+    """Últimos N valores en orden de llegada y, en paralelo, ordenados."""
+
+    __slots__ = ("recientes", "ordenados")
+
+    def __init__(self, maximo: int):
+        self.recientes: Deque[float] = deque(maxlen=maximo)
+        self.ordenados: List[float] = []
+
+    def agregar(self, valor: float):
+        if len(self.recientes) == self.recientes.maxlen:
+            antiguo = self.recientes[0]
+            del self.ordenados[bisect.bisect_left(self.ordenados, antiguo)]
+        self.recientes.append(valor)
+        bisect.insort(self.ordenados, valor)
+
+
+class SugerenciaPrecios:
+    def __init__(
+        self,
+        zona_grados: float = SUGERENCIA_ZONA_GRADOS,
+        max_muestras: int = SUGERENCIA_MAX_MUESTRAS,
+        min_muestras: int = SUGERENCIA_MIN_MUESTRAS,
+    ):
+        self.zona_grados = zona_grados
+        self.max_muestras = max_muestras
+        self.min_muestras = min_muestras
+        self._lock = threading.Lock()
+        self._pares: Dict[Tuple[Zona, Zona], _Muestras] = {}
+        self._por_km = _Muestras(SUGERENCIA_MAX_MUESTRAS_KM)
+
+    def registrar(self, origen_lon, origen_lat, destino_lon, destino_lat, precio: float):
+        clave = (celda(origen_lon, origen_lat, self.zona_grados), celda(destino_lon, destino_lat, self.zona_grados))
+        distancia = _distancia_km(origen_lon, origen_lat, destino_lon, destino_lat)
+        with self._lock:
+            muestras = self._pares.get(clave)
+            if muestras is None:
+                muestras = self._pares[clave] = _Muestras(self.max_muestras)
+            muestras.agregar(float(precio))
+            if distancia >= DISTANCIA_MINIMA_KM:
+                self._por_km.agregar(float(precio) / distancia)
+
+    def registrar_viaje(self, viaje):
+        """Camino incremental: suma el precio final de un viaje recién completado."""
+        solicitud = viaje.solicitud
+        if solicitud is None or viaje.precio_final is None or solicitud.origen_geom is None or solicitud.destino_geom is None:
+            return
+        origen = to_shape(solicitud.origen_geom)
+        destino = to_shape(solicitud.destino_geom)
+        self.registrar(origen.x, origen.y, destino.x, destino.y, viaje.precio_final)
+
+    def sugerir(self, origen_lon, origen_lat, destino_lon, destino_lat) -> dict:
+        clave = (celda(origen_lon, origen_lat, self.zona_grados), celda(destino_lon, destino_lat, self.zona_grados))
+        with self._lock:
+            muestras = self._pares.get(clave)
+            if muestras is not None and len(muestras.ordenados) >= self.min_muestras:
+                ordenados, fuente, escala = muestras.ordenados, "zona", 1.0
+            elif len(self._por_km.ordenados) >= self.min_muestras:
+                escala = max(_distancia_km(origen_lon, origen_lat, destino_lon, destino_lat), DISTANCIA_MINIMA_KM)
+                ordenados, fuente = self._por_km.ordenados, "distancia"
+            else:
+                return {"p25": None, "p50": None, "p75": None, "muestras": 0, "fuente": None}
+            return {
+                "p25": round(percentil(ordenados, 25) * escala, 2),
+                "p50": round(percentil(ordenados, 50) * escala, 2),
+                "p75": round(percentil(ordenados, 75) * escala, 2),
+                "muestras": len(ordenados),
+                "fuente": fuente,
+            }
+
+    def a_dict(self) -> dict:
+        with self._lock:
+            return {
+                "zona_grados": self.zona_grados,
+                "generado": datetime.utcnow().isoformat(),
+                "pares": [
+                    [list(origen), list(destino), list(muestras.recientes)]
+                    for (origen, destino), muestras in self._pares.items()
+                ],
+                "por_km": list(self._por_km.recientes),
+            }
+
+    def cargar(self, ruta: str = SUGERENCIA_PATH):
+        """Carga la matriz generada fuera de línea; sin archivo se empieza vacía."""
+        try:
+            with open(ruta) as f:
+                datos = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception:
+            logger.exception("No se pudo cargar la matriz de precios %s", ruta)
+            return
+        if datos.get("zona_grados") != self.zona_grados:
+            logger.warning("La matriz de precios %s usa otra zona_grados; se ignora", ruta)
+            return
+        pares = {}
+        for origen, destino, precios in datos["pares"]:
+            muestras = _Muestras(self.max_muestras)
+            for precio in precios:
+                muestras.agregar(precio)
+            pares[(tuple(origen), tuple(destino))] = muestras
+        por_km = _Muestras(SUGERENCIA_MAX_MUESTRAS_KM)
+        for valor in datos["por_km"]:
+            por_km.agregar(valor)
+        with self._lock:
+            self._pares, self._por_km = pares, por_km
+
+
+def generar(db, ruta: str = SUGERENCIA_PATH, desde: Optional[datetime] = None) -> dict:
+    """Recorre los viajes completados en streaming y escribe la matriz de precios."""
+    matriz = SugerenciaPrecios()
+    total = 0
+    for origen_lon, origen_lat, destino_lon, destino_lat, precio in repository_viaje.consulta_precios_aceptados(db, desde):
+        matriz.registrar(origen_lon, origen_lat, destino_lon, destino_lat, precio)
+        total += 1
+    datos = matriz.a_dict()
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    temporal = ruta + ".tmp"
+    with open(temporal, "w") as f:
+        json.dump(datos, f, separators=(",", ":"))
+    os.replace(temporal, ruta)
+    return {"viajes": total, "pares": len(datos["pares"]), "generado": datos["generado"]}
+
+
+sugerencia_precios = SugerenciaPrecios()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera la matriz de precios aceptados por par de zonas")
+    parser.add_argument("--desde", type=datetime.fromisoformat, default=None)
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        resumen = generar(db, desde=args.desde)
+    finally:
+        db.close()
+    print(json.dumps(resumen, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Multiplicador de demanda (surge) por celda geográfica.
+
+Mantiene, para cada celda de una grilla cuadrada, cuántas solicitudes nuevas
+llegaron en la ventana deslizante y cuántos conductores libres reportaron su
+ubicación en esa misma ventana. Los contadores se actualizan de forma
+incremental con cada evento (sin consultar la base de datos); los eventos
+vencidos se descartan en orden de llegada, con costo O(1) amortizado.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Set, Tuple
+
+from dotenv import load_dotenv
+
+from services.geo import celda, centro_celda
+
+load_dotenv()
+
+SURGE_CELL_DEGREES = float(os.getenv("SURGE_CELL_DEGREES", "0.01"))
+SURGE_WINDOW_SECONDS = float(os.getenv("SURGE_WINDOW_SECONDS", "600"))
+SURGE_MAX_MULTIPLIER = float(os.getenv("SURGE_MAX_MULTIPLIER", "2.0"))
+SURGE_SENSITIVITY = float(os.getenv("SURGE_SENSITIVITY", "0.5"))
+
+Celda = Tuple[int, int]
+
+
+class SurgeGrid:
+    def __init__(
+        self,
+        celda_grados: float = SURGE_CELL_DEGREES,
+        ventana_s: float = SURGE_WINDOW_SECONDS,
+        max_multiplicador: float = SURGE_MAX_MULTIPLIER,
+        sensibilidad: float = SURGE_SENSITIVITY,
+        reloj: Callable[[], float] = time.monotonic,
+    ):
+        self.celda_grados = celda_grados
+        self.ventana_s = ventana_s
+        self.max_multiplicador = max_multiplicador
+        self.sensibilidad = sensibilidad
+        self._reloj = reloj
+        self._lock = threading.Lock()
+
+        # Solicitudes en la ventana, en orden de llegada: (instante, celda)
+        self._eventos_demanda: Deque[Tuple[float, Celda]] = deque()
+        self._demanda: Dict[Celda, int] = {}
+        # conductor_id -> [celda, último instante visto, ocupado]; ordenado por último instante visto
+        self._conductores: "OrderedDict[int, list]" = OrderedDict()
+        self._oferta: Dict[Celda, int] = {}
+        # Conductores con viaje abierto, aunque todavía no hayan reportado ubicación
+        # o su entrada haya vencido: el estado se conserva hasta que terminan el viaje
+        self._ocupados: Set[int] = set()
+
+    @staticmethod
+    def _sumar(contador: Dict[Celda, int], clave: Celda, delta: int):
+        valor = contador.get(clave, 0) + delta
+        if valor:
+            contador[clave] = valor
+        else:
+            contador.pop(clave, None)
+
+    def _expirar(self, ahora: float):
+        limite = ahora - self.ventana_s
+        eventos = self._eventos_demanda
+        while eventos and eventos[0][0] <= limite:
+            _, clave = eventos.popleft()
+            self._sumar(self._demanda, clave, -1)
+
+        conductores = self._conductores
+        while conductores:
+            conductor_id, (clave, visto, ocupado) = next(iter(conductores.items()))
+            if visto > limite:
+                break
+            conductores.popitem(last=False)
+            if not ocupado:
+                self._sumar(self._oferta, clave, -1)
+
+    def registrar_solicitud(self, lon: float, lat: float):
+        """Cuenta una solicitud nueva en la celda de su origen."""
+        clave = celda(lon, lat, self.celda_grados)
+        with self._lock:
+            ahora = self._reloj()
+            self._expirar(ahora)
+            self._eventos_demanda.append((ahora, clave))
+            self._sumar(self._demanda, clave, 1)
+
+    def registrar_conductor(self, conductor_id: int, lon: float, lat: float):
+        """Registra la ubicación de un conductor conectado, moviéndolo de celda si hace falta."""
+        clave = celda(lon, lat, self.celda_grados)
+        with self._lock:
+            ahora = self._reloj()
+            entrada = self._conductores.get(conductor_id)
+            if entrada is None:
+                ocupado = conductor_id in self._ocupados
+                self._conductores[conductor_id] = [clave, ahora, ocupado]
+                if not ocupado:
+                    self._sumar(self._oferta, clave, 1)
+            else:
+                if not entrada[2] and entrada[0] != clave:
+                    self._sumar(self._oferta, entrada[0], -1)
+                    self._sumar(self._oferta, clave, 1)
+                entrada[0] = clave
+                entrada[1] = ahora
+                self._conductores.move_to_end(conductor_id)
+            self._expirar(ahora)
+
+    def marcar_ocupado(self, conductor_id: int, ocupado: bool):
+        """Un conductor con viaje abierto no cuenta como oferta disponible."""
+        with self._lock:
+            if ocupado:
+                self._ocupados.add(conductor_id)
+            else:
+                self._ocupados.discard(conductor_id)
+            entrada = self._conductores.get(conductor_id)
+            if entrada is None or entrada[2] == ocupado:
+                return
+            entrada[2] = ocupado
+            self._sumar(self._oferta, entrada[0], -1 if ocupado else 1)
+
+    def _multiplicador(self, demanda: int, oferta: int) -> float:
+        if demanda <= oferta:
+            return 1.0
+        exceso = demanda / max(oferta, 1) - 1.0
+        valor = min(1.0 + self.sensibilidad * exceso, self.max_multiplicador)
+        return round(valor, 1)
+
+    def multiplicador(self, lon: float, lat: float) -> float:
+        """Multiplicador vigente en la celda del punto (1.0 si no hay exceso de demanda)."""
+        clave = celda(lon, lat, self.celda_grados)
+        with self._lock:
+            self._expirar(self._reloj())
+            return self._multiplicador(self._demanda.get(clave, 0), self._oferta.get(clave, 0))
+
+    def grilla(self) -> List[dict]:
+        """Estado de todas las celdas con actividad en la ventana actual."""
+        with self._lock:
+            self._expirar(self._reloj())
+            celdas = set(self._demanda) | set(self._oferta)
+            resultado = []
+            for clave in sorted(celdas):
+                demanda = self._demanda.get(clave, 0)
+                oferta = self._oferta.get(clave, 0)
+                lon, lat = centro_celda(clave, self.celda_grados)
+                resultado.append({
+                    "celda_x": clave[0],
+                    "celda_y": clave[1],
+                    "lon": lon,
+                    "lat": lat,
+                    "demanda": demanda,
+                    "oferta": oferta,
+                    "multiplicador": self._multiplicador(demanda, oferta),
+                })
+            return resultado
+
+
+surge_grid = SurgeGrid()
@@ -0,0 +1,146 @@
+"""
+Contadores en vivo para el tablero de operadores.
+
+Los caminos de escritura de los repositorios ajustan los contadores en
+memoria después de cada commit (solicitud creada o expirada, viaje aceptado,
+finalizado o cobrado). Los conductores en línea son los que reportaron su
+ubicación dentro de TABLERO_EN_LINEA_SECONDS. Cada TABLERO_TICK_SECONDS se
+envía al canal "operadores" un único mensaje con solo los contadores que
+cambiaron en el tick, por muchos eventos que haya habido. Cada worker ve
+solo sus propias escrituras, así que los contadores se reconcilian contra
+la base de datos cada TABLERO_RECONCILIAR_SECONDS.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict
+
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+
+from core.websockets import manager
+from database.database import SessionLocal
+from repository import tablero as repository_tablero
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+TABLERO_ENABLED = os.getenv("TABLERO_ENABLED", "true").lower() == "true"
+TABLERO_TICK_SECONDS = float(os.getenv("TABLERO_TICK_SECONDS", "1"))
+TABLERO_RECONCILIAR_SECONDS = float(os.getenv("TABLERO_RECONCILIAR_SECONDS", "60"))
+TABLERO_EN_LINEA_SECONDS = float(os.getenv("TABLERO_EN_LINEA_SECONDS", "120"))
+
+CANAL_OPERADORES = "operadores"
+
+SOLICITUDES_PENDIENTES = "solicitudes_pendientes"
+VIAJES_EN_CURSO = "viajes_en_curso"
+VIAJES_SIN_COBRAR = "viajes_sin_cobrar"
+CONDUCTORES_EN_LINEA = "conductores_en_linea"
+
+
+class TableroOperadores:
+    def __init__(
+        self,
+        habilitado: bool = TABLERO_ENABLED,
+        en_linea_s: float = TABLERO_EN_LINEA_SECONDS,
+        reloj: Callable[[], float] = time.monotonic,
+    ):
+        self.habilitado = habilitado
+        self.en_linea_s = en_linea_s
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._contadores: Dict[str, int] = {
+            SOLICITUDES_PENDIENTES: 0,
+            VIAJES_EN_CURSO: 0,
+            VIAJES_SIN_COBRAR: 0,
+        }
+        # conductor_id -> último reporte (reloj), del más antiguo al más reciente
+        self._conductores: "OrderedDict[int, float]" = OrderedDict()
+        self._enviado: Dict[str, int] = {}
+
+    def ajustar(self, contador: str, delta: int = 1):
+        """Suma delta al contador. Se llama después del commit que lo justifica."""
+        if delta:
+            with self._lock:
+                self._contadores[contador] = self._contadores[contador] + delta
+
+    def conductor_visto(self, conductor_id: int):
+        with self._lock:
+            self._conductores[conductor_id] = self._reloj()
+            self._conductores.move_to_end(conductor_id)
+
+    def _expirar_conductores(self, ahora: float):
+        limite = ahora - self.en_linea_s
+        conductores = self._conductores
+        while conductores:
+            conductor_id, visto = next(iter(conductores.items()))
+            if visto > limite:
+                break
+            conductores.popitem(last=False)
+
+    def valores(self) -> Dict[str, int]:
+        with self._lock:
+            self._expirar_conductores(self._reloj())
+            return {**self._contadores, CONDUCTORES_EN_LINEA: len(self._conductores)}
+
+    def diferencias(self) -> Dict[str, int]:
+        """Contadores que cambiaron desde el último envío (y los marca como enviados)."""
+        actuales = self.valores()
+        cambios = {k: v for k, v in actuales.items() if self._enviado.get(k) != v}
+        self._enviado = actuales
+        return cambios
+
+    def reconciliar(self, db):
+        """Reemplaza los contadores por los valores de la base de datos."""
+        contadores = repository_tablero.get_contadores_tablero(db)
+        en_linea = repository_tablero.get_conductores_en_linea(db, self.en_linea_s)
+        with self._lock:
+            self._contadores.update(contadores)
+            ahora = self._reloj()
+            for conductor_id, antiguedad in sorted(en_linea, key=lambda fila: -fila[1]):
+                visto = ahora - float(antiguedad)
+                if visto > self._conductores.get(conductor_id, float("-inf")):
+                    self._conductores[conductor_id] = visto
+            # Reordenar por último reporte para que la expiración siga siendo FIFO
+            self._conductores = OrderedDict(sorted(self._conductores.items(), key=lambda item: item[1]))
+
+    def _reconciliar_con_sesion(self):
+        db = SessionLocal()
+        try:
+            self.reconciliar(db)
+        finally:
+            db.close()
+
+    def mensaje_completo(self) -> str:
+        return f"Dashboard snapshot: {json.dumps(self.valores())}"
+
+    async def run(self, tick_s: float = TABLERO_TICK_SECONDS, reconciliar_s: float = TABLERO_RECONCILIAR_SECONDS):
+        proxima_reconciliacion = 0.0
+        while True:
+            ahora = time.monotonic()
+            if ahora >= proxima_reconciliacion:
+                try:
+                    await run_in_threadpool(self._reconciliar_con_sesion)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception("No se pudo reconciliar el tablero con la base de datos")
+                proxima_reconciliacion = ahora + reconciliar_s
+
+            try:
+                cambios = self.diferencias()
+                if cambios and manager.tiene_suscriptores(CANAL_OPERADORES):
+                    await manager.broadcast_canal(CANAL_OPERADORES, f"Dashboard update: {json.dumps(cambios)}")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("No se pudo enviar la actualización del tablero")
+            await asyncio.sleep(tick_s)
+
+
+tablero = TableroOperadores()
@@ -0,0 +1,16 @@
+"""
+Cálculo de precios a partir de la hoja de tarifas.
+"""
+
+
+def calcular_precio(tarifa, distancia_km: float, duracion_min: float = 0.0, multiplicador: float = 1.0) -> float:
+    """
+    Precio de un viaje según la tarifa: base + km + minutos, escalado por el
+    multiplicador de demanda. Redondeado a dos decimales.
+    """
+    precio = (
+        tarifa.tarifa_base
+        + tarifa.costo_por_km * distancia_km
+        + (tarifa.costo_por_minuto or 0.0) * duracion_min
+    )
+    return round(precio * multiplicador, 2)
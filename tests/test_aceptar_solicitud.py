@@ -0,0 +1,22 @@
+"""Un conductor no puede aceptar una solicitud que ya expiró."""
+from tests.test_consultas_viajes import _escenario
+
+
+def test_no_se_acepta_una_solicitud_expirada(client, db):
+    from models.enums import EstadoViaje
+    from models.solicitud import Solicitud
+    from models.viaje import Viaje
+    from repository import solicitud as repository_solicitud
+
+    headers, vehiculo_id, solicitud_id = _escenario(db)
+    assert repository_solicitud.expirar_solicitudes(db, [solicitud_id])
+
+    respuesta = client.post(
+        "/viajes/", headers=headers,
+        json={"solicitud_id": solicitud_id, "vehiculo_id": vehiculo_id, "precio_final": 20.0},
+    )
+    assert respuesta.status_code == 409, respuesta.text
+
+    db.expire_all()
+    assert db.get(Solicitud, solicitud_id).estado == EstadoViaje.cancelado
+    assert db.query(Viaje).filter(Viaje.solicitud_id == solicitud_id).count() == 0
@@ -0,0 +1,67 @@
+"""
+Presupuesto de consultas SQL por petición en las transiciones de un viaje.
+
+Cada endpoint tiene un máximo fijo de sentencias (incluida la autenticación);
+si un cambio agrega una carga perezosa o una consulta por fila, la prueba falla.
+"""
+import uuid
+from datetime import datetime
+
+from tests.conftest import contar_consultas, crear_usuario
+
+PRESUPUESTO = {
+    "crear": 8,
+    "iniciar": 5,
+    "finalizar": 8,
+    "marcar-pagado": 6,
+}
+
+
+def _escenario(db):
+    from models.enums import RolUsuario
+    from models.solicitud import Solicitud
+    from models.vehiculo import Vehiculo
+
+    sufijo = uuid.uuid4().hex[:8]
+    pasajero, _ = crear_usuario(db, RolUsuario.pasajero, f"pasajero-{sufijo}@test.com")
+    conductor, headers = crear_usuario(db, RolUsuario.conductor, f"conductor-{sufijo}@test.com")
+    vehiculo = Vehiculo(conductor_id=conductor.id, marca="Toyota", modelo="Corolla", placa=f"T-{sufijo}", activo=True)
+    solicitud = Solicitud(
+        pasajero_id=pasajero.id,
+        origen_geom="POINT(-68.15 -16.5)",
+        destino_geom="POINT(-68.12 -16.52)",
+        direccion_texto="Prueba",
+        precio_ofrecido=20.0,
+        fecha_creacion=datetime.utcnow(),
+    )
+    db.add_all([vehiculo, solicitud])
+    db.commit()
+    return headers, vehiculo.id, solicitud.id
+
+
+def _pedir(client, presupuesto, metodo, ruta, **kwargs):
+    from database.database import engine
+
+    with contar_consultas(engine) as contador:
+        respuesta = client.request(metodo, ruta, **kwargs)
+    assert respuesta.status_code == 200, respuesta.text
+    assert contador.total <= PRESUPUESTO[presupuesto], (
+        f"{presupuesto}: {contador.total} consultas (máximo {PRESUPUESTO[presupuesto]})\n"
+        + "\n".join(contador.sentencias)
+    )
+    return respuesta.json()
+
+
+def test_transiciones_de_viaje_respetan_el_presupuesto(client, db):
+    headers, vehiculo_id, solicitud_id = _escenario(db)
+
+    viaje = _pedir(
+        client, "crear", "POST", "/viajes/", headers=headers,
+        json={"solicitud_id": solicitud_id, "vehiculo_id": vehiculo_id, "precio_final": 20.0},
+    )
+    viaje_id = viaje["id"]
+    _pedir(client, "iniciar", "PATCH", f"/viajes/{viaje_id}/iniciar", headers=headers)
+    finalizado = _pedir(client, "finalizar", "PATCH", f"/viajes/{viaje_id}/finalizar", headers=headers)
+    assert finalizado["completado"] is True
+    pagado = _pedir(client, "marcar-pagado", "PATCH", f"/viajes/{viaje_id}/marcar-pagado", headers=headers)
+    assert pagado["pagado"] is True
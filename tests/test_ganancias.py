@@ -0,0 +1,67 @@
+"""Las transiciones concurrentes de un mismo viaje suman una sola vez al resumen diario."""
+import threading
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+
+from tests.test_consultas_viajes import _escenario
+
+
+def _en_paralelo(funcion, veces=2):
+    """Corre `funcion` en varios hilos a la vez; devuelve cuántas terminaron sin HTTPException."""
+    barrera = threading.Barrier(veces)
+    exitos = []
+
+    def correr():
+        barrera.wait()
+        try:
+            funcion()
+            exitos.append(True)
+        except HTTPException:
+            pass
+
+    hilos = [threading.Thread(target=correr) for _ in range(veces)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return len(exitos)
+
+
+def test_finalizar_y_cobrar_concurrentes_cuentan_una_vez(db):
+    from database.database import SessionLocal
+    from models.ganancias import GananciaDiaria
+    from models.vehiculo import Vehiculo
+    from models.viaje import Viaje
+    from repository import viaje as repository_viaje
+
+    _, vehiculo_id, solicitud_id = _escenario(db)
+    conductor_id = db.get(Vehiculo, vehiculo_id).conductor_id
+    viaje = Viaje(
+        solicitud_id=solicitud_id,
+        conductor_id=conductor_id,
+        vehiculo_id=vehiculo_id,
+        precio_final=25.0,
+        hora_inicio=datetime.utcnow() - timedelta(minutes=10),
+    )
+    db.add(viaje)
+    db.commit()
+
+    def transicion(nombre):
+        def ejecutar():
+            sesion = SessionLocal()
+            try:
+                getattr(repository_viaje, nombre)(sesion, viaje_id=viaje.id, conductor_id=conductor_id)
+            finally:
+                sesion.close()
+        return ejecutar
+
+    assert _en_paralelo(transicion("finalizar_viaje")) == 1
+    assert _en_paralelo(transicion("marcar_como_pagado")) == 1
+
+    db.expire_all()
+    filas = db.query(GananciaDiaria).filter(GananciaDiaria.conductor_id == conductor_id).all()
+    assert sum(f.viajes for f in filas) == 1
+    assert sum(f.ingresos for f in filas) == 25.0
+    assert sum(f.pagado for f in filas) == 25.0
+    assert sum(f.pendiente for f in filas) == 0
@@ -0,0 +1,67 @@
+"""Las lecturas autenticadas usan la réplica, salvo justo después de escribir."""
+import pytest
+
+from tests.conftest import TEST_DATABASE_URL, TEST_REPLICA_DATABASE_URL, contar_consultas, crear_usuario
+
+MISMA_BASE = TEST_REPLICA_DATABASE_URL == TEST_DATABASE_URL
+
+
+def _leer_perfil(client, headers):
+    from database.database import engine, replica_engine
+
+    with contar_consultas(engine) as primario, contar_consultas(replica_engine) as replica:
+        respuesta = client.get("/auth/me", headers=headers)
+    assert respuesta.status_code == 200, respuesta.text
+    return primario.total, replica.total
+
+
+@pytest.mark.skipif(not MISMA_BASE, reason="el usuario de prueba solo existe en el primario")
+def test_lectura_va_a_la_replica(client, db):
+    from models.enums import RolUsuario
+
+    _, headers = crear_usuario(db, RolUsuario.pasajero, "lector-replica@example.com")
+
+    primario, replica = _leer_perfil(client, headers)
+    assert primario == 0
+    assert replica > 0
+
+
+def test_tras_escribir_el_mismo_usuario_lee_del_primario(client, db):
+    from datetime import timedelta
+
+    from core.security import create_access_token
+    from models.enums import RolUsuario
+
+    email = "escritor-replica@example.com"
+    _, headers = crear_usuario(db, RolUsuario.conductor, email)
+
+    respuesta = client.put("/users/me/ubicacion", json={"lat": -12.05, "lon": -77.04}, headers=headers)
+    assert respuesta.status_code == 200, respuesta.text
+
+    # Otro dispositivo del mismo usuario, con su propio token
+    otro_token = create_access_token({"sub": email}, expires_delta=timedelta(hours=1))
+    for cabeceras in (headers, {"Authorization": f"Bearer {otro_token}"}):
+        primario, replica = _leer_perfil(client, cabeceras)
+        assert primario > 0
+        assert replica == 0
+
+
+@pytest.mark.skipif(MISMA_BASE, reason="necesita TEST_REPLICA_DATABASE_URL distinta del primario")
+def test_usuario_ausente_en_la_replica_se_busca_en_el_primario(client, db):
+    from sqlalchemy import create_engine
+
+    from database.database import Base
+    from models.enums import RolUsuario
+
+    # La réplica de pruebas no replica: tiene el esquema pero no al usuario nuevo
+    ddl = create_engine(TEST_REPLICA_DATABASE_URL)
+    try:
+        Base.metadata.drop_all(bind=ddl)
+        Base.metadata.create_all(bind=ddl)
+    finally:
+        ddl.dispose()
+    _, headers = crear_usuario(db, RolUsuario.pasajero, "recien-registrado@example.com")
+
+    primario, replica = _leer_perfil(client, headers)
+    assert replica > 0
+    assert primario > 0